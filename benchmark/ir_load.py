@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Compares loading an API from its IR against parsing and resolving its specs.
+
+By default, a synthetic API is generated. Specs can be given instead:
+
+    $ python benchmark/ir_load.py -n 10
+    $ python benchmark/ir_load.py path/to/*.stone
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stone.ir import read_ir, write_ir  # noqa: E402
+from stone.lang.tower import TowerOfStone  # noqa: E402
+
+def synthetic_specs(namespaces, structs):
+    """Returns specs for an API in which every namespace imports the previous
+    one, and each has the given number of structs, unions, and routes."""
+    specs = []
+    for i in range(namespaces):
+        lines = ['namespace ns%d' % i]
+        if i > 0:
+            lines.append('import ns%d' % (i - 1))
+        for j in range(structs):
+            lines.extend([
+                'struct S%d' % j,
+                '    "Struct %d of namespace %d."' % (j, i),
+                '    id String(min_length=1, max_length=64)',
+                '    count UInt64 = 0',
+                '    tags List(String)?',
+            ])
+            if i > 0:
+                lines.append('    prev ns%d.S%d?' % (i - 1, j))
+            lines.extend([
+                '    example default',
+                '        id = "abc"',
+                '        count = 3',
+                'union U%d' % j,
+                '    a',
+                '    b S%d' % j,
+                'route r%d(S%d, U%d, Void)' % (j, j, j),
+            ])
+        specs.append(('ns%d.stone' % i, '\n'.join(lines) + '\n'))
+    return specs
+
+def _best_of(runs, f):
+    timings = []
+    for _ in range(runs):
+        start = time.time()
+        f()
+        timings.append(time.time() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('spec', nargs='*', help='Specs to benchmark with.')
+    parser.add_argument('-n', '--runs', type=int, default=5,
+                        help='Number of runs; the best is reported.')
+    parser.add_argument('--namespaces', type=int, default=20,
+                        help='Namespaces in the synthetic API.')
+    parser.add_argument('--structs', type=int, default=25,
+                        help='Structs per namespace in the synthetic API.')
+    args = parser.parse_args()
+
+    if args.spec:
+        specs = []
+        for path in args.spec:
+            with open(path) as f:
+                specs.append((path, f.read()))
+    else:
+        specs = synthetic_specs(args.namespaces, args.structs)
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        ir_path = os.path.join(tmp_dir, 'api.stoneir')
+        write_ir(TowerOfStone(specs).parse(), ir_path)
+
+        parse_time = _best_of(args.runs, lambda: TowerOfStone(specs).parse())
+        load_time = _best_of(args.runs, lambda: read_ir(ir_path))
+        print('specs: %d, IR size: %d bytes' % (len(specs), os.path.getsize(ir_path)))
+        print('parse specs  %8.1f ms' % (parse_time * 1000))
+        print('load IR      %8.1f ms  (%.1fx faster)' % (
+            load_time * 1000, parse_time / load_time))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    main()
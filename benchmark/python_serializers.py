@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+"""
+Times the serializers of the Python types generated by python_types.
+
+A spec modeled on a listing of files is generated with python_types, once as
+is and once for each given set of generator arguments, such as
+--specialized-encoders. For each, payloads with the given number of entries are
+encoded to JSON and decoded back, and the best time of several runs of each is
+reported. The outputs of all the variants are checked to be identical.
+
+The payloads are a listing of files, and large lists of strings and of structs.
+
+Each variant runs in a fresh interpreter, since the generated modules of every
+variant have the same names:
+
+    $ python benchmark/python_serializers.py --entries 1000 10000
+    $ python benchmark/python_serializers.py --entries 100000 --payload strings structs
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import datetime
+import hashlib
+import itertools
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SPEC = """\
+namespace files
+
+alias Path = String(pattern="/.*")
+
+struct Metadata
+    name String
+    path_lower Path?
+    id String(min_length=1)
+    parent_shared_folder_id String?
+
+struct FileMetadata extends Metadata
+    size UInt64
+    rev String
+    client_modified Timestamp("%Y-%m-%dT%H:%M:%SZ")
+    content_hash String?
+    sharing_info SharingInfo?
+    tags List(String)
+
+struct SharingInfo
+    read_only Boolean
+    modified_by String?
+
+union EntryKind
+    file FileMetadata
+    folder String
+    deleted
+
+struct ListFolderResult
+    entries List(EntryKind)
+    cursor String
+    has_more Boolean
+"""
+
+_PAYLOADS = ['listing', 'strings', 'structs']
+
+# Each variant is a label and the arguments of python_types.
+_BASELINE_VARIANT = ('generic', '')
+
+def _make_listing(files, entries):
+    """Returns a ListFolderResult with the given number of entries."""
+    result = []
+    for i in range(entries):
+        if i % 10 == 9:
+            result.append(files.EntryKind.deleted)
+        elif i % 10 == 8:
+            result.append(files.EntryKind.folder('/folder%d' % i))
+        else:
+            sharing_info = None
+            if i % 3 == 0:
+                sharing_info = files.SharingInfo(read_only=bool(i % 2))
+            result.append(files.EntryKind.file(files.FileMetadata(
+                name='file%d.txt' % i,
+                path_lower='/dir/file%d.txt' % i,
+                id='id:%d' % i,
+                size=i * 1000,
+                rev='%09x' % i,
+                client_modified=datetime.datetime(2017, 1, 1 + i % 28),
+                content_hash='%064x' % i if i % 2 else None,
+                sharing_info=sharing_info,
+                tags=['tag%d' % (i % 5)],
+            )))
+    return files.ListFolderResult(entries=result, cursor='cursor', has_more=False)
+
+def _make_payload(files, bv, payload, entries):
+    """Returns the validator and the value of a payload."""
+    if payload == 'listing':
+        return files.ListFolderResult_validator, _make_listing(files, entries)
+    elif payload == 'strings':
+        return bv.List(bv.String()), ['/dir/file%d.txt' % i for i in range(entries)]
+    else:
+        return bv.List(files.SharingInfo_validator), [
+            files.SharingInfo(read_only=bool(i % 2),
+                              modified_by='dbid:%d' % i if i % 3 else None)
+            for i in range(entries)]
+
+def _worker(args):
+    """Measures the variant generated at args.output in this process, and
+    prints the result as JSON."""
+    sys.path.insert(0, args.output)
+    from generated import files, stone_serializers, stone_validators
+
+    # A worker measures a single payload with a single number of entries.
+    validator, value = _make_payload(
+        files, stone_validators, args.payload[0], args.entries[0])
+    encode_timings = []
+    encoded = None
+    for _ in range(args.runs):
+        start = time.time()
+        encoded = stone_serializers.json_encode(validator, value)
+        encode_timings.append(time.time() - start)
+    decode_timings = []
+    decoded = None
+    for _ in range(args.runs):
+        start = time.time()
+        decoded = stone_serializers.json_decode(validator, encoded)
+        decode_timings.append(time.time() - start)
+    reencoded = stone_serializers.json_encode(validator, decoded)
+    print(json.dumps({
+        'encode': {
+            'seconds': min(encode_timings),
+            'digest': hashlib.sha1(encoded.encode('utf-8')).hexdigest(),
+        },
+        'decode': {
+            'seconds': min(decode_timings),
+            'digest': hashlib.sha1(reencoded.encode('utf-8')).hexdigest(),
+        },
+    }))
+
+def _generate(python, generator_args, output_path, spec_path):
+    """Generates the modules into a package named generated in output_path."""
+    package_path = os.path.join(output_path, 'generated')
+    subprocess.check_call(
+        [python, '-m', 'stone.cli', 'python_types', package_path, spec_path, '--'] +
+        shlex.split(generator_args),
+        cwd=_ROOT)
+    with open(os.path.join(package_path, '__init__.py'), 'w'):
+        pass
+
+def _measure(python, output_path, payload, entries, runs):
+    out = subprocess.check_output(
+        [python, os.path.abspath(__file__),
+         '--worker',
+         '--output', output_path,
+         '--payload', payload,
+         '--entries', str(entries),
+         '--runs', str(runs)])
+    return json.loads(out.decode('utf-8').strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--entries', type=int, nargs='+', default=[1000, 10000],
+                        help='Numbers of entries of the payloads to measure.')
+    parser.add_argument('-p', '--payload', nargs='+', choices=_PAYLOADS, default=_PAYLOADS,
+                        help='Payloads to measure. Defaults to all of them.')
+    parser.add_argument('-a', '--variant', action='append', default=[],
+                        metavar='ARGS',
+                        help=('Arguments of python_types to measure besides none. '
+                              'Can be given several times. Defaults to '
+                              '"--specialized-encoders" and '
+                              '"--specialized-decoders".'))
+    parser.add_argument('-n', '--runs', type=int, default=5,
+                        help='Number of runs of each measurement; the best is reported.')
+    parser.add_argument('--python', default=sys.executable,
+                        help='Interpreter to run Stone and the generated code with.')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args)
+        return
+
+    variants = [_BASELINE_VARIANT] + [
+        (generator_args, generator_args)
+        for generator_args in (
+            args.variant or ['--specialized-encoders', '--specialized-decoders'])]
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        spec_path = os.path.join(tmp_dir, 'files.stone')
+        with open(spec_path, 'w') as f:
+            f.write(_SPEC)
+        output_paths = []
+        for i, (_, generator_args) in enumerate(variants):
+            output_path = os.path.join(tmp_dir, 'variant%d' % i)
+            _generate(args.python, generator_args, output_path, spec_path)
+            output_paths.append(output_path)
+
+        print('%-24s' % 'entries' + ''.join('%26s' % label[-24:] for label, _ in variants))
+        for entries, payload in itertools.product(args.entries, args.payload):
+            results = [_measure(args.python, output_path, payload, entries, args.runs)
+                       for output_path in output_paths]
+            for operation in ('encode', 'decode'):
+                line = '%-24s' % ('%d %s %s' % (entries, payload, operation))
+                for result in results:
+                    line += '%14.1f ms %6.2fx' % (
+                        result[operation]['seconds'] * 1000,
+                        results[0][operation]['seconds'] / result[operation]['seconds'])
+                if len(set(result[operation]['digest'] for result in results)) > 1:
+                    line += '  OUTPUTS DIFFER'
+                print(line)
+            sys.stdout.flush()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    main()
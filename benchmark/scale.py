@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+"""
+Times the front end and the built-in generators against large synthetic APIs.
+
+For every size, the specs are parsed with TowerOfStone, and each built-in
+generator is run on the result. Throughput is reported in data types per
+second, along with the peak memory of the process. A throughput that drops as
+the size grows points to superlinear behavior.
+
+Each measurement runs in a fresh interpreter. By default, the Stone in this
+checkout is measured, including uncommitted changes. With --rev, the given git
+revisions are measured instead, side by side:
+
+    $ python benchmark/scale.py --namespaces 5 20
+    $ python benchmark/scale.py --rev master --rev HEAD -g python_types
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+from synthetic import synthetic_specs
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_BUILTIN_GENERATORS = (
+    'obj_c_client',
+    'obj_c_types',
+    'obj_c_tests',
+    'js_client',
+    'js_types',
+    'tsd_client',
+    'tsd_types',
+    'python_types',
+    'python_client',
+    'swift_types',
+    'swift_client',
+)
+
+# The arguments each generator needs, if any. TEMPLATE is replaced with the
+# path to a TypeScript template.
+_GENERATOR_ARGS = {
+    'obj_c_client': ['-m', 'DBRoutes', '-c', 'DBClient', '-t', 'DBTransportClient',
+                     '-y', '{}', '-z--style-to-request', '{"rpc": "DBRpcTask"}'],
+    'js_client': ['client.js'],
+    'js_types': ['types.js'],
+    'tsd_client': ['TEMPLATE', 'client.d.ts'],
+    'tsd_types': ['TEMPLATE', 'types.d.ts'],
+    'python_client': ['-m', 'client', '-c', 'Client', '-t', 'types'],
+    'swift_client': ['-m', 'Routes', '-c', 'Client', '-t', 'Transport',
+                     '-y', '{}', '-z', '{"rpc": "RpcRequest"}'],
+}
+
+_TSD_TEMPLATE = '/*TYPES*/\n/*ROUTES*/\n'
+
+def _get_peak_memory():
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, and in kilobytes elsewhere.
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+def _worker(args):
+    """Measures one target in this process, using the Stone on the path, and
+    prints the result as JSON."""
+    # Imported here, so that the Stone of the revision being measured is used.
+    from stone.compiler import Compiler
+    from stone.lang.tower import TowerOfStone
+
+    with open(args.specs) as f:
+        specs = [tuple(spec) for spec in json.load(f)]
+
+    if args.worker == 'parse':
+        generator_module = None
+    else:
+        try:
+            generator_module = __import__(
+                'stone.target.%s' % args.worker, fromlist=[str('')])
+        except ImportError:
+            print(json.dumps({'unavailable': True}))
+            return
+    generator_args = [a.replace('TEMPLATE', args.template)
+                      for a in _GENERATOR_ARGS.get(args.worker, [])]
+
+    timings = []
+    data_types = 0
+    for i in range(args.runs):
+        output_path = os.path.join(args.output, str(i))
+        start = time.time()
+        api = TowerOfStone(specs).parse()
+        if generator_module is not None:
+            # Only the generator is timed.
+            start = time.time()
+            Compiler(api, generator_module, generator_args, output_path).build()
+        timings.append(time.time() - start)
+        data_types = sum(len(ns.data_types) for ns in api.namespaces.values())
+    print(json.dumps({
+        'seconds': min(timings),
+        'data_types': data_types,
+        'peak_memory': _get_peak_memory(),
+    }))
+
+def _measure(python, stone_path, target, specs_path, tmp_dir, runs):
+    output_path = tempfile.mkdtemp(dir=tmp_dir)
+    env = dict(os.environ)
+    env['PYTHONPATH'] = stone_path
+    try:
+        out = subprocess.check_output(
+            [python, os.path.abspath(__file__),
+             '--worker', target,
+             '--specs', specs_path,
+             '--output', output_path,
+             '--template', os.path.join(tmp_dir, 'template.d.ts'),
+             '--runs', str(runs)],
+            env=env)
+    except subprocess.CalledProcessError:
+        return {'failed': True}
+    finally:
+        shutil.rmtree(output_path)
+    return json.loads(out.decode('utf-8').strip().splitlines()[-1])
+
+def _export_revision(rev, dest):
+    """Extracts the stone package at a git revision into dest."""
+    archive_path = dest + '.tar'
+    with open(archive_path, 'wb') as f:
+        subprocess.check_call(['git', 'archive', '--format=tar', rev, 'stone'],
+                              cwd=_ROOT, stdout=f)
+    with tarfile.open(archive_path) as tar:
+        tar.extractall(dest)
+    os.remove(archive_path)
+
+def _format_result(result):
+    if result.get('unavailable'):
+        return '%24s' % 'unavailable'
+    elif result.get('failed'):
+        return '%24s' % 'failed'
+    memory = result['peak_memory']
+    return '%10.0f types/s %5s MB' % (
+        result['data_types'] / result['seconds'],
+        '?' if memory is None else '%d' % (memory // (1024 * 1024)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--namespaces', type=int, nargs='+', default=[5, 20],
+                        help='Numbers of namespaces to measure with.')
+    parser.add_argument('--structs', type=int, default=20,
+                        help='Structs, unions, and routes per namespace.')
+    parser.add_argument('--depth', type=int, default=3,
+                        help='Depth of the chain of structs in each namespace.')
+    parser.add_argument('-g', '--generator', action='append',
+                        choices=_BUILTIN_GENERATORS,
+                        help='Generator to measure. Defaults to all of them.')
+    parser.add_argument('--no-parse', action='store_true',
+                        help="Don't measure parsing on its own.")
+    parser.add_argument('--rev', action='append', default=[],
+                        help='Git revision to measure. Can be given several times.')
+    parser.add_argument('-n', '--runs', type=int, default=3,
+                        help='Number of runs of each measurement; the best is reported.')
+    parser.add_argument('--python', default=sys.executable,
+                        help='Interpreter to run Stone with.')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--specs', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    parser.add_argument('--template', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args)
+        return
+
+    targets = ([] if args.no_parse else ['parse']) + (
+        args.generator or list(_BUILTIN_GENERATORS))
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(tmp_dir, 'template.d.ts'), 'w') as f:
+            f.write(_TSD_TEMPLATE)
+        if args.rev:
+            stone_paths = []
+            for i, rev in enumerate(args.rev):
+                stone_path = os.path.join(tmp_dir, 'rev%d' % i)
+                _export_revision(rev, stone_path)
+                stone_paths.append(stone_path)
+            labels = args.rev
+        else:
+            stone_paths = [_ROOT]
+            labels = ['working tree']
+
+        print('%-28s' % '' + ''.join('%26s' % label[-24:] for label in labels))
+        for namespaces in args.namespaces:
+            specs = synthetic_specs(namespaces, args.structs, args.depth)
+            specs_path = os.path.join(tmp_dir, 'specs%d.json' % namespaces)
+            with open(specs_path, 'w') as f:
+                json.dump(specs, f)
+            for target in targets:
+                results = [_measure(args.python, stone_path, target, specs_path,
+                                    tmp_dir, args.runs)
+                           for stone_path in stone_paths]
+                line = '%-28s' % ('%s (%d ns)' % (target, namespaces)) + ''.join(
+                    '  ' + _format_result(r) for r in results)
+                if all('seconds' in r for r in results) and len(results) > 1:
+                    # The speedup of the last revision over the first.
+                    line += '  %6.2fx' % (results[0]['seconds'] / results[-1]['seconds'])
+                print(line)
+                sys.stdout.flush()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    main()
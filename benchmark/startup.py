@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Measures the wall-clock startup cost of the Stone CLI.
+
+Two commands are timed, each in a fresh interpreter:
+
+    * ``stone --help``
+    * compiling a single small spec with the ``python_types`` generator
+
+Run it from the root of a checkout, once before and once after a change, and
+compare the reported timings:
+
+    $ python benchmark/startup.py -n 20
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+
+_SPEC = textwrap.dedent("""\
+    namespace bench
+
+    struct Account
+        "A user account."
+        account_id String(min_length=40, max_length=40)
+            "The user's unique account ID."
+        name String
+            "The user's display name."
+        email String?
+        is_paired Boolean = false
+
+    union AccountType
+        basic
+        pro
+        business
+
+    route get_account(Account, AccountType, Void)
+        "Returns the type of an account."
+    """)
+
+def _time_command(cmd, cwd, runs):
+    """Runs cmd `runs` times and returns the sorted wall-clock durations."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [cwd] + [p for p in [env.get('PYTHONPATH')] if p])
+    timings = []
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(runs):
+            start = time.time()
+            subprocess.check_call(cmd, cwd=cwd, env=env, stdout=devnull)
+            timings.append(time.time() - start)
+    return sorted(timings)
+
+def _report(name, timings):
+    print('%-24s min %7.1f ms   median %7.1f ms   max %7.1f ms' % (
+        name,
+        timings[0] * 1000,
+        timings[len(timings) // 2] * 1000,
+        timings[-1] * 1000))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--runs', type=int, default=10,
+                        help='Number of runs of each command.')
+    parser.add_argument('--python', default=sys.executable,
+                        help='Interpreter used to run Stone.')
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        spec_path = os.path.join(tmp_dir, 'bench.stone')
+        with open(spec_path, 'w') as f:
+            f.write(_SPEC)
+        output_path = os.path.join(tmp_dir, 'output')
+
+        stone = [args.python, '-m', 'stone.cli']
+        _report('stone --help',
+                _time_command(stone + ['--help'], root, args.runs))
+        _report('compile one spec',
+                _time_command(stone + ['python_types', output_path, spec_path],
+                              root, args.runs))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    main()
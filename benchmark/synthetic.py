@@ -0,0 +1,125 @@
+"""
+Generates synthetic specs for benchmarks.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+_STONE_CFG = """\
+namespace stone_cfg
+
+struct Route
+    style String = "rpc"
+"""
+
+def synthetic_specs(namespaces, structs, depth=3):
+    """
+    Returns (path, text) specs for a synthetic API. Every namespace imports
+    the previous one, and has:
+
+        * the given number of structs, unions, and routes, with examples that
+          refer to the examples of other types, and docs with references;
+        * aliases;
+        * a chain of structs of the given depth, each extending the previous;
+        * a struct that enumerates its subtypes.
+
+    A stone_cfg namespace declares a "style" route attribute, as needed by the
+    client generators.
+    """
+    specs = [('stone_cfg.stone', _STONE_CFG)]
+    for i in range(namespaces):
+        lines = [
+            'namespace ns%d' % i,
+            '    "Namespace %d. See :route:`r0`."' % i,
+            '',
+        ]
+        if i > 0:
+            lines.extend(['import ns%d' % (i - 1), ''])
+        lines.extend([
+            'alias Id = String(min_length=1, max_length=64)',
+            'alias Ids = List(Id)',
+            '',
+        ])
+
+        # A chain of structs.
+        for k in range(depth):
+            if k == 0:
+                lines.append('struct Level0')
+            else:
+                lines.append('struct Level%d extends Level%d' % (k, k - 1))
+            lines.extend([
+                '    "Level %d of the hierarchy. See :field:`f%d`."' % (k, k),
+                '    f%d String' % k,
+                '        "Field of level %d."' % k,
+                '    example default',
+            ])
+            lines.extend('        f%d = "v%d"' % (l, l) for l in range(k + 1))
+            lines.append('')
+
+        # A struct that enumerates its subtypes.
+        lines.extend([
+            'struct Entry',
+            '    "A file or a folder. See :type:`File`."',
+            '    union',
+            '        file File',
+            '        folder Folder',
+            '    name String',
+            '    example default',
+            '        file = default',
+            '',
+            'struct File extends Entry',
+            '    size UInt64',
+            '    example default',
+            '        name = "a.txt"',
+            '        size = 5',
+            '',
+            'struct Folder extends Entry',
+            '    entries List(Entry)?',
+            '    example default',
+            '        name = "a"',
+            '',
+        ])
+
+        for j in range(structs):
+            lines.extend([
+                'struct S%d' % j,
+                '    "Struct %d of namespace %d. See :type:`U%d` and :route:`r%d`."' % (
+                    j, i, j, j),
+                '    id Id',
+                '        "The ID. Also see :field:`count`."',
+                '    count UInt64 = 0',
+                '    tags Ids?',
+                '    level Level%d?' % (depth - 1),
+                '    entry Entry?',
+            ])
+            if j > 0:
+                lines.append('    peer S%d?' % (j - 1))
+            if i > 0:
+                lines.append('    prev ns%d.S%d?' % (i - 1, j))
+            lines.extend([
+                '    example default',
+                '        id = "abc"',
+                '        count = 3',
+                '        level = default',
+                '        entry = default',
+            ])
+            if j > 0:
+                lines.append('        peer = default')
+            lines.extend([
+                '',
+                'union U%d' % j,
+                '    "Union %d. See :type:`S%d`."' % (j, j),
+                '    a',
+                '        "Tag a. Also see :field:`b`."',
+                '    b S%d' % j,
+                '    c String',
+                '    example default',
+                '        b = default',
+                '',
+                'route r%d(S%d, U%d, Void)' % (j, j, j),
+                '    "Route %d. Returns a :type:`U%d`."' % (j, j),
+                '    attrs',
+                '        style = "rpc"',
+                '',
+            ])
+        specs.append(('ns%d.stone' % i, '\n'.join(lines) + '\n'))
+    return specs
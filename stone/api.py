@@ -10,11 +10,13 @@ from stone.data_type import (
     List as DataTypeList,
     Nullable,
     UserDefined,
+    doc_ref_re,
     doc_unwrap,
     is_alias,
     is_composite_type,
     is_list_type,
     is_nullable_type,
+    is_struct_type,
 )
 
 from stone.data_type import (  # noqa: F401 # pylint: disable=unused-import
@@ -44,6 +46,8 @@ class Api(object):
         self.version = StrictVersion(version)
         self.namespaces = OrderedDict()  # type: NamespaceDict
         self.route_schema = None  # type: typing.Optional[Struct]
+        # Set by normalize().
+        self.graph = None  # type: typing.Optional[ApiGraph]
 
     def ensure_namespace(self, name):
         # type: (str) -> ApiNamespace
@@ -62,7 +66,8 @@ class Api(object):
         # type: () -> None
         """
         Alphabetizes namespaces and routes to make spec parsing order mostly
-        irrelevant.
+        irrelevant, and indexes the references between them in
+        :attr:`graph`. Call it again after modifying the API.
         """
         ordered_namespaces = OrderedDict()  # type: NamespaceDict
         # self.namespaces is currently ordered by declaration order.
@@ -73,6 +78,107 @@ class Api(object):
         for namespace in self.namespaces.values():
             namespace.normalize()
 
+        self.graph = ApiGraph(self)
+
+    def prune_unreachable(self, kept_data_types=()):
+        # type: (typing.Iterable[UserDefined]) -> None
+        """
+        Removes the data types and aliases that aren't transitively referenced
+        by a route or by one of the kept data types, and then the namespaces
+        left empty. References are followed through fields, parent types,
+        enumerated subtypes, aliases, and the ``:type:`` and ``:field:``
+        references in the documentation of the namespaces, routes and kept
+        data types. The API is normalized again afterwards.
+
+        :param kept_data_types: Data types and aliases to keep, along with
+            those they reference, even if no route references them.
+        """
+        if self.graph is None:
+            self.normalize()
+        graph = typing.cast(ApiGraph, self.graph)
+        roots = list(kept_data_types)
+        for namespace in self.namespaces.values():
+            for route in namespace.routes:
+                roots.extend(graph.get_route_references(route))
+        reachable = graph.get_closure(roots)
+        # Generators render references to the data types documentation refers
+        # to, so those are kept as well.
+        while True:
+            doc_references = self._get_doc_references(reachable) - reachable
+            if not doc_references:
+                break
+            reachable = graph.get_closure(reachable | doc_references)
+
+        for namespace_name, namespace in list(self.namespaces.items()):
+            namespace.data_types = [data_type for data_type in namespace.data_types
+                                    if data_type in reachable]
+            namespace.data_type_by_name = {
+                data_type.name: data_type for data_type in namespace.data_types}
+            namespace.aliases = [alias for alias in namespace.aliases
+                                 if alias in reachable]
+            namespace.alias_by_name = {alias.name: alias for alias in namespace.aliases}
+            if not (namespace.routes or namespace.data_types or namespace.aliases):
+                del self.namespaces[namespace_name]
+                continue
+
+            for data_type in namespace.data_types:
+                # Subtypes that don't belong to the enumerated subtypes of
+                # their parent aren't referenced by it.
+                if is_struct_type(data_type):
+                    data_type.subtypes = [subtype for subtype in data_type.subtypes
+                                          if subtype in reachable]
+                else:
+                    data_type._subtypes = [subtype for subtype in data_type._subtypes
+                                           if subtype in reachable]
+
+            # Only keep the imports that are still needed.
+            namespace._imported_namespaces = {}
+            references = []  # type: typing.List[UserDefined]
+            for node in namespace.data_types + namespace.aliases:
+                references.extend(graph.get_references(node))
+            for route in namespace.routes:
+                references.extend(graph.get_route_references(route))
+            for reference in references:
+                if reference.namespace != namespace:
+                    namespace.add_imported_namespace(
+                        reference.namespace,
+                        imported_alias=is_alias(reference),
+                        imported_data_type=not is_alias(reference))
+
+        self.normalize()
+
+    def _get_doc_references(self, data_types):
+        # type: (typing.Set[UserDefined]) -> typing.Set[UserDefined]
+        """
+        Returns the data types that the documentation of the namespaces, the
+        routes, and the given data types, aliases and their fields refers to.
+        """
+        references = set()  # type: typing.Set[UserDefined]
+        for namespace in self.namespaces.values():
+            docs = [namespace.doc] + [route.doc for route in namespace.routes]
+            for data_type in namespace.data_types:
+                if data_type in data_types:
+                    docs.append(data_type.doc)
+                    docs.extend(field.doc for field in data_type.fields)
+            docs.extend(alias.doc for alias in namespace.aliases if alias in data_types)
+            for doc in docs:
+                for match in doc_ref_re.finditer(doc or ''):
+                    tag, val = match.group('tag'), match.group('val')
+                    referenced_namespace = namespace  # type: typing.Optional[ApiNamespace]
+                    if tag == 'type' and '.' in val:
+                        namespace_name, type_name = val.split('.', 1)
+                        referenced_namespace = self.namespaces.get(namespace_name)
+                    elif tag == 'type' or (tag == 'field' and '.' in val):
+                        type_name = val.split('.', 1)[0]
+                    else:
+                        # Fields referred to without a type name belong to the
+                        # data type being documented, and routes are kept.
+                        continue
+                    if referenced_namespace and \
+                            type_name in referenced_namespace.data_type_by_name:
+                        references.add(referenced_namespace.data_type_by_name[type_name])
+        return references
+
     def add_route_schema(self, route_schema):
         # type: (Struct) -> None
         assert self.route_schema is None
@@ -83,6 +189,8 @@ class _ImportReason(object):
     Tracks the reason a namespace was imported.
     """
 
+    __slots__ = ('alias', 'data_type')
+
     def __init__(self):
         # type: () -> None
         self.alias = False
@@ -105,6 +213,8 @@ class ApiNamespace(object):
         self.aliases = []               # type: typing.List[Alias]
         self.alias_by_name = {}         # type: typing.Dict[str, Alias]
         self._imported_namespaces = {}  # type: typing.Dict[ApiNamespace, _ImportReason]
+        # Set while the namespace is indexed by an up-to-date ApiGraph.
+        self._graph = None  # type: typing.Optional[ApiGraph]
 
     def add_doc(self, docstring):
         # type: (six.text_type) -> None
@@ -127,16 +237,19 @@ class ApiNamespace(object):
         # type: (ApiRoute) -> None
         self.routes.append(route)
         self.route_by_name[route.name] = route
+        self._graph = None
 
     def add_data_type(self, data_type):
         # type: (UserDefined) -> None
         self.data_types.append(data_type)
         self.data_type_by_name[data_type.name] = data_type
+        self._graph = None
 
     def add_alias(self, alias):
         # type: (Alias) -> None
         self.aliases.append(alias)
         self.alias_by_name[alias.name] = alias
+        self._graph = None
 
     def add_imported_namespace(self,
                                namespace,
@@ -160,6 +273,7 @@ class ApiNamespace(object):
             reason.alias = True
         if imported_data_type:
             reason.data_type = True
+        self._graph = None
 
     def linearize_data_types(self):
         # type: () -> typing.List[UserDefined]
@@ -170,6 +284,12 @@ class ApiNamespace(object):
         order so that composite types that reference other composite types are
         defined in the correct order.
         """
+        if self._graph is not None:
+            return self._graph.linearize_data_types(self)
+        return self._linearize_data_types()
+
+    def _linearize_data_types(self):
+        # type: () -> typing.List[UserDefined]
         linearized_data_types = []
         seen_data_types = set()  # type: typing.Set[UserDefined]
 
@@ -197,6 +317,12 @@ class ApiNamespace(object):
         ordered to ensure that if they reference other aliases those aliases
         come earlier in the list.
         """
+        if self._graph is not None:
+            return self._graph.linearize_aliases(self)
+        return self._linearize_aliases()
+
+    def _linearize_aliases(self):
+        # type: () -> typing.List[Alias]
         linearized_aliases = []
         seen_aliases = set()  # type: typing.Set[Alias]
 
@@ -224,6 +350,12 @@ class ApiNamespace(object):
         data type is referenced, then the contained data type is returned
         assuming it's a user-defined type.
         """
+        if self._graph is not None:
+            return self._graph.get_route_io_data_types(self)
+        return self._get_route_io_data_types()
+
+    def _get_route_io_data_types(self):
+        # type: () -> typing.List[UserDefined]
         data_types = set()  # type: typing.Set[UserDefined]
         for route in self.routes:
             for dtype in (route.arg_data_type, route.result_data_type,
@@ -250,6 +382,13 @@ class ApiNamespace(object):
         Returns:
             List[Namespace]: A list of imported namespaces.
         """
+        if self._graph is not None:
+            return self._graph.get_imported_namespaces(
+                self, must_have_imported_data_type)
+        return self._get_imported_namespaces(must_have_imported_data_type)
+
+    def _get_imported_namespaces(self, must_have_imported_data_type):
+        # type: (bool) -> typing.List[ApiNamespace]
         imported_namespaces = []
         for imported_namespace, reason in self._imported_namespaces.items():
             if must_have_imported_data_type and not reason.data_type:
@@ -282,6 +421,7 @@ class ApiNamespace(object):
         self.routes.sort(key=lambda route: route.name)
         self.data_types.sort(key=lambda data_type: data_type.name)
         self.aliases.sort(key=lambda alias: alias.name)
+        self._graph = None
 
     def __repr__(self):
         # type: () -> str
@@ -293,6 +433,11 @@ class ApiRoute(object):
     Represents an API endpoint.
     """
 
+    # A __dict__ is only created if attributes other than these are set.
+    __slots__ = ('name', '_token', 'deprecated', 'raw_doc', 'doc',
+                 'arg_data_type', 'result_data_type', 'error_data_type',
+                 'attrs', '__dict__')
+
     def __init__(self,
                  name,
                  token):
@@ -343,6 +488,8 @@ class ApiRoute(object):
 
 class DeprecationInfo(object):
 
+    __slots__ = ('by',)
+
     def __init__(self, by=None):
         # type: (typing.Optional[ApiRoute]) -> None
         """
@@ -350,3 +497,195 @@ class DeprecationInfo(object):
         """
         assert by is None or isinstance(by, ApiRoute), repr(by)
         self.by = by
+
+
+def _unwrap_containers(data_type):
+    # type: (DataType) -> DataType
+    """Strips any List and Nullable wrappers from a data type."""
+    while is_list_type(data_type) or is_nullable_type(data_type):
+        data_type = typing.cast(typing.Union[DataTypeList, Nullable], data_type).data_type
+    return data_type
+
+
+class ApiGraph(object):
+    """
+    An index of the references between the data types, aliases, routes, and
+    namespaces of an API, computed once by :meth:`Api.normalize`.
+
+    The nodes of the type graph are the user-defined data types and aliases.
+    A node references the nodes found, through any List or Nullable, in its
+    fields, its parent type, its enumerated subtypes, and, for an alias, its
+    target. A route references the nodes of its argument, result, and error.
+
+    The index describes the API at the time it was built. After modifying the
+    API, call :meth:`Api.normalize` again to rebuild it.
+    """
+
+    def __init__(self, api):
+        # type: (Api) -> None
+        self._references = {}  # type: typing.Dict[UserDefined, typing.Tuple[UserDefined, ...]]
+        referencing = OrderedDict()  # type: typing.Dict[UserDefined, typing.List[UserDefined]]
+        self._route_references = {}  # type: typing.Dict[ApiRoute, typing.Tuple[UserDefined, ...]]
+        referencing_routes = {}  # type: typing.Dict[UserDefined, typing.List[ApiRoute]]
+        # Computed on first use, since they are quadratic in the size of the API.
+        self._route_closures = {}  # type: typing.Dict[ApiRoute, typing.FrozenSet[UserDefined]]
+        self._importing_namespaces = {}  # type: typing.Dict[ApiNamespace, typing.List]
+        self._linearized_data_types = {}  # type: typing.Dict[ApiNamespace, typing.Tuple]
+        self._linearized_aliases = {}  # type: typing.Dict[ApiNamespace, typing.Tuple]
+        self._route_io_data_types = {}  # type: typing.Dict[ApiNamespace, typing.Tuple]
+        # Keyed by the namespace and must_have_imported_data_type.
+        self._imported_namespaces = {}  # type: typing.Dict[typing.Tuple, typing.Tuple]
+
+        for namespace in api.namespaces.values():
+            for data_type in namespace.data_types:
+                self._references[data_type] = self._get_direct_references(data_type)
+            for alias in namespace.aliases:
+                self._references[alias] = self._get_direct_references(alias)
+            self._importing_namespaces.setdefault(namespace, [])
+        for node, references in self._references.items():
+            for reference in references:
+                referencing.setdefault(reference, []).append(node)
+        self._referencing = {
+            node: tuple(nodes) for node, nodes in referencing.items()
+        }  # type: typing.Dict[UserDefined, typing.Tuple[UserDefined, ...]]
+
+        for namespace in api.namespaces.values():
+            for route in namespace.routes:
+                references = self._get_route_references(route)
+                self._route_references[route] = references
+                for reference in references:
+                    referencing_routes.setdefault(reference, []).append(route)
+            for imported_namespace in namespace._get_imported_namespaces(False):
+                self._importing_namespaces.setdefault(
+                    imported_namespace, []).append(namespace)
+        self._referencing_routes = {
+            node: tuple(routes) for node, routes in referencing_routes.items()
+        }  # type: typing.Dict[UserDefined, typing.Tuple[ApiRoute, ...]]
+
+        for namespace in api.namespaces.values():
+            self._linearized_data_types[namespace] = tuple(
+                namespace._linearize_data_types())
+            self._linearized_aliases[namespace] = tuple(namespace._linearize_aliases())
+            self._route_io_data_types[namespace] = tuple(
+                namespace._get_route_io_data_types())
+            for must_have_imported_data_type in (False, True):
+                self._imported_namespaces[namespace, must_have_imported_data_type] = tuple(
+                    namespace._get_imported_namespaces(must_have_imported_data_type))
+            namespace._graph = self
+
+    @staticmethod
+    def _get_direct_references(node):
+        # type: (UserDefined) -> typing.Tuple[UserDefined, ...]
+        if is_alias(node):
+            data_types = [typing.cast(Alias, node).data_type]
+        else:
+            data_types = [field.data_type for field in node.fields]
+            if node.parent_type:
+                data_types.append(node.parent_type)
+            if is_struct_type(node) and node.has_enumerated_subtypes():
+                data_types.extend(subtype_field.data_type for subtype_field
+                                  in node.get_enumerated_subtypes())
+        return ApiGraph._get_nodes(data_types)
+
+    @staticmethod
+    def _get_route_references(route):
+        # type: (ApiRoute) -> typing.Tuple[UserDefined, ...]
+        return ApiGraph._get_nodes(
+            [route.arg_data_type, route.result_data_type, route.error_data_type])
+
+    @staticmethod
+    def _get_nodes(data_types):
+        # type: (typing.List[DataType]) -> typing.Tuple[UserDefined, ...]
+        nodes = []  # type: typing.List[UserDefined]
+        for data_type in data_types:
+            data_type = _unwrap_containers(data_type)
+            if ((is_composite_type(data_type) or is_alias(data_type)) and
+                    data_type not in nodes):
+                nodes.append(typing.cast(UserDefined, data_type))
+        return tuple(nodes)
+
+    def get_references(self, data_type):
+        # type: (UserDefined) -> typing.Tuple[UserDefined, ...]
+        """
+        Returns the data types and aliases that a data type or alias directly
+        references.
+        """
+        return self._references[data_type]
+
+    def get_referencing_data_types(self, data_type):
+        # type: (UserDefined) -> typing.Tuple[UserDefined, ...]
+        """
+        Returns the data types and aliases that directly reference a data type
+        or alias.
+        """
+        return self._referencing.get(data_type, ())
+
+    def get_route_references(self, route):
+        # type: (ApiRoute) -> typing.Tuple[UserDefined, ...]
+        """
+        Returns the data types and aliases that a route directly references as
+        its argument, result, or error.
+        """
+        return self._route_references[route]
+
+    def get_referencing_routes(self, data_type):
+        # type: (UserDefined) -> typing.Tuple[ApiRoute, ...]
+        """
+        Returns the routes that directly reference a data type or alias as
+        their argument, result, or error.
+        """
+        return self._referencing_routes.get(data_type, ())
+
+    def get_closure(self, data_types):
+        # type: (typing.Iterable[UserDefined]) -> typing.Set[UserDefined]
+        """
+        Returns the data types and aliases that are transitively referenced by
+        the given ones, including themselves.
+        """
+        closure = set()  # type: typing.Set[UserDefined]
+        pending = list(data_types)
+        while pending:
+            node = pending.pop()
+            if node not in closure:
+                closure.add(node)
+                pending.extend(self._references[node])
+        return closure
+
+    def get_route_closure(self, route):
+        # type: (ApiRoute) -> typing.FrozenSet[UserDefined]
+        """
+        Returns the data types and aliases that a route transitively
+        references.
+        """
+        closure = self._route_closures.get(route)
+        if closure is None:
+            closure = frozenset(self.get_closure(self._route_references[route]))
+            self._route_closures[route] = closure
+        return closure
+
+    def get_importing_namespaces(self, namespace):
+        # type: (ApiNamespace) -> typing.List[ApiNamespace]
+        """
+        Returns the namespaces that import a namespace, in ASCII order by name.
+        """
+        return list(self._importing_namespaces[namespace])
+
+    def linearize_data_types(self, namespace):
+        # type: (ApiNamespace) -> typing.List[UserDefined]
+        """See :meth:`ApiNamespace.linearize_data_types`."""
+        return list(self._linearized_data_types[namespace])
+
+    def linearize_aliases(self, namespace):
+        # type: (ApiNamespace) -> typing.List[Alias]
+        """See :meth:`ApiNamespace.linearize_aliases`."""
+        return list(self._linearized_aliases[namespace])
+
+    def get_route_io_data_types(self, namespace):
+        # type: (ApiNamespace) -> typing.List[UserDefined]
+        """See :meth:`ApiNamespace.get_route_io_data_types`."""
+        return list(self._route_io_data_types[namespace])
+
+    def get_imported_namespaces(self, namespace, must_have_imported_data_type=False):
+        # type: (ApiNamespace, bool) -> typing.List[ApiNamespace]
+        """See :meth:`ApiNamespace.get_imported_namespaces`."""
+        return list(self._imported_namespaces[namespace, must_have_imported_data_type])
@@ -0,0 +1,169 @@
+"""
+Bookkeeping for incremental builds.
+
+The build manifest is a JSON file kept in the output folder. It records the
+paths of the files that each generator produced, so that files that are no
+longer produced can be removed. For each generator that supports incremental
+builds, it also records the fingerprint of every namespace at the time its
+output was generated, along with the paths of the files generated for it.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import json
+import logging
+import os
+import typing  # noqa: F401 # pylint: disable=unused-import
+
+_MANIFEST_VERSION = 1
+
+__MYPY = False
+if __MYPY:
+    # Map of namespace name to {'fingerprint': str, 'files': [str, ...]}.
+    NamespaceOutputs = typing.Dict[typing.Text, typing.Dict[typing.Text, typing.Any]]
+
+class BuildManifest(object):
+    """
+    The build manifest of an output folder. Nothing is written to disk until
+    :meth:`save` is called.
+    """
+
+    filename = '.stone_manifest.json'
+
+    def __init__(self, build_path):
+        # type: (typing.Text) -> None
+        self.path = os.path.join(build_path, self.filename)
+        self._logger = logging.getLogger('stone.build_manifest')
+        self._generators = {}  # type: typing.Dict[typing.Text, typing.Any]
+        self._dirty = False
+        # Files produced by the generators as of the last save.
+        self._previous_files = set()  # type: typing.Set[typing.Text]
+        try:
+            with open(self.path, 'rb') as f:
+                manifest = json.loads(f.read().decode('utf-8'))
+            if manifest.get('version') == _MANIFEST_VERSION:
+                self._generators = manifest['generators']
+                self._previous_files = self._get_all_files()
+        except (IOError, OSError):
+            pass
+        except (ValueError, KeyError, AttributeError, TypeError):
+            self._logger.warning('Ignoring malformed build manifest %s', self.path)
+            self._generators = {}
+
+    def get_namespace_outputs(self, generator_name, salt):
+        # type: (typing.Text, typing.Text) -> NamespaceOutputs
+        """
+        Returns the outputs recorded for a generator by the previous build.
+        Nothing is returned if the previous build used a different salt, i.e.
+        a different version of the generator or different arguments.
+        """
+        entry = self._generators.get(generator_name)
+        if entry and entry.get('salt') == salt:
+            return entry['namespaces']
+        return {}
+
+    def set_namespace_outputs(self, generator_name, salt, namespace_outputs):
+        # type: (typing.Text, typing.Text, NamespaceOutputs) -> None
+        entry = self._generators.setdefault(generator_name, {})
+        entry['salt'] = salt
+        entry['namespaces'] = namespace_outputs
+        self._dirty = True
+
+    def remove_namespace_outputs(self, generator_name):
+        # type: (typing.Text) -> None
+        entry = self._generators.get(generator_name, {})
+        if 'namespaces' in entry:
+            del entry['salt']
+            del entry['namespaces']
+            self._dirty = True
+
+    def set_files(self, generator_name, files):
+        # type: (typing.Text, typing.List[typing.Text]) -> None
+        """Records the relative paths of the files a generator produced."""
+        entry = self._generators.setdefault(generator_name, {})
+        files = sorted(set(files))
+        if entry.get('files') != files:
+            entry['files'] = files
+            self._dirty = True
+
+    def get_stale_files(self):
+        # type: () -> typing.List[typing.Text]
+        """
+        Returns the relative paths of the files that the previous build
+        produced, but that no generator has produced since. Generators that
+        haven't run since keep their files.
+        """
+        return sorted(self._previous_files - self._get_all_files())
+
+    def _get_all_files(self):
+        # type: () -> typing.Set[typing.Text]
+        files = set()  # type: typing.Set[typing.Text]
+        for entry in self._generators.values():
+            files.update(entry.get('files', []))
+        return files
+
+    def save(self):
+        # type: () -> None
+        """Writes the manifest to disk if it was modified."""
+        if not self._dirty:
+            return
+        data = json.dumps(
+            {'version': _MANIFEST_VERSION, 'generators': self._generators},
+            indent=2, separators=(',', ': '), sort_keys=True)
+        with open(self.path, 'wb') as f:
+            f.write(data.encode('utf-8'))
+        self._dirty = False
+        self._previous_files = self._get_all_files()
+
+class IncrementalBuild(object):
+    """
+    Tracks which namespaces a generator can skip in the current build and
+    which files it writes for the others.
+    """
+
+    def __init__(self, target_folder_path, fingerprints, previous_outputs):
+        # type: (typing.Text, typing.Dict[typing.Text, typing.Text], NamespaceOutputs) -> None
+        """
+        Args:
+            target_folder_path (str): Output folder of the generator.
+            fingerprints (Dict[str, str]): Fingerprints of the namespaces in
+                the API being generated.
+            previous_outputs: Outputs recorded by the previous build.
+        """
+        self.target_folder_path = target_folder_path
+        self.fingerprints = fingerprints
+        self.previous_outputs = previous_outputs
+        self.namespace_outputs = {}  # type: NamespaceOutputs
+
+    def is_namespace_output_current(self, namespace_name):
+        # type: (typing.Text) -> bool
+        """
+        Whether the files generated for a namespace by the previous build can
+        be kept as is. That's the case if the namespace and its imports are
+        unchanged and all the files still exist.
+        """
+        previous = self.previous_outputs.get(namespace_name)
+        if (previous is None or
+                previous['fingerprint'] != self.fingerprints.get(namespace_name)):
+            return False
+        for relative_path in previous['files']:
+            if not os.path.exists(
+                    os.path.join(self.target_folder_path, relative_path)):
+                return False
+        self.namespace_outputs[namespace_name] = previous
+        return True
+
+    def start_namespace(self, namespace_name):
+        # type: (typing.Text) -> None
+        """Starts recording the files generated for a namespace."""
+        self.namespace_outputs[namespace_name] = {
+            'fingerprint': self.fingerprints[namespace_name],
+            'files': [],
+        }
+
+    def add_file(self, namespace_name, relative_path):
+        # type: (typing.Text, typing.Text) -> None
+        files = self.namespace_outputs[namespace_name]['files']
+        relative_path = os.path.normpath(relative_path)
+        if relative_path not in files:
+            files.append(relative_path)
@@ -5,12 +5,16 @@ A command-line interface for StoneAPI.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import codecs
+import contextlib
 import imp
 import io
 import logging
 import os
+import shlex
+import shutil
 import six
 import sys
+import tempfile
 import traceback
 
 # Hack to get around some of Python 2's standard library modules that
@@ -23,9 +27,12 @@ import typing  # noqa: F401 # pylint: disable=unused-import
 argparse = importlib.import_module(str('argparse'))  # type: typing.Any
 
 from .cli_helpers import parse_route_attr_filter
-from .compiler import Compiler, GeneratorException
-from .lang.exception import InvalidSpec
+from .compiler import BuildTarget, Compiler, GeneratorException
+from .ir import IR_EXTENSION, InvalidIR, read_ir, write_ir
+from .lang.exception import InvalidSpec, InvalidSpecs
 from .lang.tower import TowerOfStone
+from .profiling import Profiler
+from .watch import SpecWatcher
 
 # These generators come by default
 _builtin_generators = (
@@ -60,16 +67,20 @@ _cmdline_parser.add_argument(
 _generator_help = (
     'Either the name of a built-in generator or the path to a generator '
     'module. Paths to generator modules must end with a .stoneg.py extension. '
-    'The following generators are built-in: ' + ', '.join(_builtin_generators))
+    'The following generators are built-in: ' + ', '.join(_builtin_generators) +
+    '. Use "compile-ir" to write the resolved API to the IR file named by '
+    'the output argument instead.')
 _cmdline_parser.add_argument(
     'generator',
+    nargs='?',
     type=six.text_type,
-    help=_generator_help,
+    help=_generator_help + ' Omit when using --target.',
 )
 _cmdline_parser.add_argument(
     'output',
+    nargs='?',
     type=six.text_type,
-    help='The folder to save generated files to.',
+    help='The folder to save generated files to. Omit when using --target.',
 )
 _cmdline_parser.add_argument(
     'spec',
@@ -78,7 +89,8 @@ _cmdline_parser.add_argument(
     help=('Path to API specifications. Each must have a .stone extension. '
           'If omitted or set to "-", the spec is read from stdin. Multiple '
           'namespaces can be provided over stdin by concatenating multiple '
-          'specs together.'),
+          'specs together. Alternatively, the path to a single IR file with a '
+          '%s extension written by "compile-ir".' % IR_EXTENSION),
 )
 _cmdline_parser.add_argument(
     '--clean-build',
@@ -108,6 +120,77 @@ _cmdline_parser.add_argument(
           'attributes defined in stone_cfg.Route. Note that you can filter '
           '(-f) by attributes that are not listed here.'),
 )
+_cmdline_parser.add_argument(
+    '--prune-unreachable',
+    action='store_true',
+    help=('After filtering routes, remove the data types and aliases that are '
+          'not referenced, directly or transitively, by a remaining route or '
+          'by a type given with --keep-type. Namespaces left empty are '
+          'removed too.'),
+)
+_cmdline_parser.add_argument(
+    '--keep-type',
+    action='append',
+    type=six.text_type,
+    default=[],
+    metavar='NAMESPACE.NAME',
+    help=('A data type or alias kept by --prune-unreachable, along with the '
+          'types it references, even if no route references it. Can be given '
+          'several times.'),
+)
+_cmdline_parser.add_argument(
+    '--cache-dir',
+    type=six.text_type,
+    help=('Directory for caching the parsed form of specs across runs. Specs '
+          'whose contents have not changed are not re-parsed.'),
+)
+_cmdline_parser.add_argument(
+    '-j',
+    '--jobs',
+    type=int,
+    default=1,
+    help=('Number of processes used to parse specs and to run generators. '
+          'Use 0 for one process per CPU. Defaults to 1.'),
+)
+_cmdline_parser.add_argument(
+    '-t',
+    '--target',
+    action='append',
+    type=six.text_type,
+    default=[],
+    help=('Run a generator in the form GENERATOR:OUTPUT[:ARGS], where ARGS '
+          'are the generator-specific arguments, quoted as in a shell. Can be '
+          'given several times to run several generators against a single '
+          'parse of the specs. When used, the generator and output arguments '
+          'are omitted.'),
+)
+_cmdline_parser.add_argument(
+    '--profile',
+    type=six.text_type,
+    metavar='REPORT',
+    help=('Write a JSON report with the wall time, CPU time, and peak memory '
+          'of each phase of the build, each spec, each generator, and each '
+          'output file to REPORT. In watch mode, it is rewritten after every '
+          'build.'),
+)
+_cmdline_parser.add_argument(
+    '--cprofile-dir',
+    type=six.text_type,
+    help=('Also run each generator under cProfile, and save the statistics '
+          'of each to a .prof file in this directory.'),
+)
+_cmdline_parser.add_argument(
+    '--watch',
+    action='store_true',
+    help=('Keep running after the build, and rebuild whenever a spec changes. '
+          'Unchanged specs are not re-parsed.'),
+)
+_cmdline_parser.add_argument(
+    '--socket',
+    type=six.text_type,
+    help=('Path of a UNIX socket on which to accept commands while watching: '
+          '"build", "rebuild", "status", or "stop". Implies --watch.'),
+)
 
 _filter_ns_group = _cmdline_parser.add_mutually_exclusive_group()
 _filter_ns_group.add_argument(
@@ -153,6 +236,23 @@ def main():
 
     logging.basicConfig(level=logging_level)
 
+    if args.target:
+        # All positional arguments are specs.
+        args.spec = [arg for arg in (args.generator, args.output)
+                     if arg is not None] + args.spec
+        args.generator = args.output = None
+        if generator_args:
+            print('error: Pass generator arguments as part of each --target.',
+                  file=sys.stderr)
+            sys.exit(1)
+    elif args.output is None:
+        _cmdline_parser.error('the generator and output arguments are required')
+
+    if args.watch or args.socket:
+        _watch(args, generator_args, debug)
+        return
+
+    profiler = _make_profiler(args)
     if args.spec and args.spec[0].startswith('+') and args.spec[0].endswith('.py'):
         # Hack: Special case for defining a spec in Python for testing purposes
         # Use this if you want to define a Stone spec using a Python module.
@@ -164,188 +264,382 @@ def main():
             print('error: Could not import API description due to:',
                   e, file=sys.stderr)
             sys.exit(1)
+    elif args.generator == 'compile-ir':
+        api = _parse_specs(args, _read_specs(args, debug), debug, profiler=profiler,
+                           release_tokens=True)
+        write_ir(api, args.output)
+        _write_profile(args, profiler)
+        return api
     else:
-        if args.spec:
-            specs = []
-            read_from_stdin = False
-            for spec_path in args.spec:
-                if spec_path == '-':
-                    read_from_stdin = True
-                elif not spec_path.endswith('.stone'):
-                    print("error: Specification '%s' must have a .stone extension."
-                          % spec_path,
-                          file=sys.stderr)
-                    sys.exit(1)
-                elif not os.path.exists(spec_path):
-                    print("error: Specification '%s' cannot be found." % spec_path,
-                          file=sys.stderr)
-                    sys.exit(1)
-                else:
-                    with open(spec_path) as f:
-                        specs.append((spec_path, f.read()))
-            if read_from_stdin and specs:
-                print("error: Do not specify stdin and specification files "
-                      "simultaneously.", file=sys.stderr)
-                sys.exit(1)
+        route_filter = _parse_route_filter(args, debug)
+        api = _load_api(args, route_filter, debug, profiler=profiler)
 
-        if not args.spec or read_from_stdin:
-            specs = []
-            if debug:
-                print('Reading specification from stdin.')
+    targets = _load_targets(args, generator_args)
+    _compile(args, api, targets, args.clean_build, profiler)
+    _write_profile(args, profiler)
 
-            if six.PY2:
-                UTF8Reader = codecs.getreader('utf8')
-                sys.stdin = UTF8Reader(sys.stdin)
-                stdin_text = sys.stdin.read()
-            else:
-                stdin_buffer = sys.stdin.buffer  # pylint: disable=no-member,useless-suppression
-                stdin_text = io.TextIOWrapper(stdin_buffer, encoding='utf-8').read()
+    if not sys.argv[0].endswith('stone'):
+        # If we aren't running from an entry_point, then return api to make it
+        # easier to do debugging.
+        return api
 
-            parts = stdin_text.split('namespace')
-            if len(parts) == 1:
-                specs.append(('stdin.1', parts[0]))
-            else:
-                specs.append(
-                    ('stdin.1', '%snamespace%s' % (parts.pop(0), parts.pop(0))))
-                while parts:
-                    specs.append(('stdin.%s' % (len(specs) + 1),
-                                  'namespace%s' % parts.pop(0)))
-
-        if args.filter_by_route_attr:
-            route_filter, route_filter_errors = parse_route_attr_filter(
-                args.filter_by_route_attr, debug)
-            if route_filter_errors:
-                print('Error(s) in route filter:', file=sys.stderr)
-                for err in route_filter_errors:
-                    print(err, file=sys.stderr)
+def _read_specs(args, debug):
+    """Returns a list of (path, text) for each spec named on the command
+    line, or read from stdin."""
+    if args.spec:
+        specs = []
+        read_from_stdin = False
+        for spec_path in args.spec:
+            if spec_path == '-':
+                read_from_stdin = True
+            elif not spec_path.endswith('.stone'):
+                print("error: Specification '%s' must have a .stone extension."
+                      % spec_path,
+                      file=sys.stderr)
                 sys.exit(1)
+            elif not os.path.exists(spec_path):
+                print("error: Specification '%s' cannot be found." % spec_path,
+                      file=sys.stderr)
+                sys.exit(1)
+            else:
+                with open(spec_path) as f:
+                    specs.append((spec_path, f.read()))
+        if read_from_stdin and specs:
+            print("error: Do not specify stdin and specification files "
+                  "simultaneously.", file=sys.stderr)
+            sys.exit(1)
 
-        else:
-            route_filter = None
+    if not args.spec or read_from_stdin:
+        specs = []
+        if debug:
+            print('Reading specification from stdin.')
 
-        # TODO: Needs version
-        tower = TowerOfStone(specs, debug=debug)
+        if six.PY2:
+            UTF8Reader = codecs.getreader('utf8')
+            sys.stdin = UTF8Reader(sys.stdin)
+            stdin_text = sys.stdin.read()
+        else:
+            stdin_buffer = sys.stdin.buffer  # pylint: disable=no-member,useless-suppression
+            stdin_text = io.TextIOWrapper(stdin_buffer, encoding='utf-8').read()
 
-        try:
-            api = tower.parse()
-        except InvalidSpec as e:
-            print('%s:%s: error: %s' % (e.path, e.lineno, e.msg), file=sys.stderr)
-            if debug:
-                print('A traceback is included below in case this is a bug in '
-                      'Stone.\n', traceback.format_exc(), file=sys.stderr)
-            sys.exit(1)
-        if api is None:
-            print('You must fix the above parsing errors for generation to '
-                  'continue.', file=sys.stderr)
+        parts = stdin_text.split('namespace')
+        if len(parts) == 1:
+            specs.append(('stdin.1', parts[0]))
+        else:
+            specs.append(
+                ('stdin.1', '%snamespace%s' % (parts.pop(0), parts.pop(0))))
+            while parts:
+                specs.append(('stdin.%s' % (len(specs) + 1),
+                              'namespace%s' % parts.pop(0)))
+
+    return specs
+
+def _parse_route_filter(args, debug):
+    """Returns the route filter expression from the command line, if any."""
+    if args.filter_by_route_attr:
+        route_filter, route_filter_errors = parse_route_attr_filter(
+            args.filter_by_route_attr, debug)
+        if route_filter_errors:
+            print('Error(s) in route filter:', file=sys.stderr)
+            for err in route_filter_errors:
+                print(err, file=sys.stderr)
             sys.exit(1)
 
-        if args.whitelist_namespace_routes:
-            for namespace_name in args.whitelist_namespace_routes:
-                if namespace_name not in api.namespaces:
-                    print('error: Whitelisted namespace missing from spec: %s' %
-                          namespace_name, file=sys.stderr)
-                    sys.exit(1)
-            for namespace in api.namespaces.values():
-                if namespace.name not in args.whitelist_namespace_routes:
-                    namespace.routes = []
-                    namespace.route_by_name = {}
-
-        if args.blacklist_namespace_routes:
-            for namespace_name in args.blacklist_namespace_routes:
-                if namespace_name not in api.namespaces:
-                    print('error: Blacklisted namespace missing from spec: %s' %
-                          namespace_name, file=sys.stderr)
-                    sys.exit(1)
-                else:
-                    api.namespaces[namespace_name].routes = []
-                    api.namespaces[namespace_name].route_by_name = {}
-
-        if route_filter:
-            for namespace in api.namespaces.values():
-                filtered_routes = []
-                for route in namespace.routes:
-                    if route_filter.eval(route):
-                        filtered_routes.append(route)
-                    else:
-                        del namespace.route_by_name[route.name]
-                namespace.routes = filtered_routes
-
-        if args.attribute:
-            attrs = set(args.attribute)
-            if ':all' in attrs:
-                attrs = {field.name for field in api.route_schema.fields}
-        else:
-            attrs = set()
+    else:
+        route_filter = None
+
+    return route_filter
+
+def _load_api(args, route_filter, debug, cache_dir=None, profiler=None):
+    """Reads the API description from the IR file or specs on the command
+    line, and applies the route and attribute filters. Exits on error."""
+    if args.spec and any(p.endswith(IR_EXTENSION) for p in args.spec):
+        with _profile_phase(profiler, 'read_ir'):
+            api = _read_ir(args)
+    else:
+        api = _parse_specs(args, _read_specs(args, debug), debug, cache_dir, profiler)
+    with _profile_phase(profiler, '_filter_api'):
+        _filter_api(args, api, route_filter)
+    return api
+
+def _read_ir(args):
+    """Reads the API description from the IR file on the command line."""
+    if len(args.spec) > 1:
+        print('error: An IR file cannot be combined with other specifications.',
+              file=sys.stderr)
+        sys.exit(1)
+    ir_path = args.spec[0]
+    if not os.path.exists(ir_path):
+        print("error: IR file '%s' cannot be found." % ir_path, file=sys.stderr)
+        sys.exit(1)
+    try:
+        return read_ir(ir_path)
+    except InvalidIR as e:
+        print('%s: error: %s' % (e.path, e.msg), file=sys.stderr)
+        sys.exit(1)
+
+def _parse_specs(args, specs, debug, cache_dir=None, profiler=None,
+                 release_tokens=False):
+    """Parses specs into an API description. Exits on error."""
+    # TODO: Needs version
+    tower = TowerOfStone(specs, debug=debug, cache_dir=cache_dir or args.cache_dir,
+                         jobs=args.jobs, profiler=profiler,
+                         release_tokens=release_tokens)
 
+    try:
+        api = tower.parse()
+    except InvalidSpec as e:
+        errors = e.errors if isinstance(e, InvalidSpecs) else [e]
+        for error in errors:
+            print('%s:%s: error: %s' % (error.path, error.lineno, error.msg),
+                  file=sys.stderr)
+        if debug:
+            print('A traceback is included below in case this is a bug in '
+                  'Stone.\n', traceback.format_exc(), file=sys.stderr)
+        sys.exit(1)
+    if api is None:
+        print('You must fix the above parsing errors for generation to '
+              'continue.', file=sys.stderr)
+        sys.exit(1)
+    return api
+
+def _filter_api(args, api, route_filter):
+    """Applies the route and attribute filters from the command line to the
+    API description. Exits on error."""
+    # Whether routes were removed, which requires reindexing the API.
+    routes_removed = False
+
+    if args.whitelist_namespace_routes:
+        for namespace_name in args.whitelist_namespace_routes:
+            if namespace_name not in api.namespaces:
+                print('error: Whitelisted namespace missing from spec: %s' %
+                      namespace_name, file=sys.stderr)
+                sys.exit(1)
         for namespace in api.namespaces.values():
-            for route in namespace.routes:
-                for k in list(route.attrs.keys()):
-                    if k not in attrs:
-                        del route.attrs[k]
-
-        # Remove attrs that weren't specified from the route schema
-        for field in api.route_schema.fields[:]:
-            if field.name not in attrs:
-                api.route_schema.fields.remove(field)
-                del api.route_schema._fields_by_name[field.name]
+            if namespace.name not in args.whitelist_namespace_routes:
+                routes_removed = routes_removed or bool(namespace.routes)
+                namespace.routes = []
+                namespace.route_by_name = {}
+
+    if args.blacklist_namespace_routes:
+        for namespace_name in args.blacklist_namespace_routes:
+            if namespace_name not in api.namespaces:
+                print('error: Blacklisted namespace missing from spec: %s' %
+                      namespace_name, file=sys.stderr)
+                sys.exit(1)
             else:
-                attrs.remove(field.name)
+                routes_removed = routes_removed or bool(api.namespaces[namespace_name].routes)
+                api.namespaces[namespace_name].routes = []
+                api.namespaces[namespace_name].route_by_name = {}
 
-        # Error if specified attr isn't even a field in the route schema
-        if attrs:
-            attr = attrs.pop()
-            print('error: Attribute not defined in stone_cfg.Route: %s' %
-                  attr, file=sys.stderr)
-            sys.exit(1)
+    if route_filter:
+        for namespace in api.namespaces.values():
+            filtered_routes = []
+            for route in namespace.routes:
+                if route_filter.eval(route):
+                    filtered_routes.append(route)
+                else:
+                    del namespace.route_by_name[route.name]
+                    routes_removed = True
+            namespace.routes = filtered_routes
+
+    if args.attribute:
+        attrs = set(args.attribute)
+        if ':all' in attrs:
+            attrs = {field.name for field in api.route_schema.fields}
+    else:
+        attrs = set()
+
+    for namespace in api.namespaces.values():
+        for route in namespace.routes:
+            for k in list(route.attrs.keys()):
+                if k not in attrs:
+                    del route.attrs[k]
+
+    # Remove attrs that weren't specified from the route schema
+    for field in api.route_schema.fields[:]:
+        if field.name not in attrs:
+            api.route_schema.fields.remove(field)
+            del api.route_schema._fields_by_name[field.name]
+        else:
+            attrs.remove(field.name)
+    api.route_schema._invalidate_field_layouts()
+
+    # Error if specified attr isn't even a field in the route schema
+    if attrs:
+        attr = attrs.pop()
+        print('error: Attribute not defined in stone_cfg.Route: %s' %
+              attr, file=sys.stderr)
+        sys.exit(1)
+
+    if routes_removed:
+        # Reindex the API without the removed routes.
+        api.normalize()
+
+    if args.prune_unreachable:
+        api.prune_unreachable(_get_kept_data_types(args, api))
+    elif args.keep_type:
+        print('error: --keep-type requires --prune-unreachable.', file=sys.stderr)
+        sys.exit(1)
 
-    if args.generator in _builtin_generators:
+def _get_kept_data_types(args, api):
+    """Returns the data types and aliases named by --keep-type. Exits on
+    error."""
+    kept_data_types = []
+    for name in args.keep_type:
+        namespace_name, _, data_type_name = name.rpartition('.')
+        namespace = api.namespaces.get(namespace_name)
+        if namespace is not None and data_type_name in namespace.data_type_by_name:
+            kept_data_types.append(namespace.data_type_by_name[data_type_name])
+        elif namespace is not None and data_type_name in namespace.alias_by_name:
+            kept_data_types.append(namespace.alias_by_name[data_type_name])
+        else:
+            print('error: Kept type missing from spec: %s' % name, file=sys.stderr)
+            sys.exit(1)
+    return kept_data_types
+
+def _make_profiler(args):
+    """Returns a profiler if profiling was requested on the command line."""
+    if args.profile or args.cprofile_dir:
+        return Profiler(args.cprofile_dir)
+    return None
+
+@contextlib.contextmanager
+def _profile_phase(profiler, name):
+    if profiler:
+        with profiler.phase('phase', name):
+            yield
+    else:
+        yield
+
+def _write_profile(args, profiler):
+    if args.profile:
+        profiler.write(args.profile)
+
+def _load_targets(args, generator_args):
+    """Returns the build targets named on the command line."""
+    if not args.target:
+        return [BuildTarget(_load_generator_module(args.generator),
+                            generator_args,
+                            args.output)]
+    targets = []
+    for i, target in enumerate(args.target):
+        parts = target.split(':', 2)
+        if len(parts) < 2 or not parts[0] or not parts[1]:
+            print("error: Target '%s' must be of the form GENERATOR:OUTPUT[:ARGS]." %
+                  target, file=sys.stderr)
+            sys.exit(1)
+        elif parts[0] == 'compile-ir':
+            print('error: compile-ir cannot be used as a target.', file=sys.stderr)
+            sys.exit(1)
+        generator_module = _load_generator_module(
+            parts[0], module_name='user_generator_%d' % i)
+        # shlex doesn't support unicode in Python 2.
+        target_args = shlex.split(str(parts[2])) if len(parts) == 3 else []
+        targets.append(BuildTarget(generator_module, target_args, parts[1]))
+    return targets
+
+def _load_generator_module(generator, module_name='user_generator'):
+    """Imports a built-in generator by name or a generator module by path."""
+    if generator in _builtin_generators:
         generator_module = __import__(
-            'stone.target.%s' % args.generator, fromlist=[''])
-    elif not os.path.exists(args.generator):
-        print("error: Generator '%s' cannot be found." % args.generator,
+            'stone.target.%s' % generator, fromlist=[''])
+    elif not os.path.exists(generator):
+        print("error: Generator '%s' cannot be found." % generator,
               file=sys.stderr)
         sys.exit(1)
-    elif not os.path.isfile(args.generator):
-        print("error: Generator '%s' must be a file." % args.generator,
+    elif not os.path.isfile(generator):
+        print("error: Generator '%s' must be a file." % generator,
               file=sys.stderr)
         sys.exit(1)
-    elif not Compiler.is_stone_generator(args.generator):
+    elif not Compiler.is_stone_generator(generator):
         print("error: Generator '%s' must have a .stoneg.py extension." %
-              args.generator, file=sys.stderr)
+              generator, file=sys.stderr)
         sys.exit(1)
     else:
         # A bit hacky, but we add the folder that the generator is in to our
         # python path to support the case where the generator imports other
         # files in its local directory.
-        new_python_path = os.path.dirname(args.generator)
+        new_python_path = os.path.dirname(generator)
         if new_python_path not in sys.path:
             sys.path.append(new_python_path)
         try:
-            generator_module = imp.load_source('user_generator', args.generator)
+            generator_module = imp.load_source(str(module_name), generator)
         except:
             print("error: Importing generator '%s' module raised an exception:" %
-                  args.generator, file=sys.stderr)
+                  generator, file=sys.stderr)
             raise
 
+    return generator_module
+
+def _compile(args, api, targets, clean_build, profiler=None):
+    """Runs the generators of the targets on the API. Exits on error."""
     c = Compiler(
         api,
-        generator_module,
-        generator_args,
-        args.output,
-        clean_build=args.clean_build,
+        clean_build=clean_build,
+        targets=targets,
+        jobs=args.jobs,
+        profiler=profiler,
     )
     try:
         c.build()
     except GeneratorException as e:
         print('%s: error: %s raised an exception:\n%s' %
-              (args.generator, e.generator_name, e.traceback),
+              (args.generator or 'stone', e.generator_name, e.traceback),
               file=sys.stderr)
         sys.exit(1)
 
-    if not sys.argv[0].endswith('stone'):
-        # If we aren't running from an entry_point, then return api to make it
-        # easier to do debugging.
-        return api
+def _watch(args, generator_args, debug):
+    """
+    Rebuilds whenever a spec changes. The generator module stays loaded, and
+    a parse cache ensures that only changed specs are parsed again. Generators
+    that support incremental builds only regenerate affected namespaces.
+    """
+    if not args.spec or '-' in args.spec:
+        print('error: Specs must be given as files in watch mode.', file=sys.stderr)
+        sys.exit(1)
+
+    compile_ir = args.generator == 'compile-ir'
+    route_filter = _parse_route_filter(args, debug)
+    targets = None if compile_ir else _load_targets(args, generator_args)
+    # Without a persistent cache, keep the parsed specs for this session only.
+    session_cache_dir = None if args.cache_dir else tempfile.mkdtemp()
+    build_count = [0]
+
+    def build():
+        # Errors have already been reported if a step exits.
+        profiler = _make_profiler(args)
+        try:
+            if compile_ir:
+                api = _parse_specs(args, _read_specs(args, debug), debug,
+                                   cache_dir=session_cache_dir, profiler=profiler,
+                                   release_tokens=True)
+                write_ir(api, args.output)
+            else:
+                api = _load_api(args, route_filter, debug,
+                                cache_dir=session_cache_dir, profiler=profiler)
+                clean_build = args.clean_build and build_count[0] == 0
+                _compile(args, api, targets, clean_build, profiler)
+            _write_profile(args, profiler)
+        except SystemExit:
+            return False
+        except Exception:  # pylint: disable=broad-except
+            # Report the error, which SpecWatcher passes on to socket clients,
+            # and keep watching.
+            print('error: The build failed unexpectedly:\n%s' % traceback.format_exc(),
+                  file=sys.stderr)
+            return False
+        finally:
+            build_count[0] += 1
+        return True
+
+    try:
+        SpecWatcher(args.spec, build, socket_path=args.socket).serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if session_cache_dir:
+            shutil.rmtree(session_cache_dir, ignore_errors=True)
 
 
 if __name__ == '__main__':
@@ -1,15 +1,32 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import hashlib
 import logging
 import inspect
+import json
+import multiprocessing
 import os
 import shutil
 import traceback
 
+from stone import __version__
+from stone.build_manifest import (
+    BuildManifest,
+    IncrementalBuild,
+)
+from stone.fingerprint import (
+    fingerprint_data_type,
+    fingerprint_namespaces,
+)
 from stone.generator import (
     Generator,
     remove_aliases_from_api,
 )
+from stone.ir import (
+    deserialize_api,
+    serialize_api,
+)
+from stone.profiling import NullProfiler
 
 
 class GeneratorException(Exception):
@@ -25,20 +42,79 @@ class GeneratorException(Exception):
         self.traceback = tb
 
 
+def _run_generator_in_worker(task):
+    """
+    Runs a generator in a pool process. Returns the namespace outputs recorded
+    by an incremental build, the output files, the profiling records, and the
+    traceback of the exception raised by the generator, if any.
+    """
+    (generator_cls, build_path, generator_args, api_snapshot, fingerprints,
+     previous_outputs, profiler) = task
+    try:
+        generator = generator_cls(build_path, generator_args)
+        generator.profiler = profiler
+        if previous_outputs is not None:
+            generator.incremental_build = IncrementalBuild(
+                build_path, fingerprints, previous_outputs)
+        api = deserialize_api(api_snapshot)
+        with profiler.phase('generator', generator_cls.__name__, cprofile=True):
+            generator.generate(api)
+    except:  # noqa: E722 # pylint: disable=bare-except
+        return None, None, None, traceback.format_exc()[:-1]
+    namespace_outputs = None
+    if generator.incremental_build:
+        namespace_outputs = generator.incremental_build.namespace_outputs
+    return namespace_outputs, generator.output_files, profiler.records, None
+
+
+class BuildTarget(object):
+    """
+    A generator module, the arguments for its generators, and the folder to
+    save their output to.
+    """
+
+    def __init__(self, generator_module, generator_args, build_path):
+        """
+        :param generator_module: Python module that contains at least one
+            top-level class definition that descends from a
+            :class:`stone.generator.Generator`.
+        :param list(str) generator_args: A list of command-line arguments to
+            pass to the generator.
+        :param str build_path: Location to save compiled sources to.
+        """
+        self.generator_module = generator_module
+        self.generator_args = generator_args
+        self.build_path = build_path
+
+    def get_generator_classes(self):
+        """Returns the generators defined in the generator module."""
+        generator_classes = []
+        for attr_key in dir(self.generator_module):
+            attr_value = getattr(self.generator_module, attr_key)
+            if (inspect.isclass(attr_value) and
+                    issubclass(attr_value, Generator) and
+                    not inspect.isabstract(attr_value)):
+                generator_classes.append(attr_value)
+        return generator_classes
+
+
 class Compiler(object):
     """
-    Applies a collection of generators found in a single generator module to an
-    API specification.
+    Applies a collection of generators found in a single generator module, or
+    in the modules of several build targets, to an API specification.
     """
 
     generator_extension = '.stoneg'
 
     def __init__(self,
                  api,
-                 generator_module,
-                 generator_args,
-                 build_path,
-                 clean_build=False):
+                 generator_module=None,
+                 generator_args=None,
+                 build_path=None,
+                 clean_build=False,
+                 targets=None,
+                 jobs=1,
+                 profiler=None):
         """
         Creates a Compiler.
 
@@ -52,26 +128,39 @@ class Compiler(object):
             source files are compiled into the same directories.
         :param bool clean_build: If True, the build_path is removed before
             source files are compiled into them.
+        :param list(BuildTarget) targets: If set, the generators of all the
+            targets are run against the API, instead of those of
+            generator_module. The front end then only needs to run once.
+        :param int jobs: Number of processes used to run generators. If 0,
+            one per CPU. With more than one, generators run concurrently,
+            except as ordered by their run_after attribute.
+        :param stone.profiling.Profiler profiler: If set, records the timing
+            of each generator and of each file it outputs.
         """
         self._logger = logging.getLogger('stone.compiler')
 
         self.api = api
-        self.generator_module = generator_module
-        self.generator_args = generator_args
-        self.build_path = build_path
+        if targets is None:
+            targets = [BuildTarget(generator_module, generator_args, build_path)]
+        self.targets = targets
+        self.jobs = jobs or multiprocessing.cpu_count()
+        self.profiler = profiler or NullProfiler()
 
-        # Remove existing build directory if it's a clean build
-        if clean_build and os.path.exists(self.build_path):
-            logging.info('Cleaning existing build directory %s...',
-                         self.build_path)
-            shutil.rmtree(self.build_path)
+        # Remove existing build directories if it's a clean build
+        for build_path in sorted({target.build_path for target in targets}):
+            if clean_build and os.path.exists(build_path):
+                logging.info('Cleaning existing build directory %s...',
+                             build_path)
+                shutil.rmtree(build_path)
 
     def build(self):
         """Creates outputs. Outputs are files made by a generator."""
-        if os.path.exists(self.build_path) and not os.path.isdir(self.build_path):
-            self._logger.error('Output path must be a folder if it already exists')
-            return
-        Compiler._mkdir(self.build_path)
+        for target in self.targets:
+            if os.path.exists(target.build_path) and not os.path.isdir(target.build_path):
+                self._logger.error('Output path must be a folder if it already exists')
+                return
+        for target in self.targets:
+            Compiler._mkdir(target.build_path)
         self._execute_generator_on_spec()
 
     @staticmethod
@@ -100,27 +189,258 @@ class Compiler(object):
     def _execute_generator_on_spec(self):
         """Renders a source file into its final form."""
 
+        jobs = [(target, generator_cls)
+                for target in self.targets
+                for generator_cls in target.get_generator_classes()]
+        dependencies = self._get_job_dependencies(jobs)
+        order = self._order_jobs(jobs, dependencies)
+
+        manifests = {}  # Dict[str, BuildManifest]
+        fingerprints = None
+        route_schema_fingerprint = None
+        if any(cls.supports_incremental_build for _, cls in jobs):
+            # Must be computed before aliases are removed from the API, which
+            # happens in place.
+            fingerprints = fingerprint_namespaces(self.api)
+            route_schema_fingerprint = fingerprint_data_type(self.api.route_schema)
+
+        # When more than one generator runs, each gets its own copy of the API
+        # so that none can observe another's mutations. Copies are made from
+        # snapshots so that aliases are only removed once.
+        isolate = len(jobs) > 1
+        api_snapshot = serialize_api(self.api) if isolate else None
+        api_no_aliases_snapshot = None
         api_no_aliases_cache = None
-        for attr_key in dir(self.generator_module):
-            attr_value = getattr(self.generator_module, attr_key)
-            if (inspect.isclass(attr_value) and
-                    issubclass(attr_value, Generator) and
-                    not inspect.isabstract(attr_value)):
-                self._logger.info('Running generator: %s', attr_value.__name__)
-                generator = attr_value(self.build_path, self.generator_args)
+
+        # Generators are instantiated up front so that invalid generator
+        # arguments are reported before anything runs.
+        tasks = []
+        for target, generator_cls in jobs:
+            generator = generator_cls(target.build_path, target.generator_args)
+            if target.build_path not in manifests:
+                manifests[target.build_path] = BuildManifest(target.build_path)
+            salt = None
+            if generator.supports_incremental_build:
+                salt = self._get_build_salt(target, generator_cls, route_schema_fingerprint)
+                generator.incremental_build = IncrementalBuild(
+                    target.build_path,
+                    fingerprints,
+                    manifests[target.build_path].get_namespace_outputs(
+                        generator_cls.__name__, salt))
+            if isolate and not generator.preserve_aliases and \
+                    api_no_aliases_snapshot is None:
+                api_no_aliases_snapshot = serialize_api(
+                    remove_aliases_from_api(deserialize_api(api_snapshot)))
+            tasks.append((generator, salt))
+
+        def finish(i, namespace_outputs, output_files):
+            target, generator_cls = jobs[i]
+            manifest = manifests[target.build_path]
+            files = list(output_files)
+            if namespace_outputs is not None:
+                salt = tasks[i][1]
+                manifest.set_namespace_outputs(
+                    generator_cls.__name__, salt, namespace_outputs)
+                # Includes the files of the namespaces that weren't generated
+                # again because they were current.
+                for namespace_output in namespace_outputs.values():
+                    files.extend(namespace_output['files'])
+            else:
+                manifest.remove_namespace_outputs(generator_cls.__name__)
+            manifest.set_files(generator_cls.__name__, files)
+
+        if self.jobs > 1 and len(jobs) > 1:
+            self._run_generators_in_pool(
+                jobs, dependencies, finish,
+                [(generator_cls,
+                  target.build_path,
+                  target.generator_args,
+                  api_snapshot if generator.preserve_aliases else api_no_aliases_snapshot,
+                  fingerprints,
+                  generator.incremental_build.previous_outputs
+                  if generator.incremental_build else None,
+                  self.profiler.new_child())
+                 for (target, generator_cls), (generator, _) in zip(jobs, tasks)])
+        else:
+            for i in order:
+                generator_cls = jobs[i][1]
+                generator = tasks[i][0]
+                generator.jobs = self.jobs
+                self._logger.info('Running generator: %s', generator_cls.__name__)
 
                 if generator.preserve_aliases:
-                    api = self.api
+                    api = deserialize_api(api_snapshot) if isolate else self.api
+                elif isolate:
+                    api = deserialize_api(api_no_aliases_snapshot)
                 else:
                     if not api_no_aliases_cache:
                         api_no_aliases_cache = remove_aliases_from_api(self.api)
                     api = api_no_aliases_cache
 
                 try:
-                    generator.generate(api)
+                    generator.profiler = self.profiler
+                    with self.profiler.phase(
+                            'generator', generator_cls.__name__, cprofile=True):
+                        generator.generate(api)
                 except:
                     # Wrap this exception so that it isn't thought of as a bug
                     # in the stone parser, but rather a bug in the generator.
                     # Remove the last char of the traceback b/c it's a newline.
-                    raise GeneratorException(attr_value.__name__,
+                    raise GeneratorException(generator_cls.__name__,
                                              traceback.format_exc()[:-1])
+
+                finish(i,
+                       generator.incremental_build.namespace_outputs
+                       if generator.incremental_build else None,
+                       generator.output_files)
+
+        for build_path, manifest in manifests.items():
+            self._remove_stale_files(build_path, manifest.get_stale_files())
+            manifest.save()
+
+    def _run_generators_in_pool(self, jobs, dependencies, finish, tasks):
+        """
+        Runs each task with _run_generator_in_worker in a process pool, as
+        soon as the tasks it depends on have finished. Calls finish with the
+        index of each task that succeeds, its namespace outputs, and its
+        output files.
+        """
+        processes = min(self.jobs, len(tasks))
+        self._logger.info('Running %d generators with %d jobs', len(tasks), processes)
+        pending = list(range(len(tasks)))
+        finished = set()
+        running = {}  # Maps the indexes of the running tasks to their results.
+        other_children = set(multiprocessing.active_children())
+        pool = multiprocessing.Pool(processes)
+        workers = [process for process in multiprocessing.active_children()
+                   if process not in other_children]
+        try:
+            while pending or running:
+                for i in [i for i in pending if dependencies[i] <= finished]:
+                    pending.remove(i)
+                    self._logger.info('Running generator: %s', jobs[i][1].__name__)
+                    running[i] = pool.apply_async(_run_generator_in_worker, (tasks[i],))
+                i = self._wait_for_any(running, workers, jobs)
+                try:
+                    namespace_outputs, output_files, records, tb = running.pop(i).get()
+                except Exception:  # pylint: disable=broad-except
+                    # The task failed outside of the generator, for example to
+                    # pickle its arguments or result.
+                    raise GeneratorException(jobs[i][1].__name__, traceback.format_exc()[:-1])
+                if tb is not None:
+                    raise GeneratorException(jobs[i][1].__name__, tb)
+                self.profiler.records.extend(records)
+                finished.add(i)
+                finish(i, namespace_outputs, output_files)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    @staticmethod
+    def _wait_for_any(running, workers, jobs):
+        """
+        Returns the index of a task of running whose result is ready. Raises
+        GeneratorException if a worker process died, since the task it ran
+        would never finish.
+        """
+        while True:
+            for i in sorted(running):
+                if running[i].ready():
+                    return i
+            for worker in workers:
+                if worker.exitcode:
+                    raise GeneratorException(
+                        ', '.join(jobs[i][1].__name__ for i in sorted(running)),
+                        'A worker process exited with code %d while running the '
+                        'generator.' % worker.exitcode)
+            # A timeout keeps the wait interruptible on Python 2.
+            running[min(running)].wait(0.1)
+
+    def _remove_stale_files(self, build_path, stale_files):
+        """
+        Removes files that a previous build generated and that are no longer
+        produced, along with the folders that are left empty. Paths outside of
+        the build path are never touched.
+        """
+        for relative_path in stale_files:
+            if os.path.isabs(relative_path) or \
+                    relative_path.split(os.sep)[0] == os.pardir:
+                continue
+            path = os.path.join(build_path, relative_path)
+            self._logger.info('Removing stale output %s', path)
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            directory = os.path.dirname(relative_path)
+            while directory:
+                try:
+                    os.rmdir(os.path.join(build_path, directory))
+                except OSError:
+                    break
+                directory = os.path.dirname(directory)
+
+    @staticmethod
+    def _get_job_dependencies(jobs):
+        """
+        Returns, for each job, the indexes of the jobs that must finish
+        before it starts, as declared by the run_after attribute of its
+        generator.
+        """
+        dependencies = []
+        for i, (_, generator_cls) in enumerate(jobs):
+            dependencies.append({
+                j for j, (_, other_cls) in enumerate(jobs)
+                if j != i and other_cls.__name__ in generator_cls.run_after})
+        return dependencies
+
+    @staticmethod
+    def _order_jobs(jobs, dependencies):
+        """
+        Returns the indexes of the jobs in the order they were found, except
+        that each job comes after the jobs it depends on.
+        """
+        order = []
+        pending = list(range(len(jobs)))
+        while pending:
+            for i in pending:
+                if dependencies[i] <= set(order):
+                    break
+            else:
+                raise GeneratorException(
+                    jobs[pending[0]][1].__name__,
+                    'Generators have cyclic run_after dependencies.')
+            pending.remove(i)
+            order.append(i)
+        return order
+
+    @staticmethod
+    def _get_build_salt(target, generator_cls, route_schema_fingerprint):
+        """
+        Returns a digest of everything besides the namespaces themselves that
+        determines the output of a generator: the source of the generator and
+        of Stone, the generator arguments, and the route schema.
+        """
+        source_paths = []
+        try:
+            source_paths.append(inspect.getsourcefile(generator_cls))
+        except TypeError:
+            pass
+        stone_dir = os.path.dirname(os.path.abspath(__file__))
+        for dirpath, dirnames, filenames in os.walk(stone_dir):
+            dirnames.sort()
+            source_paths.extend(os.path.join(dirpath, filename)
+                                for filename in sorted(filenames)
+                                if filename.endswith('.py'))
+        h = hashlib.sha1()
+        for source_path in source_paths:
+            try:
+                with open(source_path, 'rb') as f:
+                    h.update(f.read())
+            except (IOError, OSError, TypeError):
+                pass
+        h.update(json.dumps([__version__,
+                             target.generator_args,
+                             route_schema_fingerprint]).encode('utf-8'))
+        return h.hexdigest()
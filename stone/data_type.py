@@ -57,6 +57,8 @@ class DataType(object):
     Abstract class representing a data type.
     """
 
+    __slots__ = ()
+
     __metaclass__ = ABCMeta
 
     def __init__(self):
@@ -105,6 +107,8 @@ class DataType(object):
 class Primitive(DataType):
     # pylint: disable=abstract-method
 
+    __slots__ = ()
+
     def check_attr_repr(self, attr_field):
         try:
             self.check(attr_field.value)
@@ -119,11 +123,14 @@ class Composite(DataType):
     data types and other composite types.
     """
     # pylint: disable=abstract-method
-    pass
+
+    __slots__ = ()
 
 
 class Nullable(Composite):
 
+    __slots__ = ('data_type',)
+
     def __init__(self, data_type):
         super(Nullable, self).__init__()
         self.data_type = data_type
@@ -145,6 +152,8 @@ class Nullable(Composite):
 
 class Void(Primitive):
 
+    __slots__ = ()
+
     def check(self, val):
         if val is not None:
             raise ValueError('void type can only be null')
@@ -159,6 +168,8 @@ class Void(Primitive):
 
 class Bytes(Primitive):
 
+    __slots__ = ()
+
     def check(self, val):
         if not isinstance(val, (bytes, six.text_type)):
             raise ValueError('%r is not valid bytes' % val)
@@ -185,6 +196,8 @@ class _BoundedInteger(Primitive):
     is the range of values supported by the data type.
     """
 
+    __slots__ = ('min_value', 'max_value')
+
     # See <https://github.com/python/mypy/issues/1833>
     minimum = None  # type: typing.Optional[int]
     maximum = None  # type: typing.Optional[int]
@@ -237,21 +250,29 @@ class _BoundedInteger(Primitive):
 
 
 class Int32(_BoundedInteger):
+    __slots__ = ()
+
     minimum = -2**31
     maximum = 2**31 - 1
 
 
 class UInt32(_BoundedInteger):
+    __slots__ = ()
+
     minimum = 0
     maximum = 2**32 - 1
 
 
 class Int64(_BoundedInteger):
+    __slots__ = ()
+
     minimum = -2**63
     maximum = 2**63 - 1
 
 
 class UInt64(_BoundedInteger):
+    __slots__ = ()
+
     minimum = 0
     maximum = 2**64 - 1
 
@@ -265,6 +286,8 @@ class _BoundedFloat(Primitive):
     float will pass the data type range check automatically.
     """
 
+    __slots__ = ('min_value', 'max_value')
+
     # See <https://github.com/python/mypy/issues/1833>
     minimum = None  # type: typing.Optional[float]
     maximum = None  # type: typing.Optional[float]
@@ -338,17 +361,21 @@ class _BoundedFloat(Primitive):
 
 
 class Float32(_BoundedFloat):
+    __slots__ = ()
+
     # Maximum and minimums from the IEEE 754-1985 standard
     minimum = -3.40282 * 10**38
     maximum = 3.40282 * 10**38
 
 
 class Float64(_BoundedFloat):
-    pass
+    __slots__ = ()
 
 
 class Boolean(Primitive):
 
+    __slots__ = ()
+
     def check(self, val):
         if not isinstance(val, bool):
             raise ValueError('%r is not a valid boolean' % val)
@@ -361,6 +388,8 @@ class Boolean(Primitive):
 
 class String(Primitive):
 
+    __slots__ = ('min_length', 'max_length', 'pattern', 'pattern_re')
+
     def __init__(self, min_length=None, max_length=None, pattern=None):
         super(String, self).__init__()
         if min_length is not None:
@@ -414,6 +443,8 @@ class String(Primitive):
 
 class Timestamp(Primitive):
 
+    __slots__ = ('format',)
+
     def __init__(self, fmt):
         super(Timestamp, self).__init__()
         if not isinstance(fmt, six.string_types):
@@ -446,6 +477,8 @@ class Timestamp(Primitive):
 
 class List(Composite):
 
+    __slots__ = ('data_type', 'min_items', 'max_items')
+
     def __init__(self, data_type, min_items=None, max_items=None):
         super(List, self).__init__()
         self.data_type = data_type
@@ -510,12 +543,17 @@ def doc_unwrap(raw_doc):
             docstring += c
     return docstring
 
+# Pattern for references in documentation
+doc_ref_re = re.compile(r':(?P<tag>[A-z]+):`(?P<val>.*?)`')
+
 
 class Field(object):
     """
     Represents a field in a composite type.
     """
 
+    __slots__ = ('name', 'data_type', 'raw_doc', 'doc', '_token')
+
     def __init__(self,
                  name,
                  data_type,
@@ -546,6 +584,8 @@ class StructField(Field):
     Represents a field of a struct.
     """
 
+    __slots__ = ('deprecated', 'has_default', '_default')
+
     def __init__(self,
                  name,
                  data_type,
@@ -601,6 +641,8 @@ class UnionField(Field):
     Represents a field of a union.
     """
 
+    __slots__ = ('catch_all',)
+
     def __init__(self,
                  name,
                  data_type,
@@ -621,6 +663,15 @@ class UserDefined(Composite):
     These are types that are defined directly in specs.
     """
 
+    # A __dict__ is only created if attributes other than these are set, as
+    # generators may do to annotate types.
+    __slots__ = (
+        '_name', 'namespace', '_token', '_is_forward_ref', 'raw_doc', 'doc',
+        'fields', 'parent_type', '_raw_examples', '_examples',
+        '_computed_examples', '_compact_examples', '_fields_by_name',
+        '_all_fields', '_all_fields_by_name', '__dict__',
+    )
+
     DEFAULT_EXAMPLE_LABEL = 'default'
 
     def __init__(self, name, namespace, token):
@@ -647,7 +698,12 @@ class UserDefined(Composite):
         self.parent_type = None
         self._raw_examples = None
         self._examples = None
+        self._computed_examples = None
+        self._compact_examples = None
         self._fields_by_name = None
+        # Cached by the properties that list fields of parent types too.
+        self._all_fields = None
+        self._all_fields_by_name = None
 
     def set_attributes(self, doc, fields, parent_type=None):
         """
@@ -663,8 +719,13 @@ class UserDefined(Composite):
         self.doc = doc_unwrap(doc)
         self.fields = fields
         self.parent_type = parent_type
+        self._invalidate_field_layouts()
         self._raw_examples = OrderedDict()
         self._examples = OrderedDict()
+        # Maps labels to computed examples. None marks an example that is
+        # being computed, to detect cycles of references.
+        self._computed_examples = {}
+        self._compact_examples = None
         self._fields_by_name = {}  # Dict[str, Field]
 
         # Check that no two fields share the same name.
@@ -696,6 +757,19 @@ class UserDefined(Composite):
     def all_fields(self):
         raise NotImplementedError
 
+    def _get_field(self, name):
+        """Returns the field with the given name, including the fields of
+        parent types, or None."""
+        if self._all_fields_by_name is None:
+            self._all_fields_by_name = {f.name: f for f in self.all_fields}
+        return self._all_fields_by_name.get(name)
+
+    def _invalidate_field_layouts(self):
+        """Clears the cached lists of fields. Call it after changing the
+        fields of this type, or whether they are optional."""
+        self._all_fields = None
+        self._all_fields_by_name = None
+
     def has_documented_type_or_fields(self, include_inherited_fields=False):
         """Returns whether this type, or any of its fields, are documented.
 
@@ -724,6 +798,7 @@ class UserDefined(Composite):
 
     def prepend_field(self, field):
         self.fields.insert(0, field)
+        self._invalidate_field_layouts()
 
     def get_examples(self, compact=False):
         """
@@ -734,10 +809,16 @@ class UserDefined(Composite):
                 to their compact representation: no ".tag" key or containing
                 dict, just the tag as a string.
         """
-        # Copy it just in case the caller wants to mutate the object.
-        examples = copy.deepcopy(self._examples)
         if not compact:
-            return examples
+            # Copy it just in case the caller wants to mutate the object.
+            return copy.deepcopy(self._examples)
+        if self._compact_examples is None:
+            self._compact_examples = self._make_compact_examples()
+        return copy.deepcopy(self._compact_examples)
+
+    def _make_compact_examples(self):
+        """Returns a copy of the examples in their compact form."""
+        examples = copy.deepcopy(self._examples)
 
         def make_compact(d):
             # Traverse through dicts looking for ones that have a lone .tag
@@ -763,10 +844,42 @@ class UserDefined(Composite):
 
         return examples
 
+    def _compute_example(self, label):
+        """
+        Returns the Example with the given label, with references to other
+        examples resolved. Each example is only computed once, and is then
+        shared by every example that refers to it, so it must not be mutated.
+        """
+        try:
+            example = self._computed_examples[label]
+        except KeyError:
+            self._computed_examples[label] = None
+            try:
+                example = self._build_example(label)
+            except:  # noqa: E722 # pylint: disable=bare-except
+                del self._computed_examples[label]
+                raise
+            self._computed_examples[label] = example
+            return example
+        if example is None:
+            raw_example = self._raw_examples[label]
+            raise InvalidSpec(
+                "Example '%s' of '%s' refers to itself through a cycle of "
+                "references." % (label, self.name),
+                raw_example.lineno, raw_example.path)
+        return example
+
+    def _build_example(self, label):
+        """Computes the example with the given label for
+        :meth:`_compute_example`."""
+        raise NotImplementedError
+
 
 class Example(object):
     """An example of a struct or union type."""
 
+    __slots__ = ('label', 'text', 'value', '_token')
+
     def __init__(self, label, text, value, token=None):
         assert isinstance(label, six.text_type), type(label)
         self.label = label
@@ -787,6 +900,11 @@ class Struct(UserDefined):
     """
     # pylint: disable=attribute-defined-outside-init
 
+    __slots__ = (
+        'subtypes', '_all_required_fields', '_all_optional_fields',
+        '_enumerated_subtypes', '_is_catch_all',
+    )
+
     composite_type = 'struct'
 
     def set_attributes(self, doc, fields, parent_type=None):
@@ -798,6 +916,8 @@ class Struct(UserDefined):
             assert isinstance(parent_type, Struct)
 
         self.subtypes = []
+        self._all_required_fields = None
+        self._all_optional_fields = None
 
         # These are only set if this struct enumerates subtypes.
         self._enumerated_subtypes = None  # Optional[List[Tuple[str, DataType]]]
@@ -834,44 +954,48 @@ class Struct(UserDefined):
     @property
     def all_fields(self):
         """
-        Returns an iterator of all fields. Required fields before optional
+        Returns a tuple of all fields. Required fields before optional
         fields. Super type fields before type fields.
         """
-        return self.all_required_fields + self.all_optional_fields
-
-    def _filter_fields(self, filter_function):
-        """
-        Utility to iterate through all fields (super types first) of a type.
-
-        :param filter: A function that takes in a Field object. If it returns
-            True, the field is part of the generated output. If False, it is
-            omitted.
-        """
-        fields = []
-        if self.parent_type:
-            fields.extend(self.parent_type._filter_fields(filter_function))
-        fields.extend(filter(filter_function, self.fields))
-        return fields
+        if self._all_fields is None:
+            self._all_fields = self.all_required_fields + self.all_optional_fields
+        return self._all_fields
 
     @property
     def all_required_fields(self):
         """
-        Returns an iterator that traverses required fields in all super types
-        first, and then for this type.
+        Returns a tuple of the required fields in all super types first, and
+        then of this type.
         """
-        def required_check(f):
-            return not is_nullable_type(f.data_type) and not f.has_default
-        return self._filter_fields(required_check)
+        if self._all_required_fields is None:
+            parent_fields = (self.parent_type.all_required_fields
+                             if self.parent_type else ())
+            self._all_required_fields = parent_fields + tuple(
+                f for f in self.fields
+                if not is_nullable_type(f.data_type) and not f.has_default)
+        return self._all_required_fields
 
     @property
     def all_optional_fields(self):
         """
-        Returns an iterator that traverses optional fields in all super types
-        first, and then for this type.
-        """
-        def optional_check(f):
-            return is_nullable_type(f.data_type) or f.has_default
-        return self._filter_fields(optional_check)
+        Returns a tuple of the optional fields in all super types first, and
+        then of this type.
+        """
+        if self._all_optional_fields is None:
+            parent_fields = (self.parent_type.all_optional_fields
+                             if self.parent_type else ())
+            self._all_optional_fields = parent_fields + tuple(
+                f for f in self.fields
+                if is_nullable_type(f.data_type) or f.has_default)
+        return self._all_optional_fields
+
+    def _invalidate_field_layouts(self):
+        super(Struct, self)._invalidate_field_layouts()
+        self._all_required_fields = None
+        self._all_optional_fields = None
+        # Subtypes list the fields of this type too.
+        for subtype in self.subtypes:
+            subtype._invalidate_field_layouts()
 
     def has_enumerated_subtypes(self):
         """
@@ -1105,7 +1229,7 @@ class Struct(UserDefined):
 
         # Check for fields in the example that don't belong.
         for label, example_field in example.fields.items():
-            if not any(label == f.name for f in self.all_fields):
+            if self._get_field(label) is None:
                 raise InvalidSpec(
                     "Example for '%s' has unknown field '%s'." %
                     (self.name, label),
@@ -1147,7 +1271,7 @@ class Struct(UserDefined):
         for label in self._raw_examples:
             self._examples[label] = self._compute_example(label)
 
-    def _compute_example(self, label):
+    def _build_example(self, label):
         if self.has_enumerated_subtypes():
             return self._compute_example_enumerated_subtypes(label)
         else:
@@ -1228,10 +1352,10 @@ class Struct(UserDefined):
                 ref.lineno, ref.path)
 
         ordered_value = OrderedDict([('.tag', example_field.name)])
-        flat_example = data_type._compute_example_flat_helper(ref.label)
+        flat_example = data_type._compute_example(ref.label)
         ordered_value.update(flat_example.value)
-        flat_example.value = ordered_value
-        return flat_example
+        return Example(flat_example.label, flat_example.text, ordered_value,
+                       token=flat_example._token)
 
     def __repr__(self):
         return 'Struct(%r, %r)' % (self.name, self.fields)
@@ -1241,11 +1365,16 @@ class Union(UserDefined):
     """Defines a tagged union. Fields are variants."""
     # pylint: disable=attribute-defined-outside-init
 
+    __slots__ = ('closed', '_subtypes', 'catch_all_field')
+
     composite_type = 'union'
 
     def __init__(self, name, namespace, token, closed):
         super(Union, self).__init__(name, namespace, token)
         self.closed = closed
+        # Unions that extend this one, whose cached fields must be cleared
+        # with this one's.
+        self._subtypes = []
 
     # TODO: Why is this a different signature than the parent? Is this
     # intentional?
@@ -1265,18 +1394,18 @@ class Union(UserDefined):
         self.catch_all_field = catch_all_field
         self.parent_type = parent_type
 
+        if self.parent_type:
+            self.parent_type._subtypes.append(self)
+
     def check(self, val):
         assert isinstance(val, TagRef)
-        for field in self.all_fields:
-            if val.tag_name == field.name:
-                if not is_void_type(field.data_type):
-                    raise ValueError(
-                        "invalid reference to non-void option '%s'" %
-                        val.tag_name)
-                break
-        else:
+        field = self._get_field(val.tag_name)
+        if field is None:
             raise ValueError(
                 "invalid reference to unknown tag '%s'" % val.tag_name)
+        elif not is_void_type(field.data_type):
+            raise ValueError(
+                "invalid reference to non-void option '%s'" % val.tag_name)
 
     def check_example(self, ex_field):
         if not isinstance(ex_field.value, StoneExampleRef):
@@ -1299,14 +1428,18 @@ class Union(UserDefined):
     @property
     def all_fields(self):
         """
-        Returns a list of all fields. Subtype fields come before this type's
+        Returns a tuple of all fields. Subtype fields come before this type's
         fields.
         """
-        fields = []
-        if self.parent_type:
-            fields.extend(self.parent_type.all_fields)
-        fields.extend([f for f in self.fields])
-        return fields
+        if self._all_fields is None:
+            parent_fields = self.parent_type.all_fields if self.parent_type else ()
+            self._all_fields = parent_fields + tuple(self.fields)
+        return self._all_fields
+
+    def _invalidate_field_layouts(self):
+        super(Union, self)._invalidate_field_layouts()
+        for subtype in self._subtypes:
+            subtype._invalidate_field_layouts()
 
     def _add_example(self, example):
         """Adds a "raw example" for this type.
@@ -1331,18 +1464,14 @@ class Union(UserDefined):
         tag = example_field.name
 
         # Find the union member that corresponds to the tag.
-        for field in self.all_fields:
-            if tag == field.name:
-                break
-        else:
+        field = self._get_field(tag)
+        if field is None:
             # Error: Tag doesn't match any union member.
             raise InvalidSpec(
                 "Unknown tag '%s' in example." % tag,
                 example.lineno, example.path
             )
 
-        # TODO: are we always guaranteed at least one field?
-        # pylint: disable=undefined-loop-variable
         try:
             field.data_type.check_example(example_field)
         except InvalidSpec as e:
@@ -1386,7 +1515,7 @@ class Union(UserDefined):
                     Example(
                         field.name, None, OrderedDict([('.tag', field.name)]))
 
-    def _compute_example(self, label):
+    def _build_example(self, label):
         """
         From the "raw example," resolves references to examples of other data
         types to compute the final example.
@@ -1421,12 +1550,7 @@ class Union(UserDefined):
             # Do a deep copy of the example because we're going to mutate it.
             ex_val = OrderedDict([('.tag', example_field.name)])
 
-            for field in self.all_fields:
-                if field.name == example_field.name:
-                    break
-
-            # TODO: are we always guaranteed at least one field?
-            # pylint: disable=undefined-loop-variable
+            field = self._get_field(example_field.name)
             data_type, _ = unwrap_nullable(field.data_type)
             inner_ex_val = get_json_val(data_type, example_field.value)
             if (isinstance(data_type, Struct) and
@@ -1441,14 +1565,9 @@ class Union(UserDefined):
         else:
             # Try to fallback to a union member with tag matching the label
             # with a data type that is composite or void.
-            for field in self.all_fields:
-                if label == field.name:
-                    break
-            else:
+            field = self._get_field(label)
+            if field is None:
                 raise AssertionError('No example for label %r' % label)
-
-            # TODO: are we always guaranteed at least one field?
-            # pylint: disable=undefined-loop-variable
             assert is_void_type(field.data_type)
             return Example(
                 field.name, field.doc, OrderedDict([('.tag', field.name)]))
@@ -1481,6 +1600,8 @@ class TagRef(object):
     TODO(kelkabany): Support tag values.
     """
 
+    __slots__ = ('union_data_type', 'tag_name')
+
     def __init__(self, union_data_type, tag_name):
         self.union_data_type = union_data_type
         self.tag_name = tag_name
@@ -1495,6 +1616,9 @@ class Alias(Composite):
     It fit here better than as a primitive or user-defined type.
     """
 
+    __slots__ = ('_name', 'namespace', '_token', 'raw_doc', 'doc', 'data_type',
+                 '__dict__')
+
     def __init__(self, name, namespace, token):
         """
         When this is instantiated, the type is treated as a forward reference.
@@ -0,0 +1,249 @@
+"""
+Computes content fingerprints of namespaces.
+
+A fingerprint is a digest of everything in a namespace that a generator could
+render: its documentation, data types, aliases, routes, and the fingerprints of
+the namespaces it imports. Line numbers and file paths are excluded, so moving
+definitions between the files of a namespace doesn't change its fingerprint.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from collections import OrderedDict
+import hashlib
+import json
+import typing  # noqa: F401 # pylint: disable=unused-import
+
+from stone.api import Api, ApiNamespace  # noqa: F401 # pylint: disable=unused-import
+from stone.data_type import (
+    DataType,
+    List,
+    Nullable,
+    String,
+    Timestamp,
+    TagRef,
+    _BoundedFloat,
+    _BoundedInteger,
+    is_alias,
+    is_struct_type,
+    is_union_type,
+    is_user_defined_type,
+)
+from stone.lang.lexer import StoneNull
+from stone.lang.parser import _Element
+
+def fingerprint_namespaces(api):
+    # type: (Api) -> typing.Dict[typing.Text, typing.Text]
+    """
+    Returns a map of namespace name to the fingerprint of the namespace. The
+    fingerprint of a namespace changes whenever it or any namespace it
+    (transitively) imports changes.
+    """
+    fingerprints = {}  # type: typing.Dict[typing.Text, typing.Text]
+    for component in _import_cycles(api):
+        names = set(namespace.name for namespace in component)
+
+        def describe_imports(namespace):
+            # type: (ApiNamespace) -> typing.Any
+            # Namespaces of the same import cycle are fingerprinted together,
+            # so they are only referred to by name.
+            return sorted(
+                [imported.name,
+                 None if imported.name in names else fingerprints[imported.name],
+                 reason.alias, reason.data_type]
+                for imported, reason in namespace._imported_namespaces.items())
+
+        namespace = component[0]
+        if len(component) == 1 and namespace not in namespace._imported_namespaces:
+            fingerprints[namespace.name] = _digest(
+                [_describe_namespace(namespace), describe_imports(namespace)])
+        else:
+            # A change to any namespace of an import cycle changes the
+            # fingerprints of all of them.
+            cycle_digest = _digest(sorted(
+                [namespace.name, _describe_namespace(namespace),
+                 describe_imports(namespace)]
+                for namespace in component))
+            for namespace in component:
+                fingerprints[namespace.name] = _digest([namespace.name, cycle_digest])
+    return fingerprints
+
+def _import_cycles(api):
+    # type: (Api) -> typing.List[typing.List[ApiNamespace]]
+    """
+    Returns the strongly connected components of the import graph of the
+    namespaces, so that each namespace comes after the namespaces it imports
+    from other components. A component of more than one namespace is an import
+    cycle.
+    """
+    # Tarjan's algorithm, without recursion so that long chains of imports
+    # can't exceed the recursion limit.
+    index = {}  # type: typing.Dict[typing.Text, int]
+    lowlink = {}  # type: typing.Dict[typing.Text, int]
+    stack = []  # type: typing.List[ApiNamespace]
+    on_stack = set()  # type: typing.Set[typing.Text]
+    components = []  # type: typing.List[typing.List[ApiNamespace]]
+
+    for root in api.namespaces.values():
+        if root.name in index:
+            continue
+        work = [(root, iter(root._imported_namespaces))]
+        index[root.name] = lowlink[root.name] = len(index)
+        stack.append(root)
+        on_stack.add(root.name)
+        while work:
+            namespace, imports = work[-1]
+            for imported in imports:
+                if imported.name not in index:
+                    index[imported.name] = lowlink[imported.name] = len(index)
+                    stack.append(imported)
+                    on_stack.add(imported.name)
+                    work.append((imported, iter(imported._imported_namespaces)))
+                    break
+                elif imported.name in on_stack:
+                    lowlink[namespace.name] = min(lowlink[namespace.name],
+                                                  index[imported.name])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent.name] = min(lowlink[parent.name],
+                                               lowlink[namespace.name])
+                if lowlink[namespace.name] == index[namespace.name]:
+                    component = []  # type: typing.List[ApiNamespace]
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member.name)
+                        component.append(member)
+                        if member is namespace:
+                            break
+                    components.append(component)
+    return components
+
+def fingerprint_data_type(data_type):
+    # type: (typing.Optional[DataType]) -> typing.Text
+    """Returns the fingerprint of a single user-defined data type. A
+    fingerprint is also returned for None, which stands for no data type."""
+    return _digest(_describe_data_type(data_type) if data_type else None)
+
+def _digest(description):
+    # type: (typing.Any) -> typing.Text
+    encoded = json.dumps(description, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+def _describe_namespace(namespace):
+    # type: (ApiNamespace) -> typing.Any
+    return {
+        'name': namespace.name,
+        'doc': namespace.doc,
+        'data_types': [_describe_data_type(dt) for dt in namespace.data_types],
+        'aliases': [[alias.name, alias.raw_doc, _type_ref(alias.data_type)]
+                    for alias in namespace.aliases],
+        'routes': [_describe_route(route) for route in namespace.routes],
+    }
+
+def _describe_data_type(data_type):
+    # type: (typing.Any) -> typing.Any
+    description = {
+        'kind': type(data_type).__name__,
+        'name': data_type.name,
+        'doc': data_type.raw_doc,
+        'parent': _type_ref(data_type.parent_type),
+        'fields': [_describe_field(field) for field in data_type.fields],
+        'examples': [_describe_value(example)
+                     for example in data_type._raw_examples.values()],
+    }
+    if is_struct_type(data_type) and data_type.has_enumerated_subtypes():
+        description['catch_all'] = data_type.is_catch_all()
+        description['subtypes'] = [
+            [subtype.name, _type_ref(subtype.data_type)]
+            for subtype in data_type.get_enumerated_subtypes()]
+    elif is_union_type(data_type):
+        description['closed'] = data_type.closed
+        description['catch_all'] = (data_type.catch_all_field.name
+                                    if data_type.catch_all_field else None)
+    return description
+
+def _describe_field(field):
+    # type: (typing.Any) -> typing.Any
+    return {
+        'name': field.name,
+        'doc': field.raw_doc,
+        'data_type': _type_ref(field.data_type),
+        'deprecated': getattr(field, 'deprecated', None),
+        'default': (_describe_value(field.default)
+                    if getattr(field, 'has_default', False) else None),
+        'has_default': getattr(field, 'has_default', None),
+        'catch_all': getattr(field, 'catch_all', None),
+    }
+
+def _describe_route(route):
+    # type: (typing.Any) -> typing.Any
+    deprecated = None
+    if route.deprecated:
+        deprecated = [route.deprecated.by.name if route.deprecated.by else None]
+    return {
+        'name': route.name,
+        'doc': route.raw_doc,
+        'deprecated': deprecated,
+        'arg': _type_ref(route.arg_data_type),
+        'result': _type_ref(route.result_data_type),
+        'error': _type_ref(route.error_data_type),
+        'attrs': _describe_value(route.attrs),
+    }
+
+def _type_ref(data_type):
+    # type: (typing.Any) -> typing.Any
+    """Describes a reference to a data type. User-defined types and aliases
+    are referred to by name; their definitions are part of the fingerprint of
+    the namespace that declares them."""
+    if data_type is None:
+        return None
+    elif is_user_defined_type(data_type) or is_alias(data_type):
+        return [data_type.namespace.name, data_type.name]
+    elif isinstance(data_type, Nullable):
+        return ['Nullable', _type_ref(data_type.data_type)]
+    elif isinstance(data_type, List):
+        return ['List', _type_ref(data_type.data_type),
+                data_type.min_items, data_type.max_items]
+    elif isinstance(data_type, String):
+        return ['String', data_type.min_length, data_type.max_length,
+                data_type.pattern]
+    elif isinstance(data_type, Timestamp):
+        return ['Timestamp', data_type.format]
+    elif isinstance(data_type, (_BoundedInteger, _BoundedFloat)):
+        return [type(data_type).__name__, data_type.min_value,
+                data_type.max_value]
+    else:
+        return [type(data_type).__name__]
+
+def _get_element_attributes(element_class):
+    # type: (type) -> typing.List[typing.Text]
+    """Returns the names of the attributes of a parser element class, which
+    are all declared in the __slots__ of the class and its bases."""
+    return [name for cls in element_class.__mro__
+            for name in cls.__dict__.get('__slots__', ())]
+
+def _describe_value(value):
+    # type: (typing.Any) -> typing.Any
+    """Describes a default, route attribute, or raw example value."""
+    if value is StoneNull:
+        return ['StoneNull']
+    elif isinstance(value, TagRef):
+        return ['TagRef', _type_ref(value.union_data_type), value.tag_name]
+    elif isinstance(value, _Element):
+        return [type(value).__name__,
+                {k: _describe_value(getattr(value, k))
+                 for k in _get_element_attributes(type(value))
+                 if k not in ('path', 'lineno', 'lexpos')}]
+    elif isinstance(value, OrderedDict):
+        # Order of example fields is significant.
+        return [[k, _describe_value(v)] for k, v in value.items()]
+    elif isinstance(value, dict):
+        return [[k, _describe_value(v)] for k, v in sorted(value.items())]
+    elif isinstance(value, (list, tuple)):
+        return [_describe_value(v) for v in value]
+    elif isinstance(value, float):
+        return ['float', repr(value)]
+    else:
+        return value
@@ -2,9 +2,12 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 from abc import ABCMeta, abstractmethod
 from contextlib import contextmanager
+import codecs
+import multiprocessing
 import os
 import six
 import textwrap
+import traceback
 import typing
 
 # Hack to get around some of Python 2's standard library modules that
@@ -17,9 +20,12 @@ argparse = importlib.import_module(str('argparse'))  # type: typing.Any
 logging = importlib.import_module(str('logging'))  # type: typing.Any
 open = open  # type: typing.Any # pylint: disable=redefined-builtin
 
-from stone.api import Api  # noqa: F401 # pylint: disable=unused-import
+from stone.api import Api, ApiNamespace  # noqa: F401 # pylint: disable=unused-import
+from stone.build_manifest import IncrementalBuild  # noqa: F401 # pylint: disable=unused-import
+from stone.profiling import Profiler  # noqa: F401 # pylint: disable=unused-import
 
 from stone.lang.tower import doc_ref_re
+from stone.profiling import NullProfiler
 from stone.data_type import (
     is_alias,
 )
@@ -51,8 +57,8 @@ def remove_aliases_from_api(api):
                 else:
                     break
 
-        for data_type in namespace.data_types:
-            for field in data_type.fields:
+        for composite in namespace.data_types:
+            for field in composite.fields:
                 data_type = field
                 while True:
                     if hasattr(data_type, 'data_type'):
@@ -61,6 +67,9 @@ def remove_aliases_from_api(api):
                         data_type = data_type.data_type
                     else:
                         break
+            # A field that was an alias of a nullable type is now nullable,
+            # which makes it optional.
+            composite._invalidate_field_layouts()
 
         for route in namespace.routes:
             if is_alias(route.arg_data_type):
@@ -74,8 +83,118 @@ def remove_aliases_from_api(api):
         namespace.aliases = []
         namespace.alias_by_name = {}
 
+    # Reindex the references that no longer go through aliases.
+    api.normalize()
     return api
 
+def _write_if_changed(path, data):
+    # type: (typing.Text, bytes) -> None
+    """Writes data to the file at path, unless the file already holds it."""
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, 'rb') as f:
+                if f.read() == data:
+                    return
+    except (IOError, OSError):
+        pass
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def _files_equal(path1, path2):
+    # type: (typing.Text, typing.Text) -> bool
+    """Compares the contents of two files without reading them whole."""
+    try:
+        if os.path.getsize(path1) != os.path.getsize(path2):
+            return False
+        with open(path1, 'rb') as f1, open(path2, 'rb') as f2:
+            while True:
+                chunk1 = f1.read(_STREAM_CHUNK_SIZE)
+                if chunk1 != f2.read(_STREAM_CHUNK_SIZE):
+                    return False
+                elif not chunk1:
+                    return True
+    except (IOError, OSError):
+        return False
+
+def _replace_file(src, dst):
+    # type: (typing.Text, typing.Text) -> None
+    if six.PY3:
+        os.replace(src, dst)  # pylint: disable=no-member
+    else:
+        if os.name == 'nt' and os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+# Size of the chunks in which streamed output is written.
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+class _StreamingOutput(object):
+    """
+    Output buffer that encodes text as UTF-8 and writes it to a file in
+    chunks, so that the contents of a file are never held in memory at once.
+    Like the list used as an in-memory output buffer, text is added with
+    append().
+    """
+
+    def __init__(self, f):
+        # type: (typing.BinaryIO) -> None
+        self._file = f
+        self._encoder = codecs.getincrementalencoder('utf-8')()
+        self._pending = []  # type: typing.List[typing.Text]
+        self._pending_size = 0
+
+    def append(self, s):
+        # type: (typing.Text) -> None
+        self._pending.append(s)
+        self._pending_size += len(s)
+        if self._pending_size >= _STREAM_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self, final=False):
+        # type: (bool) -> None
+        self._file.write(self._encoder.encode(''.join(self._pending), final))
+        self._pending = []
+        self._pending_size = 0
+
+# Indentation strings by indentation level, as returned by make_indent().
+_space_indents = {}  # type: typing.Dict[int, typing.Text]
+_tab_indents = {}  # type: typing.Dict[int, typing.Text]
+
+# The generator, render function, and items of the running call to
+# Generator.render_in_parallel(). Worker processes inherit it by forking.
+_parallel_render = None  # type: typing.Any
+
+def _can_render_in_workers():
+    # type: () -> bool
+    # Daemonic processes, such as the workers of the compiler, can't have
+    # children.
+    if multiprocessing.current_process().daemon:
+        return False
+    if six.PY2:
+        return hasattr(os, 'fork')
+    return multiprocessing.get_start_method() == 'fork'
+
+def _render_in_worker(index):
+    # type: (int) -> typing.Tuple[typing.Any, ...]
+    """
+    Renders an item of the running call to render_in_parallel(). Returns the
+    result, the output files, the namespace outputs recorded by an incremental
+    build, the new profiling records, and the traceback of the exception
+    raised by the render function, if any.
+    """
+    generator, render, items = _parallel_render
+    records_start = len(generator.profiler.records)
+    try:
+        with generator._isolated_emit_state():  # pylint: disable=protected-access
+            result = render(items[index])
+    except:  # noqa: E722 # pylint: disable=bare-except
+        return None, None, None, None, traceback.format_exc()
+    namespace_outputs = None
+    if generator.incremental_build:
+        namespace_outputs = generator.incremental_build.namespace_outputs
+    return (result, generator.output_files, namespace_outputs,
+            generator.profiler.records[records_start:], None)
+
 
 @six.add_metaclass(ABCMeta)
 class Generator(object):
@@ -110,6 +229,24 @@ class Generator(object):
     # For backwards compatibility with existing generators defaults to false.
     preserve_aliases = False
 
+    # Can be overridden by a subclass. If true, the generator skips the
+    # namespaces for which is_namespace_output_current() is true, and
+    # generates the others inside output_for_namespace(). Files that depend on
+    # more than one namespace must always be generated.
+    supports_incremental_build = False
+
+    # Can be overridden by a subclass with the class names of generators that
+    # must finish before this one starts, if they are part of the same build.
+    # Without it, generators may run in any order, or concurrently.
+    run_after = ()  # type: typing.Tuple[typing.Text, ...]
+
+    # Can be overridden by a subclass. If true, output_to_relative_path()
+    # streams emitted text to the file instead of keeping it in self.output,
+    # which bounds memory use for large files. The output buffer then can't be
+    # read or cleared within output_to_relative_path(). For backwards
+    # compatibility with existing generators defaults to false.
+    stream_output = False
+
     def __init__(self, target_folder_path, args):
         # type: (str, typing.Optional[typing.Sequence[str]]) -> None
         """
@@ -126,6 +263,20 @@ class Generator(object):
         self.lineno = 1
         self.cur_indent = 0
 
+        # Set by the compiler if the generator supports incremental builds.
+        self.incremental_build = None  # type: typing.Optional[IncrementalBuild]
+        # Set by the compiler. Number of processes render_in_parallel() may
+        # use.
+        self.jobs = 1
+        # Set by the compiler. Records the time taken by each output file.
+        self.profiler = NullProfiler()  # type: Profiler
+        # Relative paths of the files generated, whether or not they had to
+        # be written. The compiler removes files that a previous build
+        # generated and that are no longer part of the output.
+        self.output_files = []  # type: typing.List[typing.Text]
+        # Name of the namespace whose output is being generated.
+        self._output_namespace = None  # type: typing.Optional[typing.Text]
+
         self.args = None  # type: typing.Optional[argparse.Namespace]
 
         if self.cmdline_parser:
@@ -158,27 +309,176 @@ class Generator(object):
         Sets up generator so that all emits are directed towards the new file
         created at :param:`relative_path`.
 
-        Clears the output buffer on enter and exit.
+        Clears the output buffer on enter and exit. If the file already has
+        the generated contents, it isn't written, so that its modification
+        time only changes with its contents.
+        """
+        full_path = self._start_output_file(relative_path)
+        self.logger.info('Generating %s', full_path)
+        with self.profiler.phase('output_file', os.path.normpath(relative_path)), \
+                self._output_to_file(full_path):
+            yield
+
+    @contextmanager
+    def _output_to_file(self, full_path):
+        # type: (typing.Text) -> typing.Iterator[None]
+        if not self.stream_output:
+            self.output = []
+            yield
+            _write_if_changed(full_path, ''.join(self.output).encode('utf-8'))
+            self.output = []
+            return
+
+        # Stream to a temporary file next to the output file, which replaces
+        # it only if the contents differ.
+        temp_path = os.path.join(
+            os.path.dirname(full_path),
+            '.%s.%d.tmp' % (os.path.basename(full_path), os.getpid()))
+        try:
+            with open(temp_path, 'wb') as f:
+                output = _StreamingOutput(f)
+                self.output = output  # type: ignore
+                yield
+                output.flush(final=True)
+            if not _files_equal(temp_path, full_path):
+                _replace_file(temp_path, full_path)
+        finally:
+            self.output = []
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def copy_to_relative_path(self, source_path, relative_path):
+        # type: (typing.Text, typing.Text) -> None
+        """
+        Copies a file, such as a runtime library for the generated code, to
+        relative_path in the output folder. As with output_to_relative_path(),
+        an identical file is left untouched.
         """
+        full_path = self._start_output_file(relative_path)
+        self.logger.info('Copying %s to %s', os.path.basename(source_path), full_path)
+        with open(source_path, 'rb') as f:
+            _write_if_changed(full_path, f.read())
+
+    def _start_output_file(self, relative_path):
+        # type: (typing.Text) -> typing.Text
+        """Creates the folder of an output file, records the file, and
+        returns its full path."""
         full_path = os.path.join(self.target_folder_path, relative_path)
         directory = os.path.dirname(full_path)
         if not os.path.exists(directory):
             self.logger.info('Creating %s', directory)
             os.makedirs(directory)
 
-        self.logger.info('Generating %s', full_path)
-        self.output = []
-        yield
-        with open(full_path, 'wb') as f:
-            f.write(''.join(self.output).encode('utf-8'))
-        self.output = []
+        relative_path = os.path.normpath(relative_path)
+        if relative_path not in self.output_files:
+            self.output_files.append(relative_path)
+        if self.incremental_build and self._output_namespace:
+            self.incremental_build.add_file(self._output_namespace, relative_path)
+        return full_path
+
+    def is_namespace_output_current(self, namespace):
+        # type: (ApiNamespace) -> bool
+        """
+        Returns True if the files previously generated for the namespace are
+        up to date, in which case the namespace needn't be generated again.
+        This is only ever the case for generators that set
+        supports_incremental_build.
+        """
+        if self.incremental_build is None:
+            return False
+        return self.incremental_build.is_namespace_output_current(namespace.name)
+
+    @contextmanager
+    def output_for_namespace(self, namespace):
+        # type: (ApiNamespace) -> typing.Iterator[None]
+        """
+        All files created with output_to_relative_path() for the duration of
+        the context manager are recorded as the output of the namespace. They
+        must depend only on the namespace and the namespaces it imports.
+        """
+        if self.incremental_build:
+            self.incremental_build.start_namespace(namespace.name)
+        self._output_namespace = namespace.name
+        try:
+            yield
+        finally:
+            self._output_namespace = None
+
+    def render_in_parallel(
+            self,
+            render,  # type: typing.Callable[[typing.Any], typing.Any]
+            items,   # type: typing.List[typing.Any]
+    ):
+        # type: (...) -> typing.List[typing.Any]
+        """
+        Calls render with each item, such as the namespaces of the API, and
+        returns the results in order. Each call starts with an empty output
+        buffer and no indentation, and should write its output with
+        output_to_relative_path().
+
+        If the compiler allows more than one job, the calls are spread over
+        forked worker processes. Changes that render makes to the generator
+        are then lost, except for the record of the files they output, so
+        render should return whatever the generator needs afterwards. The
+        results must be picklable.
+        """
+        global _parallel_render  # pylint: disable=global-statement
+        jobs = min(self.jobs, len(items))
+        if jobs < 2 or not _can_render_in_workers():
+            results = []
+            for item in items:
+                with self._isolated_emit_state():
+                    results.append(render(item))
+            return results
+
+        self.logger.info('Rendering %d items with %d jobs', len(items), jobs)
+        _parallel_render = (self, render, items)
+        pool = multiprocessing.Pool(jobs)
+        try:
+            rendered = pool.map(_render_in_worker, range(len(items)), chunksize=1)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+            _parallel_render = None
+
+        results = []
+        for item, (result, output_files, namespace_outputs, records, tb) in zip(
+                items, rendered):
+            if tb is not None:
+                raise RuntimeError('Rendering %r failed in a worker process:\n%s' %
+                                   (item, tb))
+            self.profiler.records.extend(records)
+            for relative_path in output_files:
+                if relative_path not in self.output_files:
+                    self.output_files.append(relative_path)
+            if namespace_outputs:
+                self.incremental_build.namespace_outputs.update(namespace_outputs)
+            results.append(result)
+        return results
+
+    @contextmanager
+    def _isolated_emit_state(self):
+        # type: () -> typing.Iterator[None]
+        """Starts from an empty output buffer and no indentation, and restores
+        the previous emit state on exit."""
+        saved = self.output, self.lineno, self.cur_indent
+        self.output, self.lineno, self.cur_indent = [], 1, 0
+        try:
+            yield
+        finally:
+            self.output, self.lineno, self.cur_indent = saved
 
     def output_buffer_to_string(self):
         # type: () -> typing.Text
         """Returns the contents of the output buffer as a string."""
+        assert isinstance(self.output, list), \
+            'The output buffer is not available while output is streamed.'
         return ''.join(self.output)
 
     def clear_output_buffer(self):
+        assert isinstance(self.output, list), \
+            'The output buffer cannot be cleared while output is streamed.'
         self.output = []
 
     @contextmanager
@@ -207,10 +507,13 @@ class Generator(object):
         either spaces or tabs, depending on the value of the class variable
         tabs_for_indents.
         """
-        if self.tabs_for_indents:
-            return '\t' * self.cur_indent
-        else:
-            return ' ' * self.cur_indent
+        indents = _tab_indents if self.tabs_for_indents else _space_indents
+        try:
+            return indents[self.cur_indent]
+        except KeyError:
+            indent = ('\t' if self.tabs_for_indents else ' ') * self.cur_indent
+            indents[self.cur_indent] = indent
+            return indent
 
     def emit_raw(self, s):
         # type: (typing.Text) -> None
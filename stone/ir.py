@@ -0,0 +1,113 @@
+"""
+Reads and writes the intermediate representation (IR) of an API.
+
+The IR is the fully resolved :class:`stone.api.Api` produced by the front end:
+namespaces, data types, aliases, routes, examples, and the route schema. Loading
+it is much faster than parsing and resolving specs, so pipelines that run
+several generators against the same specs only need to run the front end once.
+
+An IR file starts with a line identifying the format, followed by a line of
+JSON describing the versions it was written with, followed by the pickled API.
+An IR file is only read by the same version of Stone on the same major version
+of Python that wrote it. Like any pickle, it must come from a trusted source.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import json
+import sys
+import typing  # noqa: F401 # pylint: disable=unused-import
+
+from six.moves import cPickle as pickle
+
+from stone import __version__
+from stone.api import Api  # noqa: F401 # pylint: disable=unused-import
+
+IR_EXTENSION = '.stoneir'
+
+_MAGIC = b'STONEIR\n'
+
+# Bump whenever the layout of the file or of the pickled objects changes in a
+# way that isn't reflected by the Stone version.
+_IR_FORMAT = 2
+
+# Pickling follows references between data types recursively, which can run
+# deep for large APIs.
+_RECURSION_LIMIT = 20000
+
+class InvalidIR(Exception):
+    """Raised when a file isn't an IR file that can be read."""
+
+    def __init__(self, msg, path):
+        # type: (typing.Text, typing.Text) -> None
+        super(InvalidIR, self).__init__(msg, path)
+        self.msg = msg
+        self.path = path
+
+def _header():
+    # type: () -> typing.Dict[typing.Text, typing.Any]
+    return {
+        'format': _IR_FORMAT,
+        'stone_version': __version__,
+        'python_version': sys.version_info[0],
+    }
+
+def serialize_api(api):
+    # type: (Api) -> bytes
+    """Returns the API serialized as bytes, without the IR header. Use it
+    with :func:`deserialize_api` to make independent copies of an API."""
+    old_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(old_limit, _RECURSION_LIMIT))
+    try:
+        return pickle.dumps(api, pickle.HIGHEST_PROTOCOL)
+    finally:
+        sys.setrecursionlimit(old_limit)
+
+def deserialize_api(data):
+    # type: (bytes) -> Api
+    """Returns the API serialized by :func:`serialize_api`."""
+    old_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(old_limit, _RECURSION_LIMIT))
+    try:
+        return pickle.loads(data)
+    finally:
+        sys.setrecursionlimit(old_limit)
+
+def write_ir(api, path):
+    # type: (Api, typing.Text) -> None
+    """Writes the IR of a resolved API to path."""
+    header = json.dumps(_header(), sort_keys=True).encode('utf-8') + b'\n'
+    payload = serialize_api(api)
+    with open(path, 'wb') as f:
+        f.write(_MAGIC)
+        f.write(header)
+        f.write(payload)
+
+def read_ir(path):
+    # type: (typing.Text) -> Api
+    """Reads the API from an IR file. Raises InvalidIR if the file can't be
+    read by this version of Stone."""
+    with open(path, 'rb') as f:
+        if f.readline() != _MAGIC:
+            raise InvalidIR('Not a Stone IR file.', path)
+        try:
+            header = json.loads(f.readline().decode('utf-8'))
+        except ValueError:
+            raise InvalidIR('Corrupt IR header.', path)
+        if not isinstance(header, dict):
+            raise InvalidIR('Corrupt IR header.', path)
+        elif header != _header():
+            raise InvalidIR(
+                'IR was written by Stone %s on Python %s (format %s); '
+                'regenerate it with this version.' %
+                (header.get('stone_version'), header.get('python_version'),
+                 header.get('format')),
+                path)
+        payload = f.read()
+    try:
+        api = deserialize_api(payload)
+    except Exception:  # pylint: disable=broad-except
+        raise InvalidIR('Corrupt IR payload.', path)
+    if not isinstance(api, Api):
+        raise InvalidIR('IR does not contain an API.', path)
+    return api
@@ -26,3 +26,20 @@ class InvalidSpec(Exception):
             self.lineno,
             self.path,
         )
+
+class InvalidSpecs(InvalidSpec):
+    """Raised when several errors were found in the specifications at once.
+    Its message, line number, and path are those of the first error."""
+
+    def __init__(self, errors):
+        """
+        Args:
+            errors (List[InvalidSpec]): Every error, in the order they were
+                found.
+        """
+        first = errors[0]
+        super(InvalidSpecs, self).__init__(first.msg, first.lineno, first.path)
+        self.errors = errors
+
+    def __repr__(self):
+        return 'InvalidSpecs({!r})'.format(self.errors)
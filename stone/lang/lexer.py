@@ -13,9 +13,20 @@ class MultiToken(object):
         self.type = tokens[0].type
         self.tokens = tokens
 
+class _StoneNullType(object):
+    """Type of the :data:`StoneNull` singleton."""
+
+    def __reduce__(self):
+        # Unpickling (e.g. parser output loaded from a cache) must yield the
+        # singleton so that identity checks against StoneNull keep working.
+        return str('StoneNull')
+
+    def __repr__(self):
+        return 'StoneNull'
+
 # Represents a null value. We want to differentiate between the Python "None"
 # and null in several places.
-StoneNull = object()
+StoneNull = _StoneNullType()
 
 class StoneLexer(object):
     """
@@ -30,6 +41,9 @@ class StoneLexer(object):
         self.last_token = None
         # [(character, line number), ...]
         self.errors = []
+        # Map of identifier -> the instance of it shared by all tokens, so
+        # that names repeated across a spec are stored once.
+        self._identifiers = {}  # type: typing.Dict[typing.Text, typing.Text]
 
     def input(self, file_data, **kwargs):
         """
@@ -37,7 +51,13 @@ class StoneLexer(object):
 
         :param str file_data: Contents of the file to lex.
         """
-        self.lex = lex.lex(module=self, **kwargs)
+        if kwargs:
+            self.lex = lex.lex(module=self, **kwargs)
+        else:
+            self.lex = _get_master_lex().clone(self)
+            # Lexer.clone() rebinds the rules, but leaves the active state
+            # pointing at the rules of the master.
+            self.lex.begin('INITIAL')
         self.tokens_queue = []
         self.cur_indent = 0
         # Hack to avoid tokenization bugs caused by files that do not end in a
@@ -197,6 +217,7 @@ class StoneLexer(object):
             token.type = self.RESERVED.get(token.value, 'KEYWORD')
             return token
         else:
+            token.value = self._identifiers.setdefault(token.value, token.value)
             return token
 
     def t_PATH(self, token):
@@ -338,3 +359,17 @@ class StoneLexer(object):
             ('Illegal character %s.' % repr(token.value[0]).lstrip('u'),
              token.lexer.lineno))
         token.lexer.skip(1)
+
+_master_lex = None  # type: typing.Optional[lex.Lexer]
+
+def _get_master_lex():
+    """
+    Returns a ply lexer for StoneLexer that's built once per process.
+    Compiling the master regular expression of all token rules is expensive,
+    so each file is lexed by a clone of this lexer with its rules rebound to
+    the StoneLexer that's doing the lexing.
+    """
+    global _master_lex  # pylint: disable=global-statement
+    if _master_lex is None:
+        _master_lex = lex.lex(module=StoneLexer())
+    return _master_lex
@@ -0,0 +1,95 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+import typing  # noqa: F401 # pylint: disable=unused-import
+
+import six
+from six.moves import cPickle as pickle
+
+from .. import __version__
+from .parser import grammar_signature
+
+# Bump whenever the layout of a cache entry changes.
+_CACHE_FORMAT = 1
+
+class ParseCache(object):
+    """
+    An on-disk cache of parser output keyed by the path and contents of a spec.
+
+    Entries are salted with the version of Stone, the version of Python, and
+    a signature of the grammar so that any change to the lexer or parser
+    automatically invalidates stale entries. A missing, unreadable, or corrupt
+    entry is treated as a cache miss and is never fatal.
+    """
+
+    def __init__(self, cache_dir):
+        # type: (typing.Text) -> None
+        """
+        Args:
+            cache_dir (str): Directory where entries are stored. It's created
+                on the first write if it doesn't exist.
+        """
+        self.cache_dir = cache_dir
+        self._logger = logging.getLogger('stone.idl')
+        self._salt = '\0'.join([
+            str(_CACHE_FORMAT),
+            __version__,
+            '%d.%d' % sys.version_info[:2],
+            grammar_signature(),
+        ])
+
+    def _entry_path(self, path, text):
+        # type: (typing.Optional[typing.Text], typing.Text) -> typing.Text
+        h = hashlib.sha1()
+        for part in (self._salt, path or '', text):
+            if isinstance(part, six.text_type):
+                part = part.encode('utf-8')
+            h.update(part)
+            h.update(b'\0')
+        return os.path.join(self.cache_dir, h.hexdigest() + '.pickle')
+
+    def get(self, path, text):
+        # type: (typing.Optional[typing.Text], typing.Text) -> typing.Any
+        """
+        Returns the parser output previously stored for a spec, or None if
+        there's no usable entry.
+        """
+        entry_path = self._entry_path(path, text)
+        try:
+            with open(entry_path, 'rb') as f:
+                return pickle.load(f)
+        except (IOError, OSError):
+            return None
+        except Exception:  # pylint: disable=broad-except
+            # Any failure to unpickle means the entry can't be trusted.
+            self._logger.info('Ignoring corrupt parse cache entry %s',
+                              entry_path)
+            return None
+
+    def put(self, path, text, parsed_data):
+        # type: (typing.Optional[typing.Text], typing.Text, typing.Any) -> None
+        """
+        Stores the parser output for a spec. The entry is written to a
+        temporary file and renamed into place so that concurrent readers never
+        observe a partial entry. Failures to write are logged and ignored.
+        """
+        entry_path = self._entry_path(path, text)
+        try:
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir,
+                                            suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(parsed_data, f, pickle.HIGHEST_PROTOCOL)
+                os.rename(tmp_path, entry_path)
+            except Exception:
+                os.remove(tmp_path)
+                raise
+        except Exception:  # pylint: disable=broad-except
+            self._logger.info('Unable to write parse cache entry %s',
+                              entry_path, exc_info=True)
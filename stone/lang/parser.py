@@ -1,15 +1,22 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 from collections import OrderedDict
+import hashlib
 import logging
 import six
+import typing  # noqa: F401 # pylint: disable=unused-import
 
 import ply.yacc as yacc
 
 from .lexer import StoneLexer, StoneNull
 
+# Module containing the prebuilt parsing tables.
+_TABMODULE = str('stone.lang.parsetab')
+
 class _Element(object):
 
+    __slots__ = ('path', 'lineno', 'lexpos')
+
     def __init__(self, path, lineno, lexpos):
         """
         Args:
@@ -24,6 +31,8 @@ class _Element(object):
 
 class StoneNamespace(_Element):
 
+    __slots__ = ('name', 'doc')
+
     def __init__(self, path, lineno, lexpos, name, doc):
         """
         Args:
@@ -42,6 +51,8 @@ class StoneNamespace(_Element):
 
 class StoneImport(_Element):
 
+    __slots__ = ('target',)
+
     def __init__(self, path, lineno, lexpos, target):
         """
         Args:
@@ -58,6 +69,8 @@ class StoneImport(_Element):
 
 class StoneAlias(_Element):
 
+    __slots__ = ('name', 'type_ref', 'doc')
+
     def __init__(self, path, lineno, lexpos, name, type_ref, doc):
         """
         Args:
@@ -75,6 +88,8 @@ class StoneAlias(_Element):
 
 class StoneTypeDef(_Element):
 
+    __slots__ = ('name', 'extends', 'doc', 'fields', 'examples')
+
     def __init__(self, path, lineno, lexpos, name, extends, doc, fields,
                  examples):
         """
@@ -111,6 +126,8 @@ class StoneTypeDef(_Element):
 
 class StoneStructDef(StoneTypeDef):
 
+    __slots__ = ('subtypes',)
+
     def __init__(self, path, lineno, lexpos, name, extends, doc, fields,
                  examples, subtypes=None):
         """
@@ -136,6 +153,8 @@ class StoneStructDef(StoneTypeDef):
 
 class StoneUnionDef(StoneTypeDef):
 
+    __slots__ = ('closed',)
+
     def __init__(self, path, lineno, lexpos, name, extends, doc, fields,
                  examples, closed=False):
         """
@@ -158,6 +177,8 @@ class StoneUnionDef(StoneTypeDef):
 
 class StoneTypeRef(_Element):
 
+    __slots__ = ('name', 'args', 'nullable', 'ns')
+
     def __init__(self, path, lineno, lexpos, name, args, nullable, ns):
         """
         Args:
@@ -183,6 +204,8 @@ class StoneTypeRef(_Element):
 
 class StoneTagRef(_Element):
 
+    __slots__ = ('tag',)
+
     def __init__(self, path, lineno, lexpos, tag):
         """
         Args:
@@ -202,6 +225,8 @@ class StoneField(_Element):
     TODO(kelkabany): Split this into two different classes.
     """
 
+    __slots__ = ('name', 'type_ref', 'doc', 'has_default', 'default', 'deprecated')
+
     def __init__(self, path, lineno, lexpos, name, type_ref, deprecated):
         """
         Args:
@@ -232,6 +257,8 @@ class StoneField(_Element):
 
 class StoneVoidField(_Element):
 
+    __slots__ = ('name', 'doc')
+
     def __init__(self, path, lineno, lexpos, name):
         super(StoneVoidField, self).__init__(path, lineno, lexpos)
         self.name = name
@@ -250,6 +277,8 @@ class StoneVoidField(_Element):
 
 class StoneSubtypeField(_Element):
 
+    __slots__ = ('name', 'type_ref')
+
     def __init__(self, path, lineno, lexpos, name, type_ref):
         super(StoneSubtypeField, self).__init__(path, lineno, lexpos)
         self.name = name
@@ -263,6 +292,9 @@ class StoneSubtypeField(_Element):
 
 class StoneRouteDef(_Element):
 
+    __slots__ = ('name', 'deprecated', 'arg_type_ref', 'result_type_ref',
+                 'error_type_ref', 'doc', 'attrs')
+
     def __init__(self, path, lineno, lexpos, name, deprecated,
                  arg_type_ref, result_type_ref, error_type_ref=None):
         super(StoneRouteDef, self).__init__(path, lineno, lexpos)
@@ -282,6 +314,8 @@ class StoneRouteDef(_Element):
 
 class StoneAttrField(_Element):
 
+    __slots__ = ('name', 'value')
+
     def __init__(self, path, lineno, lexpos, name, value):
         super(StoneAttrField, self).__init__(path, lineno, lexpos)
         self.name = name
@@ -295,6 +329,8 @@ class StoneAttrField(_Element):
 
 class StoneExample(_Element):
 
+    __slots__ = ('label', 'text', 'fields')
+
     def __init__(self, path, lineno, lexpos, label, text, fields):
         super(StoneExample, self).__init__(path, lineno, lexpos)
         self.label = label
@@ -310,6 +346,8 @@ class StoneExample(_Element):
 
 class StoneExampleField(_Element):
 
+    __slots__ = ('name', 'value')
+
     def __init__(self, path, lineno, lexpos, name, value):
         super(StoneExampleField, self).__init__(path, lineno, lexpos)
         self.name = name
@@ -323,6 +361,8 @@ class StoneExampleField(_Element):
 
 class StoneExampleRef(_Element):
 
+    __slots__ = ('label',)
+
     def __init__(self, path, lineno, lexpos, label):
         super(StoneExampleRef, self).__init__(path, lineno, lexpos)
         self.label = label
@@ -345,7 +385,11 @@ class StoneParser(object):
 
     def __init__(self, debug=False):
         self.debug = debug
-        self.yacc = yacc.yacc(module=self, debug=self.debug, write_tables=self.debug)
+        # The LALR tables are shipped in the parsetab module. PLY only
+        # regenerates them if the grammar no longer matches their signature.
+        # In debug mode, regenerated tables are written back to that module.
+        self.yacc = yacc.yacc(module=self, debug=self.debug, write_tables=self.debug,
+                              tabmodule=_TABMODULE)
         self.lexer = StoneLexer()
         self._logger = logging.getLogger('stone.stone.parser')
         # [(token type, token value, line number), ...]
@@ -1000,3 +1044,29 @@ class StoneParser(object):
             ("Unexpected %s with value %s." %
              (token.type, repr(token.value).lstrip('u')),
              token.lineno, self.path))
+
+_grammar_signature = None  # type: typing.Optional[str]
+
+def grammar_signature():
+    """
+    Returns a hex digest of the lexer rules and the grammar. It changes
+    whenever a token, regular expression, or BNF rule is modified, so it can
+    be used to invalidate anything derived from the output of the parser.
+    """
+    global _grammar_signature  # pylint: disable=global-statement
+    if _grammar_signature is None:
+        parts = [repr(StoneParser.start), repr(StoneParser.tokens)]
+        parts.append(repr(StoneLexer.KEYWORDS))
+        parts.append(repr(sorted(StoneLexer.RESERVED.items())))
+        for cls, prefix in ((StoneLexer, 't_'), (StoneParser, 'p_')):
+            for name in sorted(dir(cls)):
+                if not name.startswith(prefix):
+                    continue
+                rule = getattr(cls, name)
+                if isinstance(rule, six.string_types):
+                    parts.append('%s=%s' % (name, rule))
+                else:
+                    parts.append('%s=%s' % (name, rule.__doc__))
+        _grammar_signature = hashlib.sha1(
+            '\n'.join(parts).encode('utf-8')).hexdigest()
+    return _grammar_signature
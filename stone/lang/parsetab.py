@@ -0,0 +1,138 @@
+
+# parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = u'specATTRS BOOLEAN BY COMMA DEDENT DEPRECATED DOT EQ EXTENDS FLOAT ID IMPORT INDENT INTEGER KEYWORD LBRACKET LPAR NEWLINE NULL PATH Q RBRACKET ROUTE RPAR STRING STRUCT UNION UNION_CLOSEDspec : NL\n                | emptyspec : namespace\n                | import\n                | definitionspec : spec namespace\n                | spec import\n                | spec definitionspec : spec NLdefinition : alias\n                      | struct\n                      | union\n                      | routenamespace : KEYWORD ID NL\n                     | KEYWORD ID NL INDENT docsection DEDENTimport : IMPORT ID NLalias : KEYWORD ID EQ type_ref NL\n                 | KEYWORD ID EQ type_ref NL INDENT docsection DEDENTNL : NEWLINENL : NL NEWLINEprimitive : BOOLEAN\n                     | FLOAT\n                     | INTEGER\n                     | NULL\n                     | STRINGpos_arg : primitive\n                   | type_refpos_args_list : pos_argpos_args_list : pos_args_list COMMA pos_argkw_arg : ID EQ primitive\n                  | ID EQ type_refkw_args : kw_argkw_args : kw_args COMMA kw_argargs : LPAR pos_args_list COMMA kw_args RPAR\n                | LPAR pos_args_list RPAR\n                | LPAR kw_args RPAR\n                | LPAR RPAR\n                | emptynullable : Q\n                    | emptytype_ref : ID args nullabletype_ref : ID DOT ID args nullableenumerated_subtypes : uniont NL INDENT subtypes_list DEDENT\n                               | emptystruct : STRUCT ID inheritance NL                      INDENT docsection enumerated_subtypes field_list examples DEDENTanony_def : STRUCT empty inheritance NL                 INDENT docsection enumerated_subtypes field_list examples DEDENTinheritance : EXTENDS type_ref\n                       | emptysubtypes_list : subtype_field\n                         | emptysubtypes_list : subtypes_list subtype_fieldsubtype_field : ID type_ref NLfield_list : field\n                      | emptyfield_list : field_list fielddeprecation : DEPRECATED\n                       | emptydefault_option : EQ primitive\n                          | EQ tag_ref\n                          | emptyfield : ID type_ref default_option deprecation NL                     INDENT docsection anony_def_option DEDENT\n                 | ID type_ref default_option deprecation NLanony_def_option : anony_def\n                            | emptytag_ref : IDunion : uniont ID inheritance NL                         INDENT docsection field_list examples DEDENTanony_def : uniont empty inheritance NL                         INDENT docsection field_list examples DEDENTuniont : UNION\n                  | UNION_CLOSEDfield : ID NL\n                 | ID NL INDENT docstring NL DEDENTroute : ROUTE route_name route_io route_deprecation NL                         INDENT docsection attrssection DEDENT\n                 | ROUTE route_name route_io route_deprecation NLroute_name : ID route_pathroute_path : PATH\n                      | emptyroute_io : LPAR type_ref COMMA type_ref RPAR\n                    | LPAR type_ref COMMA type_ref COMMA type_ref RPARroute_deprecation : DEPRECATED\n                             | DEPRECATED BY route_name\n                             | emptyattrssection : ATTRS NL INDENT attr_fields DEDENT\n                        | emptyattr_fields : attr_fieldattr_fields : attr_fields attr_fieldattr_field : ID EQ primitive NL\n                      | ID EQ tag_ref NLdocsection : docstring NL\n                      | emptydocstring : STRINGexamples : example\n                    | emptyexamples : examples exampleexample : KEYWORD ID NL INDENT docsection example_fields DEDENT\n                   | KEYWORD ID NLexample_fields : example_fieldexample_fields : example_fields example_fieldexample_field : ID EQ primitive NL\n                         | ID EQ ex_list NLexample_field : ID EQ ID NLex_list : LBRACKET ex_list_items RBRACKET\n                   | LBRACKET empty RBRACKETex_list_item : primitiveex_list_item : IDex_list_item : ex_listex_list_items : ex_list_itemex_list_items : ex_list_items COMMA ex_list_itemempty :'
+    
+_lr_action_items = {u'DEDENT':([7,22,42,54,55,64,65,66,68,86,89,90,91,98,101,102,104,105,106,116,118,120,122,123,124,126,127,135,140,141,143,152,153,155,156,157,160,161,162,163,165,166,169,170,171,174,175,177,178,179,180,181,183,185,186,193,195,196,203,212,213,214,215,216,217,218,219,220,221,222,],[-19,-20,-108,67,-89,-108,-108,-88,-108,-108,-108,-108,108,-108,-53,-108,-54,-108,-44,130,-83,-55,-91,-92,134,-70,-108,-93,151,-108,-95,-49,162,-50,165,-84,-62,170,-43,-51,-82,-85,-108,-71,-52,-96,180,-108,-86,-87,-94,-97,-63,193,-64,-61,-98,-99,-100,-108,-108,-108,-108,-108,-108,220,-108,-67,222,-46,]),u'LPAR':([20,21,34,35,36,44,81,85,],[33,-108,-75,-76,-74,57,57,57,]),u'KEYWORD':([0,3,4,5,6,7,8,11,12,15,16,18,22,25,26,27,28,30,40,55,56,61,64,65,66,67,89,90,101,102,104,105,106,108,120,122,123,124,126,127,130,134,135,140,143,151,160,162,170,180,193,212,213,214,215,216,217,218,219,221,],[1,-1,-11,-10,-12,-19,-3,1,-2,-4,-5,-13,-20,-9,-6,-7,-8,-14,-16,-89,-17,-73,-108,-108,-88,-15,-108,-108,-53,121,-54,-108,-44,-18,-55,-91,-92,121,-70,121,-72,-66,-93,121,-95,-45,-62,-43,-71,-94,-61,-108,-108,-108,-108,121,-108,121,121,121,]),u'ROUTE':([0,3,4,5,6,7,8,11,12,15,16,18,22,25,26,27,28,30,40,56,61,67,108,130,134,151,],[2,-1,-11,-10,-12,-19,-3,2,-2,-4,-5,-13,-20,-9,-6,-7,-8,-14,-16,-17,-73,-15,-18,-72,-66,-45,]),u'RPAR':([44,57,58,59,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,84,85,88,92,94,97,109,110,111,113,114,115,119,129,],[-108,74,-108,-38,-26,-25,-32,-22,-27,-37,92,94,-21,-28,-23,-24,-108,-39,-40,-41,-108,100,-35,-36,-108,129,-29,-33,-30,-31,-42,132,-34,]),u'LBRACKET':([182,190,207,],[190,190,190,]),u'PATH':([21,],[34,]),u'NULL':([57,93,96,137,167,182,190,207,],[80,80,80,80,80,80,80,80,]),u'BY':([46,],[62,]),u'DOT':([44,81,],[60,60,]),u'DEPRECATED':([32,44,58,59,70,72,74,77,79,80,82,83,84,85,92,94,97,100,115,125,129,132,136,138,147,148,149,],[46,-108,-108,-38,-25,-22,-37,-21,-23,-24,-39,-40,-41,-108,-35,-36,-108,-77,-42,-108,-34,-78,145,-60,-58,-59,-65,]),u'NEWLINE':([0,3,4,5,6,7,8,11,12,13,14,15,16,18,19,21,22,23,24,25,26,27,28,29,30,32,34,35,36,37,39,40,41,43,44,45,46,47,49,50,51,52,53,56,58,59,61,66,67,70,72,74,77,79,80,82,83,84,85,87,92,94,97,100,103,107,108,115,117,125,126,128,129,130,131,132,133,134,136,138,143,144,145,146,147,148,149,150,151,160,161,164,171,172,173,178,179,184,187,188,189,191,192,194,195,196,203,204,205,206,208,209,210,],[7,22,-11,-10,-12,-19,-3,7,-2,-69,-68,-4,-5,-13,7,-108,-20,-108,7,22,-6,-7,-8,-108,22,-108,-75,-76,-74,7,-48,22,7,7,-108,7,-79,-81,22,-47,22,-90,7,22,-108,-38,22,22,-15,-25,-22,-37,-21,-23,-24,-39,-40,-41,-108,-80,-35,-36,-108,-77,7,7,-18,-42,7,-108,22,22,-34,-72,22,-78,7,-66,-108,-60,22,7,-56,-57,-58,-59,-65,7,-45,22,22,7,22,7,7,22,22,-108,-108,7,7,7,-108,-108,22,22,22,7,7,-101,-102,22,22,]),u'COMMA':([44,48,58,59,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,84,85,88,92,94,97,109,110,111,113,114,115,129,197,198,199,200,201,206,208,211,],[-108,63,-108,-38,-26,-25,-32,-22,-27,-37,93,95,-21,-28,-23,-24,-108,-39,-40,-41,-108,99,-35,-36,-108,95,-29,-33,-30,-31,-42,-34,-103,-105,207,-106,-104,-101,-102,-107,]),u'IMPORT':([0,3,4,5,6,7,8,11,12,15,16,18,22,25,26,27,28,30,40,56,61,67,108,130,134,151,],[10,-1,-11,-10,-12,-19,-3,10,-2,-4,-5,-13,-20,-9,-6,-7,-8,-14,-16,-17,-73,-15,-18,-72,-66,-45,]),'$end':([0,3,4,5,6,7,8,11,12,15,16,18,22,25,26,27,28,30,40,56,61,67,108,130,134,151,],[-108,-1,-11,-10,-12,-19,-3,0,-2,-4,-5,-13,-20,-9,-6,-7,-8,-14,-16,-17,-73,-15,-18,-72,-66,-45,]),u'UNION_CLOSED':([0,3,4,5,6,7,8,11,12,15,16,18,22,25,26,27,28,30,40,55,56,61,65,66,67,90,108,130,134,151,169,177,213,215,],[13,-1,-11,-10,-12,-19,-3,13,-2,-4,-5,-13,-20,-9,-6,-7,-8,-14,-16,-89,-17,-73,-108,-88,-15,13,-18,-72,-66,-45,-108,13,-108,13,]),u'STRING':([42,57,64,65,68,86,93,96,137,139,159,167,169,182,190,207,212,213,],[52,70,52,52,52,52,70,70,70,52,52,70,52,70,70,70,52,52,]),u'UNION':([0,3,4,5,6,7,8,11,12,15,16,18,22,25,26,27,28,30,40,55,56,61,65,66,67,90,108,130,134,151,169,177,213,215,],[14,-1,-11,-10,-12,-19,-3,14,-2,-4,-5,-13,-20,-9,-6,-7,-8,-14,-16,-89,-17,-73,-108,-88,-15,14,-18,-72,-66,-45,-108,14,-108,14,]),u'Q':([44,58,59,74,81,85,92,94,97,129,],[-108,82,-38,-37,-108,-108,-35,-36,82,-34,]),u'EXTENDS':([13,14,23,29,184,187,192,194,],[-69,-68,38,38,-108,-108,38,38,]),u'INTEGER':([57,93,96,137,167,182,190,207,],[79,79,79,79,79,79,79,79,]),u'EQ':([19,44,58,59,74,81,82,83,84,85,92,94,97,112,115,125,129,158,176,],[31,-108,-108,-38,-37,96,-39,-40,-41,-108,-35,-36,-108,96,-42,137,-34,167,182,]),u'ID':([1,2,7,9,10,13,14,17,22,31,33,38,55,57,60,62,63,64,65,66,89,90,93,95,96,99,101,102,103,104,105,106,120,121,126,127,137,141,142,152,153,154,155,156,157,159,160,162,163,166,167,168,170,171,174,175,178,179,181,182,190,193,195,196,203,207,212,213,214,215,216,217,219,],[19,21,-19,23,24,-69,-68,29,-20,44,44,44,-89,81,85,21,44,-108,-108,-88,103,-108,81,112,44,44,-53,103,44,-54,103,-44,-55,133,-70,103,149,154,158,-49,154,44,-50,158,-84,-108,-62,-43,-51,-85,149,176,-71,-52,-96,176,-86,-87,-97,191,201,-61,-98,-99,-100,201,-108,-108,103,-108,103,103,103,]),u'INDENT':([7,22,30,49,51,56,61,126,128,131,143,160,209,210,],[-19,-20,42,64,65,68,86,139,141,142,159,169,212,213,]),u'STRUCT':([0,3,4,5,6,7,8,11,12,15,16,18,22,25,26,27,28,30,40,55,56,61,66,67,108,130,134,151,169,177,],[17,-1,-11,-10,-12,-19,-3,17,-2,-4,-5,-13,-20,-9,-6,-7,-8,-14,-16,-89,-17,-73,-88,-15,-18,-72,-66,-45,-108,187,]),u'FLOAT':([57,93,96,137,167,182,190,207,],[72,72,72,72,72,72,72,72,]),u'BOOLEAN':([57,93,96,137,167,182,190,207,],[77,77,77,77,77,77,77,77,]),u'ATTRS':([7,22,55,66,86,98,],[-19,-20,-89,-88,-108,117,]),u'RBRACKET':([70,72,77,79,80,190,197,198,199,200,201,202,206,208,211,],[-25,-22,-21,-23,-24,-108,-103,-105,206,-106,-104,208,-101,-102,-107,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {u'route_deprecation':([32,],[45,]),u'primitive':([57,93,96,137,167,182,190,207,],[69,69,113,147,172,188,197,197,]),u'anony_def':([177,],[183,]),u'type_ref':([31,33,38,57,63,93,96,99,103,154,],[43,48,50,73,88,73,114,119,125,164,]),u'pos_args_list':([57,],[75,]),u'examples':([102,127,216,219,],[124,140,218,221,]),u'ex_list_items':([190,],[199,]),u'field_list':([89,105,214,217,],[102,127,216,219,]),u'NL':([0,11,19,24,37,41,43,45,53,103,107,117,133,144,150,164,172,173,188,189,191,204,205,],[3,25,30,40,49,51,56,61,66,126,128,131,143,160,161,171,178,179,195,196,203,209,210,]),u'struct':([0,11,],[4,4,]),u'inheritance':([23,29,192,194,],[37,41,204,205,]),u'union':([0,11,],[6,6,]),u'namespace':([0,11,],[8,26,]),u'subtype_field':([141,153,],[152,163,]),u'field':([89,102,105,127,214,216,217,219,],[101,120,101,120,101,120,101,120,]),u'kw_arg':([57,93,95,],[71,71,111,]),u'uniont':([0,11,90,177,215,],[9,9,107,184,107,]),u'default_option':([125,],[136,]),u'import':([0,11,],[15,27,]),'spec':([0,],[11,]),u'empty':([0,21,23,29,32,42,44,58,64,65,68,81,85,86,89,90,97,98,102,105,125,127,136,141,159,169,177,184,187,190,192,194,212,213,214,215,216,217,219,],[12,35,39,39,47,55,59,83,55,55,55,59,59,55,104,106,83,118,123,104,138,123,146,155,55,55,186,192,194,202,39,39,55,55,104,106,123,104,123,]),u'attr_fields':([142,],[156,]),u'deprecation':([136,],[144,]),u'example_field':([168,175,],[174,181,]),u'args':([44,81,85,],[58,58,97,]),u'docstring':([42,64,65,68,86,139,159,169,212,213,],[53,53,53,53,53,150,53,53,53,53,]),u'example_fields':([168,],[175,]),u'kw_args':([57,93,],[76,109,]),u'alias':([0,11,],[5,5,]),u'subtypes_list':([141,],[153,]),u'anony_def_option':([177,],[185,]),u'definition':([0,11,],[16,28,]),u'attr_field':([142,156,],[157,166,]),u'route_path':([21,],[36,]),u'nullable':([58,97,],[84,115,]),u'tag_ref':([137,167,],[148,173,]),u'route':([0,11,],[18,18,]),u'route_name':([2,62,],[20,87,]),u'docsection':([42,64,65,68,86,159,169,212,213,],[54,89,90,91,98,168,177,214,215,]),u'ex_list_item':([190,207,],[200,211,]),u'ex_list':([182,190,207,],[189,198,198,]),u'pos_arg':([57,93,],[78,110,]),u'route_io':([20,],[32,]),u'enumerated_subtypes':([90,215,],[105,217,]),u'example':([102,124,127,140,216,218,219,221,],[122,135,122,135,122,135,122,135,]),u'attrssection':([98,],[116,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> spec","S'",1,None,None,None),
+  (u'spec -> NL',u'spec',1,'p_spec_init','parser.py',407),
+  (u'spec -> empty',u'spec',1,'p_spec_init','parser.py',408),
+  (u'spec -> namespace',u'spec',1,'p_spec_init_decl','parser.py',412),
+  (u'spec -> import',u'spec',1,'p_spec_init_decl','parser.py',413),
+  (u'spec -> definition',u'spec',1,'p_spec_init_decl','parser.py',414),
+  (u'spec -> spec namespace',u'spec',2,'p_spec_iter','parser.py',418),
+  (u'spec -> spec import',u'spec',2,'p_spec_iter','parser.py',419),
+  (u'spec -> spec definition',u'spec',2,'p_spec_iter','parser.py',420),
+  (u'spec -> spec NL',u'spec',2,'p_spec_ignore_newline','parser.py',427),
+  (u'definition -> alias',u'definition',1,'p_definition','parser.py',431),
+  (u'definition -> struct',u'definition',1,'p_definition','parser.py',432),
+  (u'definition -> union',u'definition',1,'p_definition','parser.py',433),
+  (u'definition -> route',u'definition',1,'p_definition','parser.py',434),
+  (u'namespace -> KEYWORD ID NL',u'namespace',3,'p_namespace','parser.py',438),
+  (u'namespace -> KEYWORD ID NL INDENT docsection DEDENT',u'namespace',6,'p_namespace','parser.py',439),
+  (u'import -> IMPORT ID NL',u'import',3,'p_import','parser.py',450),
+  (u'alias -> KEYWORD ID EQ type_ref NL',u'alias',5,'p_alias','parser.py',454),
+  (u'alias -> KEYWORD ID EQ type_ref NL INDENT docsection DEDENT',u'alias',8,'p_alias','parser.py',455),
+  (u'NL -> NEWLINE',u'NL',1,'p_nl','parser.py',464),
+  (u'NL -> NL NEWLINE',u'NL',2,'p_nl_combine','parser.py',470),
+  (u'primitive -> BOOLEAN',u'primitive',1,'p_primitive','parser.py',477),
+  (u'primitive -> FLOAT',u'primitive',1,'p_primitive','parser.py',478),
+  (u'primitive -> INTEGER',u'primitive',1,'p_primitive','parser.py',479),
+  (u'primitive -> NULL',u'primitive',1,'p_primitive','parser.py',480),
+  (u'primitive -> STRING',u'primitive',1,'p_primitive','parser.py',481),
+  (u'pos_arg -> primitive',u'pos_arg',1,'p_pos_arg','parser.py',504),
+  (u'pos_arg -> type_ref',u'pos_arg',1,'p_pos_arg','parser.py',505),
+  (u'pos_args_list -> pos_arg',u'pos_args_list',1,'p_pos_args_list_create','parser.py',509),
+  (u'pos_args_list -> pos_args_list COMMA pos_arg',u'pos_args_list',3,'p_pos_args_list_extend','parser.py',513),
+  (u'kw_arg -> ID EQ primitive',u'kw_arg',3,'p_kw_arg','parser.py',518),
+  (u'kw_arg -> ID EQ type_ref',u'kw_arg',3,'p_kw_arg','parser.py',519),
+  (u'kw_args -> kw_arg',u'kw_args',1,'p_kw_args','parser.py',523),
+  (u'kw_args -> kw_args COMMA kw_arg',u'kw_args',3,'p_kw_args_update','parser.py',527),
+  (u'args -> LPAR pos_args_list COMMA kw_args RPAR',u'args',5,'p_args','parser.py',536),
+  (u'args -> LPAR pos_args_list RPAR',u'args',3,'p_args','parser.py',537),
+  (u'args -> LPAR kw_args RPAR',u'args',3,'p_args','parser.py',538),
+  (u'args -> LPAR RPAR',u'args',2,'p_args','parser.py',539),
+  (u'args -> empty',u'args',1,'p_args','parser.py',540),
+  (u'nullable -> Q',u'nullable',1,'p_field_nullable','parser.py',552),
+  (u'nullable -> empty',u'nullable',1,'p_field_nullable','parser.py',553),
+  (u'type_ref -> ID args nullable',u'type_ref',3,'p_type_ref','parser.py',557),
+  (u'type_ref -> ID DOT ID args nullable',u'type_ref',5,'p_foreign_type_ref','parser.py',570),
+  (u'enumerated_subtypes -> uniont NL INDENT subtypes_list DEDENT',u'enumerated_subtypes',5,'p_enumerated_subtypes','parser.py',608),
+  (u'enumerated_subtypes -> empty',u'enumerated_subtypes',1,'p_enumerated_subtypes','parser.py',609),
+  (u'struct -> STRUCT ID inheritance NL INDENT docsection enumerated_subtypes field_list examples DEDENT',u'struct',10,'p_struct','parser.py',614),
+  (u'anony_def -> STRUCT empty inheritance NL INDENT docsection enumerated_subtypes field_list examples DEDENT',u'anony_def',10,'p_anony_struct','parser.py',619),
+  (u'inheritance -> EXTENDS type_ref',u'inheritance',2,'p_inheritance','parser.py',636),
+  (u'inheritance -> empty',u'inheritance',1,'p_inheritance','parser.py',637),
+  (u'subtypes_list -> subtype_field',u'subtypes_list',1,'p_enumerated_subtypes_list_create','parser.py',646),
+  (u'subtypes_list -> empty',u'subtypes_list',1,'p_enumerated_subtypes_list_create','parser.py',647),
+  (u'subtypes_list -> subtypes_list subtype_field',u'subtypes_list',2,'p_enumerated_subtypes_list_extend','parser.py',652),
+  (u'subtype_field -> ID type_ref NL',u'subtype_field',3,'p_enumerated_subtype_field','parser.py',657),
+  (u'field_list -> field',u'field_list',1,'p_field_list_create','parser.py',671),
+  (u'field_list -> empty',u'field_list',1,'p_field_list_create','parser.py',672),
+  (u'field_list -> field_list field',u'field_list',2,'p_field_list_extend','parser.py',679),
+  (u'deprecation -> DEPRECATED',u'deprecation',1,'p_field_deprecation','parser.py',684),
+  (u'deprecation -> empty',u'deprecation',1,'p_field_deprecation','parser.py',685),
+  (u'default_option -> EQ primitive',u'default_option',2,'p_default_option','parser.py',689),
+  (u'default_option -> EQ tag_ref',u'default_option',2,'p_default_option','parser.py',690),
+  (u'default_option -> empty',u'default_option',1,'p_default_option','parser.py',691),
+  (u'field -> ID type_ref default_option deprecation NL INDENT docsection anony_def_option DEDENT',u'field',9,'p_field','parser.py',699),
+  (u'field -> ID type_ref default_option deprecation NL',u'field',5,'p_field','parser.py',700),
+  (u'anony_def_option -> anony_def',u'anony_def_option',1,'p_anony_def_option','parser.py',718),
+  (u'anony_def_option -> empty',u'anony_def_option',1,'p_anony_def_option','parser.py',719),
+  (u'tag_ref -> ID',u'tag_ref',1,'p_tag_ref','parser.py',723),
+  (u'union -> uniont ID inheritance NL INDENT docsection field_list examples DEDENT',u'union',9,'p_union','parser.py',741),
+  (u'anony_def -> uniont empty inheritance NL INDENT docsection field_list examples DEDENT',u'anony_def',9,'p_anony_union','parser.py',746),
+  (u'uniont -> UNION',u'uniont',1,'p_uniont','parser.py',763),
+  (u'uniont -> UNION_CLOSED',u'uniont',1,'p_uniont','parser.py',764),
+  (u'field -> ID NL',u'field',2,'p_field_void','parser.py',768),
+  (u'field -> ID NL INDENT docstring NL DEDENT',u'field',6,'p_field_void','parser.py',769),
+  (u'route -> ROUTE route_name route_io route_deprecation NL INDENT docsection attrssection DEDENT',u'route',9,'p_route','parser.py',788),
+  (u'route -> ROUTE route_name route_io route_deprecation NL',u'route',5,'p_route','parser.py',789),
+  (u'route_name -> ID route_path',u'route_name',2,'p_route_name','parser.py',804),
+  (u'route_path -> PATH',u'route_path',1,'p_route_path_suffix','parser.py',811),
+  (u'route_path -> empty',u'route_path',1,'p_route_path_suffix','parser.py',812),
+  (u'route_io -> LPAR type_ref COMMA type_ref RPAR',u'route_io',5,'p_route_io','parser.py',816),
+  (u'route_io -> LPAR type_ref COMMA type_ref COMMA type_ref RPAR',u'route_io',7,'p_route_io','parser.py',817),
+  (u'route_deprecation -> DEPRECATED',u'route_deprecation',1,'p_route_deprecation','parser.py',824),
+  (u'route_deprecation -> DEPRECATED BY route_name',u'route_deprecation',3,'p_route_deprecation','parser.py',825),
+  (u'route_deprecation -> empty',u'route_deprecation',1,'p_route_deprecation','parser.py',826),
+  (u'attrssection -> ATTRS NL INDENT attr_fields DEDENT',u'attrssection',5,'p_attrs_section','parser.py',833),
+  (u'attrssection -> empty',u'attrssection',1,'p_attrs_section','parser.py',834),
+  (u'attr_fields -> attr_field',u'attr_fields',1,'p_attr_fields_create','parser.py',839),
+  (u'attr_fields -> attr_fields attr_field',u'attr_fields',2,'p_attr_fields_add','parser.py',843),
+  (u'attr_field -> ID EQ primitive NL',u'attr_field',4,'p_attr_field','parser.py',848),
+  (u'attr_field -> ID EQ tag_ref NL',u'attr_field',4,'p_attr_field','parser.py',849),
+  (u'docsection -> docstring NL',u'docsection',2,'p_docsection','parser.py',874),
+  (u'docsection -> empty',u'docsection',1,'p_docsection','parser.py',875),
+  (u'docstring -> STRING',u'docstring',1,'p_docstring_string','parser.py',880),
+  (u'examples -> example',u'examples',1,'p_examples_create','parser.py',897),
+  (u'examples -> empty',u'examples',1,'p_examples_create','parser.py',898),
+  (u'examples -> examples example',u'examples',2,'p_examples_add','parser.py',904),
+  (u'example -> KEYWORD ID NL INDENT docsection example_fields DEDENT',u'example',7,'p_example','parser.py',916),
+  (u'example -> KEYWORD ID NL',u'example',3,'p_example','parser.py',917),
+  (u'example_fields -> example_field',u'example_fields',1,'p_example_fields_create','parser.py',935),
+  (u'example_fields -> example_fields example_field',u'example_fields',2,'p_example_fields_add','parser.py',939),
+  (u'example_field -> ID EQ primitive NL',u'example_field',4,'p_example_field','parser.py',944),
+  (u'example_field -> ID EQ ex_list NL',u'example_field',4,'p_example_field','parser.py',945),
+  (u'example_field -> ID EQ ID NL',u'example_field',4,'p_example_field_ref','parser.py',954),
+  (u'ex_list -> LBRACKET ex_list_items RBRACKET',u'ex_list',3,'p_ex_list','parser.py',962),
+  (u'ex_list -> LBRACKET empty RBRACKET',u'ex_list',3,'p_ex_list','parser.py',963),
+  (u'ex_list_item -> primitive',u'ex_list_item',1,'p_ex_list_item_primitive','parser.py',970),
+  (u'ex_list_item -> ID',u'ex_list_item',1,'p_ex_list_item_id','parser.py',977),
+  (u'ex_list_item -> ex_list',u'ex_list_item',1,'p_ex_list_item_list','parser.py',981),
+  (u'ex_list_items -> ex_list_item',u'ex_list_items',1,'p_ex_list_items_create','parser.py',985),
+  (u'ex_list_items -> ex_list_items COMMA ex_list_item',u'ex_list_items',3,'p_ex_list_items_extend','parser.py',989),
+  (u'empty -> <empty>',u'empty',0,'p_empty','parser.py',998),
+]
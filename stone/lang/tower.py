@@ -3,6 +3,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import copy
 import inspect
 import logging
+import multiprocessing
 import typing  # noqa: F401 # pylint: disable=unused-import
 
 # Hack to get around some of Python 2's standard library modules that
@@ -42,11 +43,15 @@ from ..data_type import (
     UnionField,
     UserDefined,
     Void,
+    doc_ref_re,
     unwrap_aliases,
 )
 
-from .exception import InvalidSpec
+from ..profiling import NullProfiler, measure
+from .exception import InvalidSpec, InvalidSpecs
+from .parse_cache import ParseCache
 from .parser import (
+    _Element,
     StoneAlias,
     StoneImport,
     StoneNamespace,
@@ -65,8 +70,7 @@ def quote(s):
         'Only use quote() with names or IDs in Stone.'
     return "'%s'" % s
 
-# Patterns for references in documentation
-doc_ref_re = re.compile(r':(?P<tag>[A-z]+):`(?P<val>.*?)`')
+# Pattern for values in documentation references
 doc_ref_val_re = re.compile(
     r'^(null|true|false|-?\d+(\.\d*)?(e-?\d+)?|"[^\\"]*")$')
 
@@ -76,6 +80,60 @@ class Environment(dict):
     # of a specific namespace, a name should be set.
     namespace_name = None  # type: typing.Optional[typing.Text]
 
+# Parser of a worker process in the pool used to parse specs in parallel.
+_worker_parser = None  # type: typing.Optional[StoneParser]
+
+def _parse_spec_in_worker(spec):
+    """Parses a (path, text) spec in a worker process. Returns the parsed
+    elements, the errors encountered, and the timing of the parse."""
+    global _worker_parser  # pylint: disable=global-statement
+    path, text = spec
+    with measure() as timing:
+        if _worker_parser is None:
+            _worker_parser = StoneParser(debug=False)
+        res = _worker_parser.parse(text, path)
+    errors = _worker_parser.get_errors()
+    if errors:
+        # Errors accumulate on a parser, so use a fresh one for the next spec.
+        _worker_parser = None
+    return res, errors, timing
+
+# Map of data type class -> (names of constructor arguments, number of them
+# with defaults).
+_constructor_args_by_class = {}  # type: typing.Dict[type, typing.Tuple[typing.List[typing.Text], int]] # noqa: E501
+
+def _get_constructor_args(data_type_class):
+    """Returns the names of the constructor arguments of a data type class,
+    and how many of them have defaults."""
+    try:
+        return _constructor_args_by_class[data_type_class]
+    except KeyError:
+        pass
+    if hasattr(inspect, 'getfullargspec'):
+        argspec = inspect.getfullargspec(data_type_class.__init__)
+    else:
+        argspec = inspect.getargspec(data_type_class.__init__)  # noqa: E501 # pylint: disable=deprecated-method,useless-suppression
+    args = [arg for arg in argspec.args if arg != 'self']
+    # Unfortunately, argspec.defaults is None if there are no defaults
+    num_defaults = len(argspec.defaults or ())
+    _constructor_args_by_class[data_type_class] = args, num_defaults
+    return args, num_defaults
+
+def _get_data_type_key(data_type_class, pos_args, kw_args):
+    """
+    Returns a key that identifies a data type instantiated with the given
+    arguments, or None if the arguments can't be hashed. The types of the
+    arguments are part of the key, so that 1 and 1.0 don't share a key.
+    """
+    key = (data_type_class,
+           tuple((type(v), v) for v in pos_args),
+           tuple(sorted((k, type(v), v) for k, v in kw_args.items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
 class TowerOfStone(object):
 
     data_types = [
@@ -97,26 +155,49 @@ class TowerOfStone(object):
         **{data_type.__name__: data_type for data_type in data_types})
 
     # FIXME: Version should not have a default.
-    def __init__(self, specs, version='0.1b1', debug=False):
+    def __init__(self, specs, version='0.1b1', debug=False, cache_dir=None,
+                 jobs=1, profiler=None, release_tokens=False):
         """Creates a new tower of stone.
 
         :type specs: List[Tuple[path: str, text: str]]
         :param specs: `path` is never accessed and is only used to report the
             location of a bad spec to the user. `spec` is the text contents of
             a spec (.stone) file.
+        :type cache_dir: Optional[str]
+        :param cache_dir: If set, the output of the parser for each spec is
+            cached in this directory and reused while the spec is unchanged.
+        :type jobs: int
+        :param jobs: Number of processes used to parse specs. If 0, one
+            process per CPU is used. Parsed specs are always processed in the
+            order they were given.
+        :type profiler: Optional[stone.profiling.Profiler]
+        :param profiler: If set, records the timing of each phase and of the
+            parsing of each spec.
+        :type release_tokens: bool
+        :param release_tokens: If set, the parser elements that types, fields,
+            aliases, routes, and examples keep in their ``_token`` attribute
+            are replaced once the API is validated by elements that only hold
+            their location, so that the rest can be freed.
         """
 
         self._specs = specs
         self._debug = debug
+        self._jobs = jobs or multiprocessing.cpu_count()
+        self._profiler = profiler or NullProfiler()
+        self._release_tokens = release_tokens
         self._logger = logging.getLogger('stone.idl')
 
         self.api = Api(version=version)
 
         self.parser = StoneParser(debug=debug)
+        self._parse_cache = ParseCache(cache_dir) if cache_dir else None
         # Map of namespace name (str) -> environment (dict)
         self._env_by_namespace = {}
         # Used to check for circular references.
         self._resolution_in_progress = set()  # Set[DataType]
+        # Map of the key of a data type's class and arguments -> instance, so
+        # that identical references to parameterized types share an instance.
+        self._data_type_by_key = {}  # type: typing.Dict[typing.Any, DataType]
 
         self._item_by_canonical_name = {}
 
@@ -124,36 +205,112 @@ class TowerOfStone(object):
         """Parses the text of each spec and returns an API description. Returns
         None if an error was encountered during parsing."""
         raw_api = []
-        for path, text in self._specs:
-            self._logger.info('Parsing spec %s', path)
-            res = self.parse_spec(text, path)
-            if self.parser.got_errors_parsing():
-                # TODO(kelkabany): Show more than one error at a time.
-                msg, lineno, path = self.parser.get_errors()[0]
-                raise InvalidSpec(msg, lineno, path)
-            elif res:
-                namespace_token = self._extract_namespace_token(res)
-                namespace = self.api.ensure_namespace(namespace_token.name)
-                base_name = self._get_base_name(namespace.name, namespace.name)
-                self._item_by_canonical_name[base_name] = namespace_token
-                if namespace_token.doc is not None:
-                    namespace.add_doc(namespace_token.doc)
-                raw_api.append((namespace, res))
-                self._add_data_types_and_routes_to_api(namespace, res)
-            else:
-                self._logger.info('Empty spec: %s', path)
+        with self._profiler.phase('phase', '_parse_specs'):
+            for path, res, errors in self._parse_specs():
+                if errors:
+                    # TODO(kelkabany): Show more than one error at a time.
+                    msg, lineno, path = errors[0]
+                    raise InvalidSpec(msg, lineno, path)
+                elif res:
+                    namespace_token = self._extract_namespace_token(res)
+                    namespace = self.api.ensure_namespace(namespace_token.name)
+                    base_name = self._get_base_name(namespace.name, namespace.name)
+                    self._item_by_canonical_name[base_name] = namespace_token
+                    if namespace_token.doc is not None:
+                        namespace.add_doc(namespace_token.doc)
+                    raw_api.append((namespace, res))
+                    self._add_data_types_and_routes_to_api(namespace, res)
+                else:
+                    self._logger.info('Empty spec: %s', path)
+
+        with self._profiler.phase('phase', '_add_imports_to_env'):
+            self._add_imports_to_env(raw_api)
+        for phase in (self._populate_type_attributes,
+                      self._populate_field_defaults,
+                      self._populate_enumerated_subtypes,
+                      self._populate_route_attributes,
+                      self._populate_examples,
+                      self._validate_doc_refs,
+                      self.api.normalize):
+            with self._profiler.phase('phase', phase.__name__):
+                phase()
+        if self._release_tokens:
+            with self._profiler.phase('phase', '_release_tokens'):
+                self._release_tokens_of_api()
 
-        self._add_imports_to_env(raw_api)
-        self._populate_type_attributes()
-        self._populate_field_defaults()
-        self._populate_enumerated_subtypes()
-        self._populate_route_attributes()
-        self._populate_examples()
-        self._validate_doc_refs()
+        return self.api
 
-        self.api.normalize()
+    def _release_tokens_of_api(self):
+        """
+        Replaces the parser elements kept by the API with ones that only hold
+        their location for error messages. The raw examples are kept, as they
+        are needed to fingerprint the data types.
+        """
+        def get_location(token):
+            if token is None:
+                return None
+            return _Element(token.path, token.lineno, token.lexpos)
 
-        return self.api
+        data_types = []
+        for namespace in self.api.namespaces.values():
+            data_types.extend(namespace.data_types)
+            for alias in namespace.aliases:
+                alias._token = get_location(alias._token)
+            for route in namespace.routes:
+                route._token = get_location(route._token)
+        if self.api.route_schema:
+            data_types.append(self.api.route_schema)
+        for data_type in data_types:
+            data_type._token = get_location(data_type._token)
+            for field in data_type.fields:
+                field._token = get_location(field._token)
+            for example in data_type._computed_examples.values():
+                example._token = get_location(example._token)
+        self._item_by_canonical_name = {}
+
+    def _parse_specs(self):
+        """Yields the path, parsed elements, and parsing errors of each spec in
+        the order the specs were given. With more than one job, the specs that
+        aren't in the parse cache are parsed up front in a process pool."""
+        if self._jobs == 1 or len(self._specs) < 2:
+            for path, text in self._specs:
+                self._logger.info('Parsing spec %s', path)
+                with self._profiler.phase('spec', path):
+                    res = self._parse_spec_cached(text, path)
+                yield path, res, self.parser.get_errors()
+            return
+
+        results = [None] * len(self._specs)  # type: typing.List[typing.Any]
+        misses = []
+        for i, (path, text) in enumerate(self._specs):
+            res = self._parse_cache.get(path, text) if self._parse_cache else None
+            if res is not None:
+                self._logger.info('Using cached parse of spec %s', path)
+                results[i] = (res, [])
+            else:
+                misses.append(i)
+
+        if misses:
+            jobs = min(self._jobs, len(misses))
+            self._logger.info('Parsing %d specs with %d jobs', len(misses), jobs)
+            pool = multiprocessing.Pool(jobs)
+            try:
+                parsed = pool.map(_parse_spec_in_worker,
+                                  [self._specs[i] for i in misses],
+                                  chunksize=1)
+                pool.close()
+            finally:
+                pool.terminate()
+                pool.join()
+            for i, (res, errors, timing) in zip(misses, parsed):
+                self._profiler.add('spec', self._specs[i][0], timing)
+                results[i] = (res, errors)
+                if self._parse_cache and not errors:
+                    path, text = self._specs[i]
+                    self._parse_cache.put(path, text, res)
+
+        for (path, _), (res, errors) in zip(self._specs, results):
+            yield path, res, errors
 
     def parse_spec(self, spec, path=None):
         """Parses a single Stone file."""
@@ -162,6 +319,20 @@ class TowerOfStone(object):
 
         return self.parser.parse(spec, path)
 
+    def _parse_spec_cached(self, spec, path):
+        """Like :meth:`parse_spec`, but consults the parse cache first. Only
+        results of specs that parsed without errors are stored."""
+        if self._parse_cache is None:
+            return self.parse_spec(spec, path)
+        res = self._parse_cache.get(path, spec)
+        if res is not None:
+            self._logger.info('Using cached parse of spec %s', path)
+            return res
+        res = self.parse_spec(spec, path)
+        if not self.parser.got_errors_parsing():
+            self._parse_cache.put(path, spec, res)
+        return res
+
     def _extract_namespace_token(self, desc):
         """
         Checks that the namespace is declared first in the spec, and that only
@@ -479,6 +650,9 @@ class TowerOfStone(object):
                                 field._token.lineno, field._token.path)
                     field.set_default(default_value)
 
+                # Fields with defaults are optional.
+                data_type._invalidate_field_layouts()
+
     def _populate_route_attributes(self):
         """
         Converts all routes from forward references to complete definitions.
@@ -614,24 +788,27 @@ class TowerOfStone(object):
                 as keyword arguments.
 
         Returns:
-            stone.data_type.DataType: A parameterized instance.
+            stone.data_type.DataType: A parameterized instance. It is shared
+                by every reference with the same arguments.
         """
         assert issubclass(data_type_class, DataType), \
             'Expected stone.data_type.DataType, got %r' % data_type_class
 
-        argspec = inspect.getargspec(data_type_class.__init__)  # noqa: E501 # pylint: disable=deprecated-method,useless-suppression
-        argspec.args.remove('self')
-        num_args = len(argspec.args)
-        # Unfortunately, argspec.defaults is None if there are no defaults
-        num_defaults = len(argspec.defaults or ())
-
         pos_args, kw_args = data_type_args
 
+        # Arguments that were seen before are known to be valid.
+        key = _get_data_type_key(data_type_class, pos_args, kw_args)
+        if key in self._data_type_by_key:
+            return self._data_type_by_key[key]
+
+        arg_names, num_defaults = _get_constructor_args(data_type_class)
+        num_args = len(arg_names)
+
         if (num_args - num_defaults) > len(pos_args):
             # Report if a positional argument is missing
             raise InvalidSpec(
                 'Missing positional argument %s for %s type' %
-                (quote(argspec.args[len(pos_args)]),
+                (quote(arg_names[len(pos_args)]),
                  quote(data_type_class.__name__)),
                 *loc)
         elif (num_args - num_defaults) < len(pos_args):
@@ -643,31 +820,34 @@ class TowerOfStone(object):
 
         # Map from arg name to bool indicating whether the arg has a default
         args = {}
-        for i, key in enumerate(argspec.args):
-            args[key] = (i >= num_args - num_defaults)
+        for i, arg_name in enumerate(arg_names):
+            args[arg_name] = (i >= num_args - num_defaults)
 
-        for key in kw_args:
+        for arg_name in kw_args:
             # Report any unknown keyword arguments
-            if key not in args:
+            if arg_name not in args:
                 raise InvalidSpec('Unknown argument %s to %s type.' %
-                    (quote(key), quote(data_type_class.__name__)),
+                    (quote(arg_name), quote(data_type_class.__name__)),
                     *loc)
             # Report any positional args that are defined as keywords args.
-            if not args[key]:
+            if not args[arg_name]:
                 raise InvalidSpec(
                     'Positional argument %s cannot be specified as a '
-                    'keyword argument.' % quote(key),
+                    'keyword argument.' % quote(arg_name),
                     *loc)
-            del args[key]
+            del args[arg_name]
 
         try:
-            return data_type_class(*pos_args, **kw_args)
+            data_type = data_type_class(*pos_args, **kw_args)
         except ParameterError as e:
             # Each data type validates its own attributes, and will raise a
             # ParameterError if the type or value is bad.
             raise InvalidSpec('Bad argument to %s type: %s' %
                 (quote(data_type_class.__name__), e.args[0]),
                 *loc)
+        if key is not None:
+            self._data_type_by_key[key] = data_type
+        return data_type
 
     def _resolve_type(self, env, type_ref, enforce_fully_defined=False):
         """
@@ -747,7 +927,10 @@ class TowerOfStone(object):
                 raise InvalidSpec(
                     'Cannot mark reference to nullable type as nullable.',
                     *loc)
-            data_type = Nullable(data_type)
+            key = (Nullable, data_type)
+            if key not in self._data_type_by_key:
+                self._data_type_by_key[key] = Nullable(data_type)
+            data_type = self._data_type_by_key[key]
 
         return data_type
 
@@ -873,8 +1056,9 @@ class TowerOfStone(object):
         """
         Validates that all the documentation references across every docstring
         in every spec are formatted properly, have valid values, and make
-        references to valid symbols.
+        references to valid symbols. Every bad reference is reported at once.
         """
+        errors = []  # type: typing.List[InvalidSpec]
         for namespace in self.api.namespaces.values():
             env = self._get_or_create_env(namespace.name)
             # Validate the doc refs of each api entity that has a doc
@@ -884,6 +1068,7 @@ class TowerOfStone(object):
                         env,
                         data_type.doc,
                         (data_type._token.lineno + 1, data_type._token.path),
+                        errors,
                         data_type)
                 for field in data_type.fields:
                     if field.doc:
@@ -891,15 +1076,21 @@ class TowerOfStone(object):
                             env,
                             field.doc,
                             (field._token.lineno + 1, field._token.path),
+                            errors,
                             data_type)
             for route in namespace.routes:
                 if route.doc:
                     self._validate_doc_refs_helper(
                         env,
                         route.doc,
-                        (route._token.lineno + 1, route._token.path))
-
-    def _validate_doc_refs_helper(self, env, doc, loc, type_context=None):
+                        (route._token.lineno + 1, route._token.path),
+                        errors)
+        if len(errors) == 1:
+            raise errors[0]
+        elif errors:
+            raise InvalidSpecs(errors)
+
+    def _validate_doc_refs_helper(self, env, doc, loc, errors, type_context=None):
         """
         Validates that all the documentation references in a docstring are
         formatted properly, have valid values, and make references to valid
@@ -909,6 +1100,8 @@ class TowerOfStone(object):
             env (dict): The environment of defined symbols.
             doc (str): The docstring to validate.
             lineno (int): The line number the docstring begins on in the spec.
+            errors (List[InvalidSpec]): An error is appended for each bad
+                reference.
             type_context (stone.data_type.UserDefined): If the docstring
                 belongs to a user-defined type (Struct or Union) or one of its
                 fields, set this to the type. This is needed for "field" doc
@@ -917,88 +1110,73 @@ class TowerOfStone(object):
         for match in doc_ref_re.finditer(doc):
             tag = match.group('tag')
             val = match.group('val')
-            if tag == 'field':
-                if '.' in val:
-                    type_name, field_name = val.split('.', 1)
-                    if type_name not in env:
-                        raise InvalidSpec(
-                            'Bad doc reference to field %s of '
-                            'unknown type %s.' % (field_name, quote(type_name)),
-                            *loc)
-                    elif isinstance(env[type_name], ApiRoute):
-                        raise InvalidSpec(
-                            'Bad doc reference to field %s of route %s.' %
-                            (quote(field_name), quote(type_name)),
-                            *loc)
-                    elif not any(field.name == field_name
-                                 for field in env[type_name].all_fields):
-                        raise InvalidSpec(
-                            'Bad doc reference to unknown field %s.' % quote(val),
-                            *loc)
-                else:
-                    # Referring to a field that's a member of this type
-                    assert type_context is not None
-                    if not any(field.name == val
-                               for field in type_context.all_fields):
-                        raise InvalidSpec(
-                            'Bad doc reference to unknown field %s.' %
-                            quote(val),
-                            *loc)
-            elif tag == 'link':
-                if not (1 < val.rfind(' ') < len(val) - 1):
-                    # There must be a space somewhere in the middle of the
-                    # string to separate the title from the uri.
-                    raise InvalidSpec(
-                        'Bad doc reference to link (need a title and '
-                        'uri separated by a space): %s.' % quote(val),
-                        *loc)
-            elif tag == 'route':
-                if '.' in val:
-                    # Handle reference to route in imported namespace.
-                    namespace_name, val = val.split('.', 1)
-                    if namespace_name not in env:
-                        raise InvalidSpec(
-                            "Unknown doc reference to namespace '%s'." %
-                            namespace_name, *loc)
-                    env_to_check = env[namespace_name]
-                else:
-                    env_to_check = env
-                if val not in env_to_check:
-                    raise InvalidSpec(
-                        'Unknown doc reference to route %s.' % quote(val),
-                        *loc)
-                elif not isinstance(env_to_check[val], ApiRoute):
-                    raise InvalidSpec(
-                        'Doc reference to type %s is not a route.' %
-                        quote(val), *loc)
-            elif tag == 'type':
-                if '.' in val:
-                    # Handle reference to type in imported namespace.
-                    namespace_name, val = val.split('.', 1)
-                    if namespace_name not in env:
-                        raise InvalidSpec(
-                            "Unknown doc reference to namespace '%s'." %
-                            namespace_name, *loc)
-                    env_to_check = env[namespace_name]
-                else:
-                    env_to_check = env
-                if val not in env_to_check:
-                    raise InvalidSpec(
-                        "Unknown doc reference to type '%s'." % val,
-                        *loc)
-                elif not isinstance(env_to_check[val], (Struct, Union)):
-                    raise InvalidSpec(
-                        'Doc reference to type %s is not a struct or union.' %
-                        quote(val), *loc)
-            elif tag == 'val':
-                if not doc_ref_val_re.match(val):
-                    raise InvalidSpec(
-                        'Bad doc reference value %s.' % quote(val),
-                        *loc)
+            error = self._validate_doc_ref(env, tag, val, type_context)
+            if error:
+                errors.append(InvalidSpec(error, *loc))
+
+    def _validate_doc_ref(self, env, tag, val, type_context):
+        """Returns the error message for a bad doc reference, or None."""
+        if tag == 'field':
+            if '.' in val:
+                type_name, field_name = val.split('.', 1)
+                if type_name not in env:
+                    return ('Bad doc reference to field %s of unknown type %s.' %
+                            (field_name, quote(type_name)))
+                elif isinstance(env[type_name], ApiRoute):
+                    return ('Bad doc reference to field %s of route %s.' %
+                            (quote(field_name), quote(type_name)))
+                elif not isinstance(env[type_name], (Struct, Union)):
+                    return ('Bad doc reference to field %s of %s, which is not '
+                            'a struct or union.' %
+                            (quote(field_name), quote(type_name)))
+                elif env[type_name]._get_field(field_name) is None:
+                    return 'Bad doc reference to unknown field %s.' % quote(val)
             else:
-                raise InvalidSpec(
-                    'Unknown doc reference tag %s.' % quote(tag),
-                    *loc)
+                # Referring to a field that's a member of this type
+                assert type_context is not None
+                if type_context._get_field(val) is None:
+                    return 'Bad doc reference to unknown field %s.' % quote(val)
+        elif tag == 'link':
+            if not (1 < val.rfind(' ') < len(val) - 1):
+                # There must be a space somewhere in the middle of the
+                # string to separate the title from the uri.
+                return ('Bad doc reference to link (need a title and uri '
+                        'separated by a space): %s.' % quote(val))
+        elif tag == 'route':
+            if '.' in val:
+                # Handle reference to route in imported namespace.
+                namespace_name, val = val.split('.', 1)
+                if namespace_name not in env:
+                    return ("Unknown doc reference to namespace '%s'." %
+                            namespace_name)
+                env_to_check = env[namespace_name]
+            else:
+                env_to_check = env
+            if val not in env_to_check:
+                return 'Unknown doc reference to route %s.' % quote(val)
+            elif not isinstance(env_to_check[val], ApiRoute):
+                return 'Doc reference to type %s is not a route.' % quote(val)
+        elif tag == 'type':
+            if '.' in val:
+                # Handle reference to type in imported namespace.
+                namespace_name, val = val.split('.', 1)
+                if namespace_name not in env:
+                    return ("Unknown doc reference to namespace '%s'." %
+                            namespace_name)
+                env_to_check = env[namespace_name]
+            else:
+                env_to_check = env
+            if val not in env_to_check:
+                return "Unknown doc reference to type '%s'." % val
+            elif not isinstance(env_to_check[val], (Struct, Union)):
+                return ('Doc reference to type %s is not a struct or union.' %
+                        quote(val))
+        elif tag == 'val':
+            if not doc_ref_val_re.match(val):
+                return 'Bad doc reference value %s.' % quote(val)
+        else:
+            return 'Unknown doc reference tag %s.' % quote(tag)
+        return None
 
     def _validate_stone_cfg(self):
         """
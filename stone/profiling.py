@@ -0,0 +1,148 @@
+"""
+Timing of the phases of a build, as reported by the --profile option.
+
+Each record has a category, such as "phase", "spec", "generator", or
+"output_file", and a name. It also has the wall time and the CPU time of the
+process in seconds, and the peak resident memory of the process in bytes at
+the end of the phase. The peak is a high-water mark for the whole process,
+so an increase from one record to the next shows which phase raised it.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from contextlib import contextmanager
+import cProfile
+import json
+import os
+import re
+import sys
+import time
+import typing  # noqa: F401 # pylint: disable=unused-import
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows.
+    resource = None  # type: ignore
+
+from stone import __version__
+
+_REPORT_VERSION = 1
+
+def _get_cpu_time():
+    # type: () -> float
+    times = os.times()
+    return times[0] + times[1]
+
+def _get_peak_memory():
+    # type: () -> typing.Optional[int]
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, and in kilobytes elsewhere.
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+@contextmanager
+def measure():
+    # type: () -> typing.Iterator[typing.Dict[typing.Text, typing.Any]]
+    """
+    Measures the enclosed code. The yielded dict is filled with its wall time,
+    CPU time, and the peak memory on exit. Unlike Profiler, it can be used in
+    worker processes, and the dict sent back.
+    """
+    timing = {}  # type: typing.Dict[typing.Text, typing.Any]
+    wall_start = time.time()
+    cpu_start = _get_cpu_time()
+    try:
+        yield timing
+    finally:
+        timing['wall_time'] = time.time() - wall_start
+        timing['cpu_time'] = _get_cpu_time() - cpu_start
+        timing['peak_memory'] = _get_peak_memory()
+
+class Profiler(object):
+    """Collects the timing records of a build."""
+
+    enabled = True
+
+    def __init__(self, cprofile_dir=None):
+        # type: (typing.Optional[typing.Text]) -> None
+        """
+        Args:
+            cprofile_dir (Optional[str]): If set, phases that ask for it are
+                also run under cProfile, and the statistics are dumped into
+                this folder.
+        """
+        self.cprofile_dir = cprofile_dir
+        self.records = []  # type: typing.List[typing.Dict[typing.Text, typing.Any]]
+
+    @contextmanager
+    def phase(self, category, name, cprofile=False):
+        # type: (typing.Text, typing.Text, bool) -> typing.Iterator[None]
+        """
+        Records the timing of the enclosed code. If cprofile is set and the
+        profiler has a cprofile_dir, the code is also run under cProfile.
+        """
+        cprofile_path = self.get_cprofile_path(category, name) if cprofile else None
+        with measure() as timing:
+            if cprofile_path:
+                prof = cProfile.Profile()
+                prof.enable()
+                try:
+                    yield
+                finally:
+                    prof.disable()
+                    prof.dump_stats(cprofile_path)
+            else:
+                yield
+        self.add(category, name, timing)
+
+    def add(self, category, name, timing):
+        # type: (typing.Text, typing.Text, typing.Dict[typing.Text, typing.Any]) -> None
+        """Adds a record with a timing made by :func:`measure`."""
+        record = {'category': category, 'name': name}
+        record.update(timing)
+        self.records.append(record)
+
+    def new_child(self):
+        # type: () -> Profiler
+        """Returns an empty profiler with the same settings, for a worker
+        process. Its records can then be added to this one's."""
+        return type(self)(self.cprofile_dir)
+
+    def get_cprofile_path(self, category, name):
+        # type: (typing.Text, typing.Text) -> typing.Optional[typing.Text]
+        """Returns the path to dump the cProfile statistics of a phase to."""
+        if self.cprofile_dir is None:
+            return None
+        if not os.path.exists(self.cprofile_dir):
+            os.makedirs(self.cprofile_dir)
+        filename = re.sub(r'[^\w.-]', '_', '%s-%s' % (category, name))
+        return os.path.join(self.cprofile_dir, filename + '.prof')
+
+    def write(self, path):
+        # type: (typing.Text) -> None
+        """Writes the records as a JSON report."""
+        report = {
+            'version': _REPORT_VERSION,
+            'stone_version': __version__,
+            'python_version': '%d.%d.%d' % sys.version_info[:3],
+            'records': self.records,
+        }
+        data = json.dumps(report, indent=2, separators=(',', ': '), sort_keys=True)
+        with open(path, 'wb') as f:
+            f.write(data.encode('utf-8'))
+
+class NullProfiler(Profiler):
+    """A profiler that records nothing, used when profiling is off."""
+
+    enabled = False
+
+    @contextmanager
+    def phase(self, category, name, cprofile=False):
+        # type: (typing.Text, typing.Text, bool) -> typing.Iterator[None]
+        yield
+
+    def add(self, category, name, timing):
+        # type: (typing.Text, typing.Text, typing.Dict[typing.Text, typing.Any]) -> None
+        pass
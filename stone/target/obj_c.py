@@ -45,6 +45,8 @@ class ObjCBaseGenerator(CodeGenerator):
     """Wrapper class over Stone generator for Obj C logic."""
     # pylint: disable=abstract-method
 
+    stream_output = True
+
     @contextmanager
     def block_m(self, class_name):
         with self.block('@implementation {}'.format(class_name), delim=('', '@end'), dent=0):
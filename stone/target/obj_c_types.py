@@ -2,7 +2,6 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 import json
 import os
-import shutil
 
 # Hack to get around some of Python 2's standard library modules that
 # accept ascii-encodable unicode literals in lieu of strs, but where
@@ -102,6 +101,8 @@ class ObjCTypesGenerator(ObjCBaseGenerator):
     cmdline_parser = _cmdline_parser
     obj_name_to_namespace = {}  # type: typing.Dict[str, str]
 
+    supports_incremental_build = True
+
     def generate(self, api):
         """
         Generates a module for each namespace.
@@ -110,29 +111,12 @@ class ObjCTypesGenerator(ObjCBaseGenerator):
         routes in the Stone spec.
         """
         rsrc_folder = os.path.join(os.path.dirname(__file__), 'obj_c_rsrc')
-        rsrc_output_folder = os.path.join(self.target_folder_path, 'Resources')
-
-        if not os.path.exists(rsrc_output_folder):
-            os.makedirs(rsrc_output_folder)
-
-        self.logger.info('Copying DBStoneValidators.{h,m} to output folder')
-        shutil.copy(os.path.join(rsrc_folder, 'DBStoneValidators.h'),
-                    rsrc_output_folder)
-        shutil.copy(os.path.join(rsrc_folder, 'DBStoneValidators.m'),
-                    rsrc_output_folder)
-        self.logger.info('Copying DBStoneSerializers.{h,m} to output folder')
-        shutil.copy(os.path.join(rsrc_folder, 'DBStoneSerializers.h'),
-                    rsrc_output_folder)
-        shutil.copy(os.path.join(rsrc_folder, 'DBStoneSerializers.m'),
-                    rsrc_output_folder)
-        self.logger.info('Copying DBStoneBase.{h,m} to output folder')
-        shutil.copy(os.path.join(rsrc_folder, 'DBStoneBase.h'),
-                    rsrc_output_folder)
-        shutil.copy(os.path.join(rsrc_folder, 'DBStoneBase.m'),
-                    rsrc_output_folder)
-        self.logger.info('Copying DBSerializableProtocol.h to output folder')
-        shutil.copy(os.path.join(rsrc_folder, 'DBSerializableProtocol.h'),
-                    rsrc_output_folder)
+        for filename in ('DBStoneValidators.h', 'DBStoneValidators.m',
+                         'DBStoneSerializers.h', 'DBStoneSerializers.m',
+                         'DBStoneBase.h', 'DBStoneBase.m',
+                         'DBSerializableProtocol.h'):
+            self.copy_to_relative_path(os.path.join(rsrc_folder, filename),
+                                       os.path.join('Resources', filename))
 
         jazzy_cfg = ''
         if self.args.documentation:
@@ -148,18 +132,25 @@ class ObjCTypesGenerator(ObjCBaseGenerator):
                 self.obj_name_to_namespace[
                     data_type.name] = fmt_class_prefix(data_type)
 
+        namespaces = []
         for namespace in api.namespaces.values():
-            ns_name = fmt_public_name(namespace.name)
-            self._generate_namespace_types(namespace, jazzy_cfg)
+            if self.args.documentation:
+                self._add_namespace_to_jazzy_cfg(namespace, jazzy_cfg)
 
-            if namespace.routes:
-                if self.args.documentation:
-                    jazzy_cfg['custom_categories'][jazzy_category_map['Routes']][
-                        'children'].append(fmt_routes_class(ns_name))
-                    jazzy_cfg['custom_categories'][jazzy_category_map['RouteObjects']][
-                        'children'].append(fmt_route_obj_class(ns_name))
-                self._generate_route_objects_m(api.route_schema, namespace)
-                self._generate_route_objects_h(api.route_schema, namespace)
+            if self.is_namespace_output_current(namespace):
+                self.logger.info('Skipping unchanged namespace %s', namespace.name)
+            else:
+                namespaces.append(namespace)
+
+        def render(namespace):
+            with self.output_for_namespace(namespace):
+                self._generate_namespace_types(namespace)
+
+                if namespace.routes:
+                    self._generate_route_objects_m(api.route_schema, namespace)
+                    self._generate_route_objects_h(api.route_schema, namespace)
+
+        self.render_in_parallel(render, namespaces)
 
         if self.args.documentation:
             with self.output_to_relative_path('../../../../.jazzy.json'):
@@ -188,7 +179,28 @@ class ObjCTypesGenerator(ObjCBaseGenerator):
 
             self._generate_imports_m(namespace_imports)
 
-    def _generate_namespace_types(self, namespace, jazzy_cfg):
+    def _add_namespace_to_jazzy_cfg(self, namespace, jazzy_cfg):
+        """Adds the classes generated for the given namespace to the jazzy
+        documentation config."""
+        ns_name = fmt_public_name(namespace.name)
+        categories = jazzy_cfg['custom_categories']
+
+        for data_type in namespace.linearize_data_types():
+            class_name = fmt_class_prefix(data_type)
+            categories[jazzy_category_map[ns_name]]['children'].append(class_name)
+            categories[jazzy_category_map['Serializers']]['children'].append(
+                '{}Serializer'.format(class_name))
+            if is_union_type(data_type):
+                categories[jazzy_category_map['Tags']]['children'].append(
+                    '{}Tag'.format(class_name))
+
+        if namespace.routes:
+            categories[jazzy_category_map['Routes']]['children'].append(
+                fmt_routes_class(ns_name))
+            categories[jazzy_category_map['RouteObjects']]['children'].append(
+                fmt_route_obj_class(ns_name))
+
+    def _generate_namespace_types(self, namespace):
         """Creates Obj C argument, error, serializer and deserializer types
         for the given namespace."""
         ns_name = fmt_public_name(namespace.name)
@@ -198,12 +210,6 @@ class ObjCTypesGenerator(ObjCBaseGenerator):
         for data_type in namespace.linearize_data_types():
             class_name = fmt_class_prefix(data_type)
 
-            if self.args.documentation:
-                jazzy_cfg['custom_categories'][jazzy_category_map[
-                    ns_name]]['children'].append(class_name)
-                jazzy_cfg['custom_categories'][jazzy_category_map['Serializers']][
-                    'children'].append('{}Serializer'.format(class_name))
-
             if is_struct_type(data_type):
                 # struct header
                 file_path = os.path.join(output_path_headers, class_name + '.h')
@@ -211,10 +217,6 @@ class ObjCTypesGenerator(ObjCBaseGenerator):
                     self.emit_raw(base_file_comment)
                     self._generate_struct_class_h(data_type)
             elif is_union_type(data_type):
-
-                if self.args.documentation:
-                    jazzy_cfg['custom_categories'][jazzy_category_map['Tags']][
-                        'children'].append('{}Tag'.format(fmt_class_prefix(data_type)))
                 # union header
                 file_path = os.path.join(output_path_headers, class_name + '.h')
                 with self.output_to_relative_path(file_path):
@@ -85,6 +85,8 @@ class PythonClientGenerator(CodeGenerator):
 
     cmdline_parser = _cmdline_parser
 
+    stream_output = True
+
     def generate(self, api):
         """Generates a module called "base".
 
@@ -31,6 +31,50 @@ except (SystemError, ValueError):
     import stone_validators as bb  # type: ignore # noqa: F401 # pylint: disable=unused-import
     import stone_validators as bv  # type: ignore
 
+# ------------------------------------------------------------------------
+# Plans
+#
+# A plan is a closure that encodes or decodes the values of a validator, with
+# the dispatch on the types of the validator and the ones it refers to already
+# resolved. Plans are compiled on first use and cached on their validators, so
+# they live as long as them, and work with modules generated by any version.
+
+def _get_plan(validator, key, compile_plan):
+    """
+    Returns the plan of a validator for a key, a tuple of the kind of plan and
+    the options it depends on. On first use, the plan is compiled by
+    ``compile_plan(validator, key, get_plan)``, which gets the plans it refers
+    to with ``get_plan(validator, key)``.
+
+    The plans compiled along are only cached once all of them are, since a
+    recursive data type refers to its own plan while it's being compiled.
+    """
+    plans = validator.__dict__.get('_plans')
+    if plans is not None and key in plans:
+        return plans[key]
+
+    compiled = {}  # type: typing.Dict[typing.Tuple[bv.Validator, tuple], typing.Callable]
+
+    def get_plan(sub_validator, sub_key):
+        sub_plans = sub_validator.__dict__.get('_plans')
+        if sub_plans is not None and sub_key in sub_plans:
+            return sub_plans[sub_key]
+        if (sub_validator, sub_key) not in compiled:
+            cell = []  # type: typing.List[typing.Callable]
+            compiled[sub_validator, sub_key] = lambda value: cell[0](value)
+            cell.append(compile_plan(sub_validator, sub_key, get_plan))
+            compiled[sub_validator, sub_key] = cell[0]
+        return compiled[sub_validator, sub_key]
+
+    plan = get_plan(validator, key)
+    for (sub_validator, sub_key), sub_plan in compiled.items():
+        sub_validator.__dict__.setdefault('_plans', {})[sub_key] = sub_plan
+    return plan
+
+def _identity(value):
+    """The plan of values that are encoded or decoded as is."""
+    return value
+
 # ------------------------------------------------------------------------
 class StoneEncoderInterface(object):
     """
@@ -178,8 +222,9 @@ class StoneSerializerBase(StoneEncoderInterface):
 # ------------------------------------------------------------------------
 class StoneToPythonPrimitiveSerializer(StoneSerializerBase):
 
-    def __init__(self, alias_validators=None, for_msgpack=False, old_style=False):
-        # type: (typing.Mapping[bv.Validator, typing.Callable[[typing.Any], None]], bool, bool) -> None # noqa: E501
+    def __init__(self, alias_validators=None, for_msgpack=False, old_style=False,
+                 use_specialized_encoders=False):
+        # type: (typing.Mapping[bv.Validator, typing.Callable[[typing.Any], None]], bool, bool, bool) -> None # noqa: E501
         """
         Args:
             alias_validators (``typing.Mapping``, optional): Passed
@@ -188,10 +233,18 @@ class StoneToPythonPrimitiveSerializer(StoneSerializerBase):
                 Defaults to ``False``.
             old_style (bool, optional): See the like-named property.
                 Defaults to ``False``.
+            use_specialized_encoders (bool, optional): Whether to encode
+                structs and unions with the ``_encode_json_compat`` class
+                methods generated for them, if any, when neither
+                ``alias_validators`` nor ``old_style`` are set, and to encode
+                with plans when ``alias_validators`` isn't set. Subclasses
+                that override how values are encoded should leave it unset.
+                Defaults to ``False``.
         """
         super(StoneToPythonPrimitiveSerializer, self).__init__(alias_validators=alias_validators)
         self._for_msgpack = for_msgpack
         self._old_style = old_style
+        self._use_specialized_encoders = use_specialized_encoders
 
     @property
     def for_msgpack(self):
@@ -212,11 +265,294 @@ class StoneToPythonPrimitiveSerializer(StoneSerializerBase):
         """
         return self._old_style
 
-    def encode_list(self, validator, value):
-        validated_value = validator.validate(value)
+    def _get_specialized_encoder(self, validator):
+        """
+        Returns the encoder generated for the definition of a struct or union
+        validator, or None if there's none or it can't be used.
+        """
+        if (self._use_specialized_encoders and not self._old_style and
+                not self._alias_validators and
+                # An encoder inherited from a parent class would miss fields.
+                '_encode_json_compat' in validator.definition.__dict__):
+            return validator.definition._encode_json_compat
+        return None
+
+    def encode_sub(self, validator, value):
+        if self._use_specialized_encoders and not self._alias_validators:
+            key = ('encode', self._for_msgpack, self._old_style)
+            return _get_plan(validator, key, self._compile_plan)(value)
+        elif isinstance(validator, bv.List):
+            # Lists are validated by encode_list() as they are encoded.
+            return self.encode_list(validator, value)
+        return super(StoneToPythonPrimitiveSerializer, self).encode_sub(validator, value)
+
+    def _compile_plan(self, validator, key, get_plan):
+        """
+        Compiles a plan that encodes like encode_sub(), or like encode_struct()
+        for the 'encode_struct' kind. The plans of the 'encode_validated' kind
+        encode values returned by ``validator.validate()`` without validating
+        them again. See _get_plan().
+        """
+        kind, for_msgpack, _ = key
+        validated = kind == 'encode_validated'
+        if kind == 'encode_struct':
+            return self._compile_struct_plan(validator, key, get_plan)
+        elif isinstance(validator, bv.List):
+            return self._compile_list_plan(validator, key, get_plan)
+        elif isinstance(validator, bv.Nullable):
+            return self._compile_nullable_plan(validator, key, get_plan)
+        elif isinstance(validator, bv.Primitive):
+            return self._compile_primitive_plan(validator, for_msgpack, validated)
+        elif isinstance(validator, bv.StructTree):
+            return self._compile_struct_tree_plan(validator, key, get_plan)
+        elif isinstance(validator, bv.Struct):
+            encode_fields = get_plan(validator, ('encode_struct',) + key[1:])
+            if validated:
+                return encode_fields
+            validate_type_only = validator.validate_type_only
+
+            def encode_struct(value):
+                validate_type_only(value)
+                return encode_fields(value)
+            return encode_struct
+        elif isinstance(validator, bv.Union):
+            return self._compile_union_plan(validator, key, get_plan)
+        else:
+            def encode_unsupported(value):
+                raise bv.ValidationError(
+                    'Unsupported data type {}'.format(type(validator).__name__))
+            return encode_unsupported
+
+    @staticmethod
+    def _compile_list_plan(validator, key, get_plan):
+        item_validator = validator.item_validator
+        encode_item = get_plan(item_validator, ('encode_validated',) + key[1:])
+        if key[0] == 'encode_validated':
+            if encode_item is _identity:
+                # validate() returns a new list.
+                return _identity
+
+            def encode_validated_list(value):
+                return [encode_item(item) for item in value]
+            return encode_validated_list
+        elif encode_item is _identity:
+            # Validating the list is encoding it.
+            return validator.validate
+
+        validate_type_only = validator.validate_type_only
+        validate_item = item_validator.validate
+
+        def encode_list(value):
+            # Each item is validated and encoded in a single pass.
+            validate_type_only(value)
+            try:
+                return [encode_item(validate_item(item)) for item in value]
+            except bv.ValidationError as exc:
+                # Like validate(), which validates all the items before any is
+                # encoded, report the first invalid item before an error
+                # encoding one.
+                for item in value:
+                    validate_item(item)
+                raise exc
+        return encode_list
+
+    @staticmethod
+    def _compile_nullable_plan(validator, key, get_plan):
+        value_validator = validator.validator
+        encode_value = get_plan(value_validator, key)
+        if key[0] == 'encode_validated':
+            def encode_validated_nullable(value):
+                if value is None:
+                    return None
+                return encode_value(value)
+            return encode_validated_nullable
+
+        if not (isinstance(value_validator, bv.Union) or
+                isinstance(value_validator, bv.Struct) and
+                not isinstance(value_validator, bv.StructTree)):
+            # Besides the ones of structs and unions, which only validate
+            # types, plans validate values like validate() does.
+            def encode_nullable(value):
+                if value is None:
+                    return None
+                return encode_value(value)
+            return encode_nullable
+
+        validate = validator.validate
+
+        def encode_nullable_composite(value):
+            validate(value)
+            if value is None:
+                return None
+            return encode_value(value)
+        return encode_nullable_composite
+
+    @staticmethod
+    def _compile_primitive_plan(validator, for_msgpack, validated):
+        if isinstance(validator, bv.Void):
+            def encode_void(value):  # pylint: disable=unused-argument
+                return None
+            encode_f = encode_void
+        elif isinstance(validator, bv.Timestamp):
+            fmt = validator.format
+
+            def encode_timestamp(value):
+                return _strftime(value, fmt)
+            encode_f = encode_timestamp
+        elif isinstance(validator, bv.Bytes) and not for_msgpack:
+            def encode_bytes(value):
+                return base64.b64encode(value).decode('ascii')
+            encode_f = encode_bytes
+        elif isinstance(validator, bv.Integer):
+            def encode_integer(value):
+                return int(value) if isinstance(value, bool) else value
+            encode_f = encode_integer
+        else:
+            encode_f = None
+
+        validate = validator.validate
+        if encode_f is None:
+            if validated:
+                return _identity
 
-        return [self.encode_sub(validator.item_validator, value_item) for value_item in
-                validated_value]
+            def encode_primitive(value):
+                validate(value)
+                return value
+            return encode_primitive
+        elif validated:
+            return encode_f
+
+        def encode_validating(value):
+            validate(value)
+            return encode_f(value)
+        return encode_validating
+
+    def _compile_struct_plan(self, validator, key, get_plan):
+        encode_f = self._get_specialized_encoder(validator)
+        if encode_f is not None:
+            def encode_specialized_struct(value):
+                return encode_f(self, value)
+            return encode_specialized_struct
+
+        fields = [
+            (field_name, '_%s_present' % field_name,
+             get_plan(field_validator, ('encode',) + key[1:]))
+            for field_name, field_validator in validator.definition._all_fields_]
+
+        def encode_struct(value):
+            d = collections.OrderedDict()  # type: typing.Dict[str, typing.Any]
+            for field_name, presence_key, encode_field in fields:
+                try:
+                    field_value = getattr(value, field_name)
+                except AttributeError as exc:
+                    raise bv.ValidationError(exc.args[0])
+                if field_value is not None and getattr(value, presence_key):
+                    try:
+                        d[field_name] = encode_field(field_value)
+                    except bv.ValidationError as exc:
+                        exc.add_parent(field_name)
+                        raise
+            return d
+        return encode_struct
+
+    def _compile_struct_tree_plan(self, validator, key, get_plan):
+        validate = None if key[0] == 'encode_validated' else validator.validate
+        subtypes = {}
+        for pytype, (tags, subtype) in validator.definition._pytype_to_tag_and_subtype_.items():
+            if len(tags) == 1 and not isinstance(subtype, bv.StructTree):
+                subtypes[pytype] = (tags[0], get_plan(subtype, ('encode_struct',) + key[1:]))
+        old_style = self._old_style
+
+        def encode_struct_tree(value):
+            if validate is not None:
+                validate(value)
+            try:
+                tag, encode_fields = subtypes[type(value)]
+            except KeyError:
+                # Fails like encode_struct_tree().
+                return self.encode_struct_tree(validator, value)
+            if old_style:
+                return {tag: encode_fields(value)}
+            d = collections.OrderedDict()
+            d['.tag'] = tag
+            d.update(encode_fields(value))
+            return d
+        return encode_struct_tree
+
+    def _compile_union_plan(self, validator, key, get_plan):
+        if key[0] == 'encode_validated':
+            validate_type_only = None
+        else:
+            validate_type_only = validator.validate_type_only
+        encode_f = self._get_specialized_encoder(validator)
+        if encode_f is not None:
+            def encode_specialized_union(value):
+                if validate_type_only is not None:
+                    validate_type_only(value)
+                return encode_f(self, value)
+            return encode_specialized_union
+
+        tags = {}
+        for tag, field_validator in validator.definition._tagmap.items():
+            if isinstance(field_validator, bv.Void):
+                tags[tag] = (True, False, False, None)
+                continue
+            nullable = isinstance(field_validator, bv.Nullable)
+            if nullable:
+                value_validator = field_validator.validator
+            else:
+                value_validator = field_validator
+            is_struct = (isinstance(value_validator, bv.Struct) and
+                         not isinstance(value_validator, bv.StructTree))
+            tags[tag] = (
+                False, nullable, is_struct, get_plan(field_validator, ('encode',) + key[1:]))
+        old_style = self._old_style
+
+        def encode_union(value):
+            if validate_type_only is not None:
+                validate_type_only(value)
+            tag = value._tag
+            if tag is None:
+                raise bv.ValidationError('no tag set')
+            is_void, nullable, is_struct, encode_value = tags[tag]
+            if is_void or nullable and value._value is None:
+                if old_style:
+                    return tag
+                return {'.tag': tag}
+            try:
+                encoded_val = encode_value(value._value)
+            except bv.ValidationError as exc:
+                exc.add_parent(tag)
+                raise
+            if old_style:
+                return {tag: encoded_val}
+            elif is_struct:
+                d = collections.OrderedDict()  # type: typing.Dict[str, typing.Any]
+                d['.tag'] = tag
+                d.update(encoded_val)
+                return d
+            else:
+                return collections.OrderedDict((
+                    ('.tag', tag),
+                    (tag, encoded_val),
+                ))
+        return encode_union
+
+    def encode_list(self, validator, value):
+        # Like the plans, validates the list while encoding it, see
+        # _compile_list_plan().
+        validator.validate_type_only(value)
+        item_validator = validator.item_validator
+        encoded = []  # type: typing.List[typing.Any]
+        try:
+            for value_item in value:
+                encoded.append(
+                    self.encode_sub(item_validator, item_validator.validate(value_item)))
+        except bv.ValidationError as exc:
+            for value_item in value[len(encoded):]:
+                item_validator.validate(value_item)
+            raise exc
+        return encoded
 
     def encode_nullable(self, validator, value):
         if value is None:
@@ -247,6 +583,10 @@ class StoneToPythonPrimitiveSerializer(StoneSerializerBase):
             return value
 
     def encode_struct(self, validator, value):
+        encode_f = self._get_specialized_encoder(validator)
+        if encode_f is not None:
+            return encode_f(self, value)
+
         # Skip validation of fields with primitive data types because
         # they've already been validated on assignment
         d = collections.OrderedDict()  # type: typing.Dict[str, typing.Any]
@@ -293,6 +633,10 @@ class StoneToPythonPrimitiveSerializer(StoneSerializerBase):
         return d
 
     def encode_union(self, validator, value):
+        encode_f = self._get_specialized_encoder(validator)
+        if encode_f is not None:
+            return encode_f(self, value)
+
         if value._tag is None:
             raise bv.ValidationError('no tag set')
 
@@ -350,12 +694,271 @@ class StoneToJsonSerializer(StoneToPythonPrimitiveSerializer):
     def encode(self, validator, value):
         return json.dumps(super(StoneToJsonSerializer, self).encode(validator, value))
 
+# ------------------------------------------------------------------------
+class StoneToJsonChunkSerializer(StoneSerializerBase):
+    """
+    Encodes values to the same JSON as ``StoneToJsonSerializer``, as an
+    iterator of chunks of it, without building the whole encoded value
+    first. Values that can hold lists of any length are encoded as they are
+    iterated, the others are encoded whole.
+
+    Values are validated as they are encoded, so a validation error can be
+    raised after some chunks have been produced, but the errors are the same
+    as the ones of ``StoneToJsonSerializer``.
+    """
+
+    def __init__(self, alias_validators=None, old_style=False):
+        # type: (typing.Mapping[bv.Validator, typing.Callable[[typing.Any], None]], bool) -> None # noqa: E501
+        """
+        Args:
+            alias_validators (``typing.Mapping``, optional): Passed
+                to ``StoneSerializer.__init__``. Defaults to ``None``.
+            old_style (bool, optional): See the like-named property of
+                ``StoneToPythonPrimitiveSerializer``. Defaults to ``False``.
+        """
+        super(StoneToJsonChunkSerializer, self).__init__(alias_validators=alias_validators)
+        self._old_style = old_style
+        self._primitive_serializer = StoneToPythonPrimitiveSerializer(
+            alias_validators, old_style=old_style, use_specialized_encoders=True)
+        self._encodes_whole = {}  # type: typing.Dict[bv.Validator, bool]
+        self._batch_validators = {}  # type: typing.Dict[bv.Validator, bv.List]
+
+    @property
+    def old_style(self):
+        """
+        See the like-named property of ``StoneToPythonPrimitiveSerializer``.
+        """
+        return self._old_style
+
+    def encode_sub(self, validator, value):
+        # type: (bv.Validator, typing.Any) -> typing.Iterator[str]
+        """
+        Returns an iterator of the chunks of the JSON encoding a value, like
+        the other ``encode`` methods.
+        """
+        if self._is_encoded_whole(validator):
+            return iter((json.dumps(self._primitive_serializer.encode_sub(validator, value)),))
+        elif isinstance(validator, bv.Nullable):
+            if value is None:
+                return iter((_JSON_NULL,))
+            elif isinstance(validator.validator, bv.List):
+                # Lists are validated by encode_list() as they are encoded.
+                return self.encode_list(validator.validator, value)
+        elif isinstance(validator, bv.List):
+            # Lists are validated by encode_list() as they are encoded.
+            return self.encode_list(validator, value)
+        return super(StoneToJsonChunkSerializer, self).encode_sub(validator, value)
+
+    def _is_encoded_whole(self, validator):
+        """
+        Whether the values of a validator are encoded whole, because their
+        size is bounded by their data type.
+        """
+        try:
+            return self._encodes_whole[validator]
+        except KeyError:
+            pass
+        # A data type that refers to itself is unbounded.
+        self._encodes_whole[validator] = False
+        if isinstance(validator, bv.Nullable):
+            whole = self._is_encoded_whole(validator.validator)
+        elif isinstance(validator, bv.Primitive):
+            whole = True
+        elif isinstance(validator, bv.StructTree):
+            whole = all(
+                self._is_encoded_whole(field_validator)
+                for _, subtype in validator.definition._pytype_to_tag_and_subtype_.values()
+                for _, field_validator in subtype.definition._all_fields_)
+        elif isinstance(validator, bv.Struct):
+            whole = all(self._is_encoded_whole(field_validator)
+                        for _, field_validator in validator.definition._all_fields_)
+        elif isinstance(validator, bv.Union):
+            whole = all(self._is_encoded_whole(field_validator)
+                        for field_validator in validator.definition._tagmap.values())
+        else:
+            whole = False
+        self._encodes_whole[validator] = whole
+        return whole
+
+    def encode_list(self, validator, value):
+        # Like StoneToPythonPrimitiveSerializer.encode_list().
+        validator.validate_type_only(value)
+        item_validator = validator.item_validator
+        yield _JSON_LIST_START
+        count = 0
+        try:
+            if self._is_encoded_whole(item_validator):
+                # The items are encoded by batches, as the items of a list.
+                batch_validator = self._batch_validators.get(item_validator)
+                if batch_validator is None:
+                    batch_validator = bv.List(item_validator)
+                    self._batch_validators[item_validator] = batch_validator
+                for count in range(0, len(value), _JSON_LIST_BATCH_SIZE):
+                    batch = self._primitive_serializer.encode_sub(
+                        batch_validator, value[count:count + _JSON_LIST_BATCH_SIZE])
+                    chunk = json.dumps(batch)[1:-1]
+                    yield chunk if count == 0 else _JSON_ITEM_SEPARATOR + chunk
+            else:
+                for value_item in value:
+                    if count:
+                        yield _JSON_ITEM_SEPARATOR
+                    for chunk in self.encode_sub(
+                            item_validator, item_validator.validate(value_item)):
+                        yield chunk
+                    count += 1
+        except bv.ValidationError as exc:
+            for value_item in value[count:]:
+                item_validator.validate(value_item)
+            raise exc
+        yield _JSON_LIST_END
+
+    def encode_nullable(self, validator, value):
+        if value is None:
+            return iter((_JSON_NULL,))
+        return self.encode_sub(validator.validator, value)
+
+    def encode_primitive(self, validator, value):
+        return iter((json.dumps(self._primitive_serializer.encode_primitive(validator, value)),))
+
+    def encode_struct(self, validator, value):
+        yield _JSON_OBJECT_START
+        for chunk in self._encode_struct_members(validator, value, True):
+            yield chunk
+        yield _JSON_OBJECT_END
+
+    def _encode_struct_members(self, validator, value, first):
+        """
+        Yields the chunks of the members of a JSON object for the fields of a
+        struct. Unless it's the first member of the object, a member is
+        preceded by a separator.
+        """
+        for field_name, field_validator in validator.definition._all_fields_:
+            try:
+                field_value = getattr(value, field_name)
+            except AttributeError as exc:
+                raise bv.ValidationError(exc.args[0])
+
+            presence_key = '_%s_present' % field_name
+
+            if field_value is not None \
+                    and getattr(value, presence_key):
+                if first:
+                    first = False
+                    yield _json_member_start(field_name)
+                else:
+                    yield _JSON_ITEM_SEPARATOR + _json_member_start(field_name)
+                try:
+                    for chunk in self.encode_sub(field_validator, field_value):
+                        yield chunk
+                except bv.ValidationError as exc:
+                    exc.add_parent(field_name)
+
+                    raise
+
+    def encode_struct_tree(self, validator, value):
+        assert type(value) in validator.definition._pytype_to_tag_and_subtype_, \
+            '%r is not a serializable subtype of %r.' % (type(value), validator.definition)
+
+        tags, subtype = validator.definition._pytype_to_tag_and_subtype_[type(value)]
+
+        assert len(tags) == 1, tags
+        assert not isinstance(subtype, bv.StructTree), \
+            'Cannot serialize type %r because it enumerates subtypes.' % subtype.definition
+
+        if self.old_style:
+            yield _JSON_OBJECT_START + _json_member_start(tags[0])
+            for chunk in self.encode_struct(subtype, value):
+                yield chunk
+        else:
+            yield _JSON_OBJECT_START + _json_member_start('.tag') + json.dumps(tags[0])
+            for chunk in self._encode_struct_members(subtype, value, False):
+                yield chunk
+        yield _JSON_OBJECT_END
+
+    def encode_union(self, validator, value):
+        if value._tag is None:
+            raise bv.ValidationError('no tag set')
+
+        field_validator = validator.definition._tagmap[value._tag]
+        is_none = isinstance(field_validator, bv.Void) \
+                or (isinstance(field_validator, bv.Nullable)
+                    and value._value is None)
+
+        if is_none:
+            if self.old_style:
+                yield json.dumps(value._tag)
+            else:
+                yield _JSON_OBJECT_START + _json_member_start('.tag') + \
+                    json.dumps(value._tag) + _JSON_OBJECT_END
+            return
+
+        value_validator = field_validator
+        if isinstance(value_validator, bv.Nullable):
+            value_validator = value_validator.validator
+
+        try:
+            if self.old_style:
+                yield _JSON_OBJECT_START + _json_member_start(value._tag)
+                for chunk in self.encode_sub(field_validator, value._value):
+                    yield chunk
+            elif isinstance(value_validator, bv.Struct) \
+                    and not isinstance(value_validator, bv.StructTree):
+                # Validates like encode_sub() does before merging the members
+                # of the struct into the object.
+                if field_validator is not value_validator:
+                    field_validator.validate(value._value)
+                value_validator.validate_type_only(value._value)
+                yield _JSON_OBJECT_START + _json_member_start('.tag') + json.dumps(value._tag)
+                for chunk in self._encode_struct_members(value_validator, value._value, False):
+                    yield chunk
+            else:
+                yield (_JSON_OBJECT_START + _json_member_start('.tag') +
+                       json.dumps(value._tag) + _JSON_ITEM_SEPARATOR +
+                       _json_member_start(value._tag))
+                for chunk in self.encode_sub(field_validator, value._value):
+                    yield chunk
+        except bv.ValidationError as exc:
+            exc.add_parent(value._tag)
+
+            raise
+        yield _JSON_OBJECT_END
+
+# The chunks of JSON are of the type json.dumps() returns.
+_JSON_NULL = str('null')
+_JSON_LIST_START = str('[')
+_JSON_LIST_END = str(']')
+_JSON_OBJECT_START = str('{')
+_JSON_OBJECT_END = str('}')
+_JSON_ITEM_SEPARATOR = str(', ')
+
+# The number of items of a list encoded whole by a chunk.
+_JSON_LIST_BATCH_SIZE = 1000
+
+def _json_member_start(key):
+    return json.dumps(key) + str(': ')
+
 # --------------------------------------------------------------
 # JSON Encoder
 #
 # These interfaces are preserved for backward compatibility and symmetry with deserialization
 # functions.
 
+# Serializers keep no state besides their options, so the ones without alias
+# validators are shared.
+_JSON_SERIALIZERS = {
+    old_style: StoneToJsonSerializer(old_style=old_style, use_specialized_encoders=True)
+    for old_style in (False, True)
+}
+_PRIMITIVE_SERIALIZERS = {
+    (for_msgpack, old_style): StoneToPythonPrimitiveSerializer(
+        for_msgpack=for_msgpack, old_style=old_style, use_specialized_encoders=True)
+    for for_msgpack in (False, True) for old_style in (False, True)
+}
+_JSON_CHUNK_SERIALIZERS = {
+    old_style: StoneToJsonChunkSerializer(old_style=old_style)
+    for old_style in (False, True)
+}
+
 def json_encode(data_type, obj, alias_validators=None, old_style=False):
     """Encodes an object into JSON based on its type.
 
@@ -407,10 +1010,55 @@ def json_encode(data_type, obj, alias_validators=None, old_style=False):
     > JsonEncoder.encode(um)
     "{'update': {'path': 'a/b/c', 'rev': '1234'}}"
     """
-    for_msgpack = False
-    serializer = StoneToJsonSerializer(alias_validators, for_msgpack, old_style)
+    if alias_validators:
+        for_msgpack = False
+        serializer = StoneToJsonSerializer(
+            alias_validators, for_msgpack, old_style, use_specialized_encoders=True)
+    else:
+        serializer = _JSON_SERIALIZERS[bool(old_style)]
     return serializer.encode(data_type, obj)
 
+def iter_json_encode(data_type, obj, alias_validators=None, old_style=False):
+    """Encodes an object into JSON based on its type, like json_encode(), as
+    an iterator of chunks of the JSON.
+
+    The chunks are produced as the object is encoded, so the whole JSON is
+    never held in memory. As with json_encode(), a bv.ValidationError is
+    raised if the object is invalid, but it can be raised after some of the
+    chunks have been produced.
+
+    Args:
+        data_type (Validator): Validator for obj.
+        obj (object): Object to be serialized.
+        alias_validators (Optional[Mapping[bv.Validator, Callable[[], None]]]):
+            Custom validation functions. These must raise bv.ValidationError on
+            failure.
+
+    Returns:
+        Iterator[str]: Chunks of the JSON-encoded object.
+    """
+    if alias_validators:
+        serializer = StoneToJsonChunkSerializer(alias_validators, old_style)
+    else:
+        serializer = _JSON_CHUNK_SERIALIZERS[bool(old_style)]
+    for chunk in serializer.encode(data_type, obj):
+        yield chunk
+
+def json_encode_to_stream(data_type, obj, fp, alias_validators=None, old_style=False):
+    """Encodes an object into JSON based on its type, like json_encode(), and
+    writes it to a file-like object as it's encoded.
+
+    See iter_json_encode() for the other arguments. If the object is invalid,
+    bv.ValidationError is raised, and only part of the JSON may have been
+    written to fp.
+
+    Args:
+        fp: A file-like object with a ``write`` method that accepts the
+            chunks of iter_json_encode().
+    """
+    for chunk in iter_json_encode(data_type, obj, alias_validators, old_style):
+        fp.write(chunk)
+
 def json_compat_obj_encode(
         data_type, obj, alias_validators=None, old_style=False,
         for_msgpack=False):
@@ -426,7 +1074,11 @@ def json_compat_obj_encode(
 
     See json_encode() for additional information about validation.
     """
-    serializer = StoneToPythonPrimitiveSerializer(alias_validators, for_msgpack, old_style)
+    if alias_validators:
+        serializer = StoneToPythonPrimitiveSerializer(
+            alias_validators, for_msgpack, old_style, use_specialized_encoders=True)
+    else:
+        serializer = _PRIMITIVE_SERIALIZERS[bool(for_msgpack), bool(old_style)]
     return serializer.encode(data_type, obj)
 
 # --------------------------------------------------------------
@@ -502,13 +1154,22 @@ def _json_compat_obj_decode_helper(
     """
     See json_compat_obj_decode() for argument descriptions.
     """
+    if not alias_validators:
+        key = ('decode', strict, old_style, for_msgpack)
+        return _get_plan(data_type, key, _compile_decode_plan)(obj)
     if isinstance(data_type, bv.StructTree):
         return _decode_struct_tree(
             data_type, obj, alias_validators, strict, for_msgpack)
     elif isinstance(data_type, bv.Struct):
+        decode = _get_specialized_decoder(data_type, alias_validators, for_msgpack)
+        if decode is not None:
+            return decode(obj, strict, old_style)
         return _decode_struct(
             data_type, obj, alias_validators, strict, old_style, for_msgpack)
     elif isinstance(data_type, bv.Union):
+        decode = _get_specialized_decoder(data_type, alias_validators, for_msgpack)
+        if decode is not None:
+            return decode(obj, strict, old_style)
         if old_style:
             return _decode_union_old(
                 data_type, obj, alias_validators, strict, for_msgpack)
@@ -530,6 +1191,339 @@ def _json_compat_obj_decode_helper(
         raise AssertionError('Cannot handle type %r.' % data_type)
 
 
+def _compile_decode_plan(data_type, key, get_plan):
+    """
+    Compiles a plan that decodes like _json_compat_obj_decode_helper()
+    without alias validators, or like _decode_struct(), _decode_union() or
+    _decode_union_old() for the 'decode_struct', 'decode_union' and
+    'decode_union_old' kinds. See _get_plan().
+    """
+    kind, strict, old_style, for_msgpack = key
+    if kind == 'decode_struct':
+        return _compile_decode_struct_plan(data_type, key, get_plan)
+    elif kind == 'decode_union':
+        return _compile_decode_union_plan(data_type, key, get_plan)
+    elif kind == 'decode_union_old':
+        return _compile_decode_union_old_plan(data_type, key, get_plan)
+    elif isinstance(data_type, bv.StructTree):
+        return _compile_decode_struct_tree_plan(data_type, key, get_plan)
+    elif isinstance(data_type, (bv.Struct, bv.Union)):
+        decode = _get_specialized_decoder(data_type, None, for_msgpack)
+        if decode is not None:
+            def decode_specialized(obj):
+                return decode(obj, strict, old_style)
+            return decode_specialized
+        elif isinstance(data_type, bv.Struct):
+            return get_plan(data_type, ('decode_struct',) + key[1:])
+        elif old_style:
+            return get_plan(data_type, ('decode_union_old',) + key[1:])
+        else:
+            return get_plan(data_type, ('decode_union',) + key[1:])
+    elif isinstance(data_type, bv.List):
+        decode_item = get_plan(data_type.item_validator, key)
+
+        def decode_list(obj):
+            if not isinstance(obj, list):
+                raise bv.ValidationError(
+                    'expected list, got %s' % bv.generic_type_name(obj))
+            return [decode_item(item) for item in obj]
+        return decode_list
+    elif isinstance(data_type, bv.Nullable):
+        decode_value = get_plan(data_type.validator, key)
+
+        def decode_nullable(obj):
+            if obj is not None:
+                return decode_value(obj)
+            else:
+                return None
+        return decode_nullable
+    elif isinstance(data_type, bv.Primitive):
+        return _compile_decode_primitive_plan(data_type, strict, for_msgpack)
+    else:
+        def decode_unsupported(obj):
+            raise AssertionError('Cannot handle type %r.' % data_type)
+        return decode_unsupported
+
+
+def _compile_decode_primitive_plan(data_type, strict, for_msgpack):
+    """
+    Like _make_stone_friendly() without validation and alias validators.
+    """
+    if isinstance(data_type, bv.Timestamp):
+        fmt = data_type.format
+
+        def decode_timestamp(val):
+            try:
+                return datetime.datetime.strptime(val, fmt)
+            except (TypeError, ValueError) as e:
+                raise bv.ValidationError(e.args[0])
+        return decode_timestamp
+    elif isinstance(data_type, bv.Bytes):
+        if for_msgpack:
+            def decode_msgpack_bytes(val):
+                if isinstance(val, six.text_type):
+                    return val.encode('utf-8')
+                return val
+            return decode_msgpack_bytes
+
+        def decode_bytes(val):
+            try:
+                return base64.b64decode(val)
+            except (TypeError, ValueError):
+                raise bv.ValidationError('invalid base64-encoded bytes')
+        return decode_bytes
+    elif isinstance(data_type, bv.Void):
+        def decode_void(val):
+            if strict and val is not None:
+                raise bv.ValidationError("expected null, got value")
+            return None
+        return decode_void
+    else:
+        def decode_primitive(val):
+            return val
+        return decode_primitive
+
+
+def _compile_decode_struct_plan(data_type, key, get_plan):
+    _, strict, old_style, for_msgpack = key
+    definition = data_type.definition
+    all_field_names = definition._all_field_names_
+    fields = [
+        (name, field_data_type,
+         get_plan(field_data_type, ('decode', strict, old_style, for_msgpack)))
+        for name, field_data_type in definition._all_fields_]
+    validate_fields_only = data_type.validate_fields_only
+
+    def decode_struct(obj):
+        if obj is None and data_type.has_default():
+            return data_type.get_default()
+        elif not isinstance(obj, dict):
+            raise bv.ValidationError('expected object, got %s' %
+                                     bv.generic_type_name(obj))
+        if strict:
+            for key in obj:
+                if key not in all_field_names and not key.startswith('.tag'):
+                    raise bv.ValidationError("unknown field '%s'" % key)
+        ins = definition()
+        for name, field_data_type, decode_field in fields:
+            if name in obj:
+                try:
+                    setattr(ins, name, decode_field(obj[name]))
+                except bv.ValidationError as e:
+                    e.add_parent(name)
+                    raise
+            elif field_data_type.has_default():
+                setattr(ins, name, field_data_type.get_default())
+        # Check that all required fields have been set.
+        validate_fields_only(ins)
+        return ins
+    return decode_struct
+
+
+def _compile_decode_struct_tree_plan(data_type, key, get_plan):
+    _, strict, _, for_msgpack = key
+    # Non-leaf subtypes are rejected before they're decoded.
+    decode_subtypes = {
+        subtype: _compile_decode_subtype_plan(subtype, strict, for_msgpack, get_plan)
+        for subtype in data_type.definition._tag_to_subtype_.values()
+        if not isinstance(subtype, bv.StructTree)
+    }
+
+    def decode_struct_tree(obj):
+        subtype = _determine_struct_tree_subtype(data_type, obj, strict)
+        try:
+            decode_subtype = decode_subtypes[subtype]
+        except KeyError:
+            # The base itself, if it's a catch-all.
+            decode_subtype = _compile_decode_subtype_plan(
+                subtype, strict, for_msgpack,
+                lambda validator, key: _get_plan(validator, key, _compile_decode_plan))
+        return decode_subtype(obj)
+    return decode_struct_tree
+
+
+def _compile_decode_subtype_plan(subtype, strict, for_msgpack, get_plan):
+    decode = _get_specialized_decoder(subtype, None, for_msgpack)
+    if decode is not None:
+        def decode_specialized(obj):
+            return decode(obj, strict, False)
+        return decode_specialized
+    return get_plan(subtype, ('decode_struct', strict, False, for_msgpack))
+
+
+def _compile_decode_union_plan(data_type, key, get_plan):
+    _, strict, _, for_msgpack = key
+    definition = data_type.definition
+    catch_all = definition._catch_all
+    # For each tag, whether it can be a symbol, whether it's nullable, the
+    # plan of the value, if any, and whether the value is under the key of the
+    # tag, rather than the fields of a struct alongside it.
+    tags = {}
+    for tag, val_data_type in definition._tagmap.items():
+        symbol = isinstance(val_data_type, (bv.Void, bv.Nullable))
+        nullable = isinstance(val_data_type, bv.Nullable)
+        if nullable:
+            val_data_type = val_data_type.validator
+        if isinstance(val_data_type, bv.Void):
+            decode_value = None
+        else:
+            decode_value = get_plan(val_data_type, ('decode', strict, False, for_msgpack))
+        tags[tag] = (
+            symbol, nullable, decode_value,
+            isinstance(val_data_type, (bv.Primitive, bv.List, bv.StructTree, bv.Union)))
+
+    def decode_union_dict(obj):
+        if '.tag' not in obj:
+            raise bv.ValidationError("missing '.tag' key")
+        tag = obj['.tag']
+        if not isinstance(tag, six.string_types):
+            raise bv.ValidationError(
+                'tag must be string, got %s' % bv.generic_type_name(tag))
+
+        if tag not in tags:
+            if not strict and catch_all:
+                return catch_all, None
+            else:
+                raise bv.ValidationError("unknown tag '%s'" % tag)
+        if tag == catch_all:
+            raise bv.ValidationError(
+                "unexpected use of the catch-all tag '%s'" % tag)
+
+        _, nullable, decode_value, in_key = tags[tag]
+        if decode_value is None:
+            if tag in obj:
+                if obj[tag] is not None:
+                    raise bv.ValidationError('expected null, got %s' %
+                                             bv.generic_type_name(obj[tag]))
+            for key in obj:
+                if key != tag and key != '.tag':
+                    raise bv.ValidationError("unexpected key '%s'" % key)
+            val = None
+        elif in_key:
+            if tag in obj:
+                try:
+                    val = decode_value(obj[tag])
+                except bv.ValidationError as e:
+                    e.add_parent(tag)
+                    raise
+            else:
+                if nullable:
+                    val = None
+                else:
+                    raise bv.ValidationError("missing '%s' key" % tag)
+            for key in obj:
+                if key != tag and key != '.tag':
+                    raise bv.ValidationError("unexpected key '%s'" % key)
+        else:
+            if nullable and len(obj) == 1:  # only has a .tag key
+                val = None
+            else:
+                try:
+                    val = decode_value(obj)
+                except bv.ValidationError as e:
+                    e.add_parent(tag)
+                    raise
+        return tag, val
+
+    def decode_union(obj):
+        val = None
+        if isinstance(obj, six.string_types):
+            tag = obj
+            if tag in tags:
+                if not tags[tag][0]:
+                    raise bv.ValidationError(
+                        "expected object for '%s', got symbol" % tag)
+                if tag == catch_all:
+                    raise bv.ValidationError(
+                        "unexpected use of the catch-all tag '%s'" % tag)
+            else:
+                if not strict and catch_all:
+                    tag = catch_all
+                else:
+                    raise bv.ValidationError("unknown tag '%s'" % tag)
+        elif isinstance(obj, dict):
+            tag, val = decode_union_dict(obj)
+        else:
+            raise bv.ValidationError("expected string or object, got %s" %
+                                     bv.generic_type_name(obj))
+        return definition(tag, val)
+    return decode_union
+
+
+def _compile_decode_union_old_plan(data_type, key, get_plan):
+    _, strict, _, for_msgpack = key
+    definition = data_type.definition
+    catch_all = definition._catch_all
+    # For each tag, whether it can be a symbol, whether it's nullable, and the
+    # plan of the value, if any.
+    tags = {}
+    for tag, val_data_type in definition._tagmap.items():
+        if isinstance(val_data_type, bv.Void):
+            tags[tag] = (True, False, None)
+        else:
+            tags[tag] = (
+                isinstance(val_data_type, bv.Nullable),
+                isinstance(val_data_type, bv.Nullable),
+                get_plan(val_data_type, ('decode', strict, True, for_msgpack)))
+
+    def decode_union_old(obj):
+        val = None
+        if isinstance(obj, six.string_types):
+            # Union member has no associated value
+            tag = obj
+            if tag in tags:
+                if not tags[tag][0]:
+                    raise bv.ValidationError(
+                        "expected object for '%s', got symbol" % tag)
+            else:
+                if not strict and catch_all:
+                    tag = catch_all
+                else:
+                    raise bv.ValidationError("unknown tag '%s'" % tag)
+        elif isinstance(obj, dict):
+            # Union member has value
+            if len(obj) != 1:
+                raise bv.ValidationError('expected 1 key, got %s' % len(obj))
+            tag = list(obj)[0]
+            raw_val = obj[tag]
+            if tag in tags:
+                _, nullable, decode_value = tags[tag]
+                if nullable and raw_val is None:
+                    val = None
+                elif decode_value is None:
+                    if raw_val is not None and strict:
+                        raise bv.ValidationError('expected null, got %s' %
+                                                 bv.generic_type_name(raw_val))
+                else:
+                    try:
+                        val = decode_value(raw_val)
+                    except bv.ValidationError as e:
+                        e.add_parent(tag)
+                        raise
+            else:
+                if not strict and catch_all:
+                    tag = catch_all
+                else:
+                    raise bv.ValidationError("unknown tag '%s'" % tag)
+        else:
+            raise bv.ValidationError("expected string or object, got %s" %
+                                     bv.generic_type_name(obj))
+        return definition(tag, val)
+    return decode_union_old
+
+
+def _get_specialized_decoder(data_type, alias_validators, for_msgpack):
+    """
+    Returns the decoder generated for the definition of a struct or union
+    validator, or None if there's none or it can't be used.
+    """
+    if (not alias_validators and not for_msgpack and
+            # A decoder inherited from a parent class would miss fields.
+            '_decode_json_compat' in data_type.definition.__dict__):
+        return data_type.definition._decode_json_compat
+    return None
+
+
 def _decode_struct(
         data_type, obj, alias_validators, strict, old_style, for_msgpack):
     """
@@ -748,6 +1742,9 @@ def _decode_struct_tree(data_type, obj, alias_validators, strict, for_msgpack):
     See json_compat_obj_decode() for argument descriptions.
     """
     subtype = _determine_struct_tree_subtype(data_type, obj, strict)
+    decode = _get_specialized_decoder(subtype, alias_validators, for_msgpack)
+    if decode is not None:
+        return decode(obj, strict, False)
     return _decode_struct(
         subtype, obj, alias_validators, strict, False, for_msgpack)
 
@@ -841,7 +1838,8 @@ def _make_stone_friendly(
         else:
             try:
                 ret = base64.b64decode(val)
-            except TypeError:
+            except (TypeError, ValueError):
+                # Python 3 raises binascii.Error, a ValueError, on bad input.
                 raise bv.ValidationError('invalid base64-encoded bytes')
     elif isinstance(data_type, bv.Void):
         if strict and val is not None:
@@ -394,6 +394,14 @@ class List(Composite):
         self.max_items = max_items
 
     def validate(self, val):
+        self.validate_type_only(val)
+        return [self.item_validator.validate(item) for item in val]
+
+    def validate_type_only(self, val):
+        """
+        Use this when you only want to validate that val is a list with an
+        allowed number of items, but not yet validate each item.
+        """
         if not isinstance(val, (tuple, list)):
             raise ValidationError('%r is not a valid list' % val)
         elif self.max_items is not None and len(val) > self.max_items:
@@ -402,7 +410,6 @@ class List(Composite):
         elif self.min_items is not None and len(val) < self.min_items:
             raise ValidationError('%r has fewer than %s items'
                                   % (val, self.min_items))
-        return [self.item_validator.validate(item) for item in val]
 
 
 class Struct(Composite):
@@ -6,7 +6,6 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 import os
 import re
-import shutil
 
 # Hack to get around some of Python 2's standard library modules that
 # accept ascii-encodable unicode literals in lieu of strs, but where
@@ -34,6 +33,7 @@ from stone.data_type import (
     is_union_type,
     is_user_defined_type,
     is_void_type,
+    unwrap,
     unwrap_aliases,
     unwrap_nullable,
 )
@@ -58,6 +58,16 @@ except (SystemError, ValueError):
 
 """
 
+# Follows validators_import when specialized decoders are generated, which
+# fall back on the generic decoder for some values.
+serializers_import = """\
+try:
+    from . import stone_serializers as ss
+except (SystemError, ValueError):
+    import stone_serializers as ss
+
+"""
+
 # Matches format of Stone doc tags
 doc_sub_tag_re = re.compile(':(?P<tag>[A-z]*):`(?P<val>.*?)`')
 
@@ -70,6 +80,20 @@ _cmdline_parser.add_argument(
           '{route} for the route name. This is used to translate Stone doc '
           'references to routes to references in Python docstrings.'),
 )
+_cmdline_parser.add_argument(
+    '--specialized-encoders',
+    action='store_true',
+    help=('Generate a JSON encoder specialized for each struct and union. '
+          'json_encode() and json_compat_obj_encode() use it in place of the '
+          'generic encoder, with identical output.'),
+)
+_cmdline_parser.add_argument(
+    '--specialized-decoders',
+    action='store_true',
+    help=('Generate a JSON decoder specialized for each struct and union. '
+          'json_decode() and json_compat_obj_decode() use it in place of the '
+          'generic decoder, with identical results and errors.'),
+)
 
 class PythonTypesGenerator(CodeGenerator):
     """Generates Python modules to represent the input Stone spec."""
@@ -81,6 +105,10 @@ class PythonTypesGenerator(CodeGenerator):
 
     preserve_aliases = True
 
+    supports_incremental_build = True
+
+    stream_output = True
+
     def generate(self, api):
         """
         Generates a module for each namespace.
@@ -89,19 +117,23 @@ class PythonTypesGenerator(CodeGenerator):
         routes in the Stone spec.
         """
         rsrc_folder = os.path.join(os.path.dirname(__file__), 'python_rsrc')
-        self.logger.info('Copying stone_validators.py to output folder')
-        shutil.copy(os.path.join(rsrc_folder, 'stone_validators.py'),
-                    self.target_folder_path)
-        self.logger.info('Copying stone_serializers.py to output folder')
-        shutil.copy(os.path.join(rsrc_folder, 'stone_serializers.py'),
-                    self.target_folder_path)
-        self.logger.info('Copying stone_base.py to output folder')
-        shutil.copy(os.path.join(rsrc_folder, 'stone_base.py'),
-                    self.target_folder_path)
+        for filename in ('stone_validators.py', 'stone_serializers.py', 'stone_base.py'):
+            self.copy_to_relative_path(os.path.join(rsrc_folder, filename), filename)
+
+        namespaces = []
         for namespace in api.namespaces.values():
-            with self.output_to_relative_path('{}.py'.format(namespace.name)):
+            if self.is_namespace_output_current(namespace):
+                self.logger.info('Skipping unchanged namespace %s', namespace.name)
+            else:
+                namespaces.append(namespace)
+
+        def render(namespace):
+            with self.output_for_namespace(namespace), \
+                    self.output_to_relative_path('{}.py'.format(namespace.name)):
                 self._generate_base_namespace_module(api, namespace)
 
+        self.render_in_parallel(render, namespaces)
+
     def _generate_base_namespace_module(self, api, namespace):
         """Creates a module for the namespace. All data types and routes are
         represented as Python classes."""
@@ -115,7 +147,12 @@ class PythonTypesGenerator(CodeGenerator):
             self.emit('"""')
             self.emit()
 
+        if self.args.specialized_encoders:
+            self.emit('import collections')
+            self.emit()
         self.emit_raw(validators_import)
+        if self.args.specialized_decoders:
+            self.emit_raw(serializers_import)
 
         imported_namespaces = namespace.get_imported_namespaces()
         if imported_namespaces:
@@ -282,6 +319,10 @@ class PythonTypesGenerator(CodeGenerator):
             self._generate_struct_class_has_required_fields(data_type)
             self._generate_struct_class_init(data_type)
             self._generate_struct_class_properties(ns, data_type)
+            if self.args.specialized_encoders:
+                self._generate_struct_class_encoder(ns, data_type)
+            if self.args.specialized_decoders:
+                self._generate_struct_class_decoder(ns, data_type)
             self._generate_struct_class_repr(data_type)
         if data_type.has_enumerated_subtypes():
             validator = 'StructTree'
@@ -571,6 +612,241 @@ class PythonTypesGenerator(CodeGenerator):
                           class_name_for_data_type(data_type))
         self.emit()
 
+    def _generate_struct_class_encoder(self, ns, data_type):
+        """
+        Generates a class method that encodes an instance like
+        StoneToPythonPrimitiveSerializer.encode_struct(), without looking up
+        the fields and their validators at runtime. Values of fields aren't
+        validated again, because their setters validated them.
+        """
+        self.emit('@classmethod')
+        self.emit('def _encode_json_compat(cls, serializer, val):')
+        with self.indent():
+            self.emit('d = collections.OrderedDict()')
+            for field in self._get_fields_in_serialization_order(data_type):
+                field_name = fmt_var(field.name)
+                _, nullable, _ = unwrap(field.data_type)
+                self.emit('if val._{}_present:'.format(field_name))
+                with self.indent():
+                    if nullable:
+                        # A nullable alias is validated as is by the setter,
+                        # so None can be present.
+                        self.emit('v = val._{}_value'.format(field_name))
+                        self.emit('if v is not None:')
+                        with self.indent():
+                            self._generate_encode_value(
+                                ns, field.data_type, 'v', field_name,
+                                "d['{}'] = {{}}".format(field_name))
+                    else:
+                        self._generate_encode_value(
+                            ns, field.data_type, 'val._{}_value'.format(field_name),
+                            field_name, "d['{}'] = {{}}".format(field_name))
+                # Like the getter, which only knows nullable fields that
+                # aren't aliases.
+                if not (is_nullable_type(field.data_type) or field.has_default):
+                    self.emit('else:')
+                    with self.indent():
+                        self.emit("raise bv.ValidationError(\"missing required field '%s'\")"
+                                  % field_name)
+            self.emit('return d')
+        self.emit()
+
+    def _generate_encode_value(self, ns, data_type, value, name, assignment):
+        """
+        Emits the code that encodes a non-null value of a field or union tag,
+        and assigns it with the assignment format string. Validation errors
+        get the name as parent.
+        """
+        dt, _, _ = unwrap(data_type)
+        if is_string_type(dt) or is_boolean_type(dt) or is_float_type(dt):
+            self.emit(assignment.format(value))
+            return
+        elif is_integer_type(dt):
+            # Booleans pass integer validation, but are encoded as integers.
+            if value != 'v':
+                self.emit('v = {}'.format(value))
+            self.emit(assignment.format('int(v) if isinstance(v, bool) else v'))
+            return
+        elif is_struct_type(dt) and not dt.has_enumerated_subtypes() or is_union_type(dt):
+            encoded = '{}._encode_json_compat(serializer, {})'.format(
+                self._definition_reference(ns, data_type, 'cls._{}_validator'.format(name)),
+                value)
+        else:
+            encoded = 'serializer.encode_sub(cls._{}_validator, {})'.format(name, value)
+        self.emit('try:')
+        with self.indent():
+            self.emit(assignment.format(encoded))
+        self.emit('except bv.ValidationError as e:')
+        with self.indent():
+            self.emit("e.add_parent('{}')".format(name))
+            self.emit('raise')
+
+    def _definition_reference(self, ns, data_type, validator):
+        """
+        Returns an expression for the class of the struct or union that
+        data_type is, possibly behind aliases and a nullable. The target of an
+        alias can be in a namespace the module doesn't import, so it's reached
+        through the validator of the field or tag instead.
+        """
+        dt, nullable, alias = unwrap(data_type)
+        if not alias:
+            return class_name_for_data_type(dt, ns)
+        elif nullable:
+            return '{}.validator.definition'.format(validator)
+        else:
+            return '{}.definition'.format(validator)
+
+    def _generate_struct_class_decoder(self, ns, data_type):
+        """
+        Generates a class method that decodes a dict like _decode_struct() in
+        stone_serializers, with the same results and errors. The fields are
+        decoded, defaulted, and checked for presence in one pass, and their
+        values are set without going through the setters.
+        """
+        self.emit('@classmethod')
+        self.emit('def _decode_json_compat(cls, obj, strict, old_style):')
+        with self.indent():
+            self.emit('if not isinstance(obj, dict):')
+            with self.indent():
+                if not data_type.all_required_fields:
+                    self.emit('if obj is None:')
+                    with self.indent():
+                        self.emit('return cls()')
+                self.emit("raise bv.ValidationError('expected object, got %s' % "
+                          "bv.generic_type_name(obj))")
+            self.emit('if strict and not cls._all_field_names_.issuperset(obj):')
+            with self.indent():
+                self.emit('for key in obj:')
+                with self.indent():
+                    self.emit("if key not in cls._all_field_names_ and "
+                              "not key.startswith('.tag'):")
+                    with self.indent():
+                        self.emit("raise bv.ValidationError(\"unknown field '%s'\" % key)")
+            self.emit('ins = cls.__new__(cls)')
+            fields = self._get_fields_in_serialization_order(data_type)
+            has_required_fields = any(
+                not (is_nullable_type(field.data_type) or field.has_default)
+                for field in fields)
+            if has_required_fields:
+                self.emit('missing = None')
+            for field in fields:
+                self._generate_struct_field_decoder(ns, field)
+            if has_required_fields:
+                self.emit('if missing is not None:')
+                with self.indent():
+                    self.emit("raise bv.ValidationError(\"missing required field '%s'\" % "
+                              "missing)")
+            self.emit('return ins')
+        self.emit()
+
+    def _generate_struct_field_decoder(self, ns, field):
+        """
+        Emits the code that sets a field of ins from obj, like
+        _decode_struct_fields() and the setter of the field would. A required
+        field that's missing is recorded in missing, since the generic decoder
+        reports an invalid value of any field first.
+        """
+        field_name = fmt_var(field.name)
+        validator = 'cls._{}_validator'.format(field_name)
+        dt, nullable, _ = unwrap(field.data_type)
+        self.emit("if '{}' in obj:".format(field_name))
+        with self.indent():
+            if is_nullable_type(field.data_type):
+                self.emit("v = obj['{}']".format(field_name))
+                self.emit('if v is None:')
+                with self.indent():
+                    self._generate_struct_field_assignment(field_name, 'None', False)
+                self.emit('else:')
+                with self.indent():
+                    self._generate_struct_field_decode_value(
+                        ns, field, 'v', validator)
+            elif nullable:
+                # The setter of a nullable alias validates None as is, and
+                # the value may be anything, so stay with the generic decoder.
+                self._generate_struct_field_decode_value(
+                    ns, field, "obj['{}']".format(field_name), validator,
+                    '{0}.validate(ss._json_compat_obj_decode_helper('
+                    "{0}, obj['{1}'], None, strict, old_style, False))".format(
+                        validator, field_name))
+            else:
+                self._generate_struct_field_decode_value(
+                    ns, field, "obj['{}']".format(field_name), validator)
+        self.emit('else:')
+        with self.indent():
+            # The generic decoder sets the default of the validator, if any.
+            if is_nullable_type(field.data_type):
+                self._generate_struct_field_assignment(field_name, 'None', False)
+            elif nullable:
+                self._generate_struct_field_assignment(field_name, 'None', True)
+            elif is_struct_type(dt) and not dt.all_required_fields:
+                self._generate_struct_field_assignment(
+                    field_name, '{}.get_default()'.format(validator), True)
+            else:
+                self._generate_struct_field_assignment(field_name, 'None', False)
+                if not field.has_default:
+                    self.emit('if missing is None:')
+                    with self.indent():
+                        self.emit("missing = '{}'".format(field_name))
+
+    def _generate_struct_field_assignment(self, field_name, value, present):
+        self.emit('ins._{}_value = {}'.format(field_name, value))
+        self.emit('ins._{}_present = {!r}'.format(field_name, present))
+
+    def _generate_struct_field_decode_value(self, ns, field, raw, validator, decoded=None):
+        """
+        Emits the code that decodes a non-null value of a field and sets it.
+        Validation errors get the name of the field as parent.
+        """
+        field_name = fmt_var(field.name)
+        if decoded is None:
+            decoded = self._decode_value_expression(
+                ns, field.data_type, raw, validator, 'old_style', True)
+        self.emit('try:')
+        with self.indent():
+            self.emit('ins._{}_value = {}'.format(field_name, decoded))
+        self.emit('except bv.ValidationError as e:')
+        with self.indent():
+            self.emit("e.add_parent('{}')".format(field_name))
+            self.emit('raise')
+        self.emit('ins._{}_present = True'.format(field_name))
+
+    def _decode_value_expression(self, ns, data_type, raw, validator, old_style, validate):
+        """
+        Returns an expression that decodes the non-null value raw of a field
+        or tag like _json_compat_obj_decode_helper() with its validator. If
+        validate is set, the result is also validated like the setter of a
+        field does.
+        """
+        dt, nullable, _ = unwrap(data_type)
+        if is_struct_type(dt) and not dt.has_enumerated_subtypes() or is_union_type(dt):
+            return '{}._decode_json_compat({}, strict, {})'.format(
+                self._definition_reference(ns, data_type, validator), raw, old_style)
+        if nullable:
+            validator = '{}.validator'.format(validator)
+        if (is_string_type(dt) or is_boolean_type(dt) or is_float_type(dt) or
+                is_integer_type(dt)):
+            # The generic decoder leaves these to validation.
+            decoded = raw
+        else:
+            decoded = 'ss._json_compat_obj_decode_helper({}, {}, None, strict, {}, False)'.format(
+                validator, raw, old_style)
+        if validate and not is_struct_type(dt):
+            return '{}.validate({})'.format(validator, decoded)
+        return decoded
+
+    def _get_fields_in_serialization_order(self, data_type):
+        """
+        Returns the fields of a struct in the order of _all_fields_, unlike
+        all_fields: those of the root of the hierarchy first.
+        """
+        hierarchy = []
+        cur_data_type = data_type
+        while cur_data_type:
+            hierarchy.append(cur_data_type)
+            cur_data_type = cur_data_type.parent_type
+        return [field for cur_data_type in reversed(hierarchy)
+                for field in cur_data_type.fields]
+
     def _generate_enumerated_subtypes_tag_mapping(self, ns, data_type):
         """
         Generates attributes needed for serializing and deserializing structs
@@ -662,6 +938,10 @@ class PythonTypesGenerator(CodeGenerator):
             self._generate_union_class_variant_creators(ns, data_type)
             self._generate_union_class_is_set(data_type)
             self._generate_union_class_get_helpers(ns, data_type)
+            if self.args.specialized_encoders:
+                self._generate_union_class_encoder(ns, data_type)
+            if self.args.specialized_decoders:
+                self._generate_union_class_decoder(ns, data_type)
             self._generate_union_class_repr(data_type)
         self.emit('{0}_validator = bv.Union({0})'.format(
             class_name_for_data_type(data_type)
@@ -798,6 +1078,131 @@ class PythonTypesGenerator(CodeGenerator):
                     self.emit('return self._value')
                 self.emit()
 
+    def _generate_union_class_encoder(self, ns, data_type):
+        """
+        Generates a class method that encodes an instance like
+        StoneToPythonPrimitiveSerializer.encode_union() in the new style,
+        with a branch for each tag. The keys are unicode on Python 2, like
+        those of the serializer.
+        """
+        self.emit('@classmethod')
+        self.emit('def _encode_json_compat(cls, serializer, val):')
+        with self.indent():
+            self.emit('tag = val._tag')
+            for field in data_type.all_fields:
+                field_name = fmt_var(field.name)
+                dt, nullable, _ = unwrap(field.data_type)
+                self.emit("if tag == '{}':".format(field_name))
+                with self.indent():
+                    if is_void_type(dt):
+                        self.emit("return {u'.tag': tag}")
+                        continue
+                    if nullable:
+                        self.emit('if val._value is None:')
+                        with self.indent():
+                            self.emit("return {u'.tag': tag}")
+                    if is_struct_type(dt) and not dt.has_enumerated_subtypes():
+                        self.emit('d = collections.OrderedDict()')
+                        self.emit("d[u'.tag'] = tag")
+                        self._generate_encode_value(
+                            ns, field.data_type, 'val._value', field_name, 'd.update({})')
+                        self.emit('return d')
+                    else:
+                        self._generate_encode_value(
+                            ns, field.data_type, 'val._value', field_name, 'v = {}')
+                        self.emit("return collections.OrderedDict(((u'.tag', tag), (tag, v)))")
+            self.emit('if tag is None:')
+            with self.indent():
+                self.emit("raise bv.ValidationError('no tag set')")
+            self.emit('raise KeyError(tag)')
+        self.emit()
+
+    def _generate_union_class_decoder(self, ns, data_type):
+        """
+        Generates a class method that decodes like _decode_union() in
+        stone_serializers, with a branch for each tag of the new style
+        object format. The old style, the symbol format, and unknown or
+        invalid tags are left to the generic decoder.
+        """
+        validator = '{}_validator'.format(class_name_for_data_type(data_type))
+        self.emit('@classmethod')
+        self.emit('def _decode_json_compat(cls, obj, strict, old_style):')
+        with self.indent():
+            self.emit('if old_style:')
+            with self.indent():
+                self.emit('return ss._decode_union_old({}, obj, None, strict, False)'.format(
+                    validator))
+            # The generic decoder rejects the catch-all tag.
+            fields = [field for field in data_type.all_fields if not field.catch_all]
+            if fields:
+                self.emit('if isinstance(obj, dict):')
+                with self.indent():
+                    self.emit("tag = obj.get('.tag')")
+                    for field in fields:
+                        self._generate_union_tag_decoder(ns, field)
+            self.emit('return ss._decode_union({}, obj, None, strict, False)'.format(
+                validator))
+        self.emit()
+
+    def _generate_union_tag_decoder(self, ns, field):
+        """
+        Emits the branch of a tag like _decode_union_dict(). The value is
+        validated by the constructor of the union.
+        """
+        field_name = fmt_var(field.name)
+        validator = 'cls._{}_validator'.format(field_name)
+        dt, nullable, _ = unwrap(field.data_type)
+        self.emit("if tag == '{}':".format(field_name))
+        with self.indent():
+            if is_void_type(dt):
+                self.emit('if obj.get(tag) is not None:')
+                with self.indent():
+                    self.emit("raise bv.ValidationError('expected null, got %s' % "
+                              "bv.generic_type_name(obj[tag]))")
+                self._generate_union_unexpected_keys_check()
+                self.emit('return cls(tag)')
+                return
+            if is_struct_type(dt) and not dt.has_enumerated_subtypes():
+                if nullable:
+                    self.emit('if len(obj) == 1:')
+                    with self.indent():
+                        self.emit('return cls(tag, None)')
+                self._generate_union_tag_decode_value(ns, field, 'obj', validator)
+                self.emit('return cls(tag, val)')
+                return
+            self.emit('if tag in obj:')
+            with self.indent():
+                self._generate_union_tag_decode_value(ns, field, 'obj[tag]', validator)
+            self.emit('else:')
+            with self.indent():
+                if nullable:
+                    self.emit('val = None')
+                else:
+                    self.emit("raise bv.ValidationError(\"missing '%s' key\" % tag)")
+            self._generate_union_unexpected_keys_check()
+            self.emit('return cls(tag, val)')
+
+    def _generate_union_tag_decode_value(self, ns, field, raw, validator):
+        decoded = self._decode_value_expression(
+            ns, field.data_type, raw, validator, 'False', False)
+        if decoded == raw:
+            self.emit('val = {}'.format(decoded))
+            return
+        self.emit('try:')
+        with self.indent():
+            self.emit('val = {}'.format(decoded))
+        self.emit('except bv.ValidationError as e:')
+        with self.indent():
+            self.emit('e.add_parent(tag)')
+            self.emit('raise')
+
+    def _generate_union_unexpected_keys_check(self):
+        self.emit('for key in obj:')
+        with self.indent():
+            self.emit("if key != tag and key != '.tag':")
+            with self.indent():
+                self.emit("raise bv.ValidationError(\"unexpected key '%s'\" % key)")
+
     def _generate_union_class_repr(self, data_type):
         """
         The __repr__() function will return a string of the class name, and
@@ -72,6 +72,8 @@ class SwiftBaseGenerator(CodeGenerator):
     """Wrapper class over Stone generator for Swift logic."""
     # pylint: disable=abstract-method
 
+    stream_output = True
+
     @contextmanager
     def function_block(self, func, args, return_type=None):
         signature = '{}({})'.format(func, args)
@@ -2,7 +2,6 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 import json
 import os
-import shutil
 
 from contextlib import contextmanager
 
@@ -117,24 +116,23 @@ class SwiftTypesGenerator(SwiftBaseGenerator):
     cmdline_parser = _cmdline_parser
     def generate(self, api):
         rsrc_folder = os.path.join(os.path.dirname(__file__), 'swift_rsrc')
-        self.logger.info('Copying StoneValidators.swift to output folder')
-        shutil.copy(os.path.join(rsrc_folder, 'StoneValidators.swift'),
-                    self.target_folder_path)
-        self.logger.info('Copying StoneSerializers.swift to output folder')
-        shutil.copy(os.path.join(rsrc_folder, 'StoneSerializers.swift'),
-                    self.target_folder_path)
-        self.logger.info('Copying StoneBase.swift to output folder')
-        shutil.copy(os.path.join(rsrc_folder, 'StoneBase.swift'),
-                    self.target_folder_path)
+        for filename in ('StoneValidators.swift', 'StoneSerializers.swift',
+                         'StoneBase.swift'):
+            self.copy_to_relative_path(os.path.join(rsrc_folder, filename), filename)
 
         jazzy_cfg_path = os.path.join(rsrc_folder, 'jazzy.json')
         with open(jazzy_cfg_path) as jazzy_file:
             jazzy_cfg = json.load(jazzy_file)
 
+        def render(namespace):
+            with self.output_to_relative_path(
+                    '{}.swift'.format(fmt_class(namespace.name))):
+                self._generate_base_namespace_module(api, namespace)
+
+        self.render_in_parallel(render, list(api.namespaces.values()))
+
         for namespace in api.namespaces.values():
             ns_class = fmt_class(namespace.name)
-            with self.output_to_relative_path('{}.swift'.format(ns_class)):
-                self._generate_base_namespace_module(api, namespace)
             jazzy_cfg['custom_categories'][1]['children'].append(ns_class)
 
             if namespace.routes:
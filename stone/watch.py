@@ -0,0 +1,185 @@
+"""
+Support for keeping Stone running and rebuilding as specs change.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import errno
+import logging
+import os
+import select
+import socket
+import sys
+import time
+import typing  # noqa: F401 # pylint: disable=unused-import
+
+import six
+
+class _Tee(object):
+    """File-like object that writes to a stream and also keeps a copy."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.copy = six.StringIO()
+
+    def write(self, s):
+        self.stream.write(s)
+        self.copy.write(s)
+
+    def flush(self):
+        self.stream.flush()
+
+class SpecWatcher(object):
+    """
+    Polls spec files for changes and calls a build function whenever one of
+    them is modified.
+
+    Optionally, it listens on a UNIX socket for commands, one per connection
+    and terminated by a newline:
+
+        build    Rebuilds if a spec has changed since the last build.
+        rebuild  Rebuilds unconditionally.
+        status   Reports the result of the last build.
+        stop     Stops watching.
+
+    The first line of every response is "ok" or "error", depending on the
+    result of the last build. Anything that build printed to stderr follows.
+    """
+
+    def __init__(
+            self,
+            spec_paths,        # type: typing.List[typing.Text]
+            build,             # type: typing.Callable[[], bool]
+            interval=1.0,      # type: float
+            socket_path=None,  # type: typing.Optional[typing.Text]
+    ):
+        # type: (...) -> None
+        """
+        Args:
+            spec_paths (List[str]): Paths of the spec files to watch.
+            build (Callable[[], bool]): Called to build. Returns whether the
+                build succeeded.
+            interval (float): Seconds between polls of the spec files.
+            socket_path (Optional[str]): Path of a UNIX socket to listen on
+                for commands.
+        """
+        self.spec_paths = spec_paths
+        self.build = build
+        self.interval = interval
+        self.socket_path = socket_path
+        self.last_build_ok = None  # type: typing.Optional[bool]
+        self.last_build_output = ''
+        self._logger = logging.getLogger('stone.watch')
+        self._snapshot = None  # type: typing.Optional[typing.Dict[typing.Text, typing.Any]]
+        self._running = False
+
+    def _take_snapshot(self):
+        # type: () -> typing.Dict[typing.Text, typing.Any]
+        snapshot = {}  # type: typing.Dict[typing.Text, typing.Any]
+        for path in self.spec_paths:
+            try:
+                st = os.stat(path)
+                snapshot[path] = (st.st_mtime, st.st_size)
+            except OSError:
+                snapshot[path] = None
+        return snapshot
+
+    def rebuild(self, force=False):
+        # type: (bool) -> bool
+        """
+        Builds if a spec changed since the last build, or if force is set.
+        Returns whether the last build succeeded.
+        """
+        snapshot = self._take_snapshot()
+        if force or snapshot != self._snapshot:
+            # Take the snapshot before building so that edits made while
+            # building trigger another build.
+            self._snapshot = snapshot
+            self._logger.info('Building...')
+            tee = _Tee(sys.stderr)
+            sys.stderr = tee
+            try:
+                self.last_build_ok = bool(self.build())
+            finally:
+                sys.stderr = tee.stream
+            self.last_build_output = tee.copy.getvalue()
+            self._logger.info('Build %s.',
+                              'succeeded' if self.last_build_ok else 'failed')
+        return bool(self.last_build_ok)
+
+    def handle_command(self, command):
+        # type: (typing.Text) -> typing.Text
+        """Runs a command received over the socket and returns the response."""
+        if command in ('build', 'rebuild', 'status'):
+            if command != 'status':
+                self.rebuild(force=command == 'rebuild')
+            if self.last_build_ok is None:
+                return 'error\nNo build has run yet.\n'
+            status = 'ok' if self.last_build_ok else 'error'
+            return '%s\n%s' % (status, self.last_build_output)
+        elif command == 'stop':
+            self.stop()
+            return 'ok\n'
+        else:
+            return 'error\nUnknown command: %s\n' % command
+
+    def stop(self):
+        # type: () -> None
+        """Makes serve_forever() return after its current iteration."""
+        self._running = False
+
+    def serve_forever(self):
+        # type: () -> None
+        """Builds, and then rebuilds on changes until stopped."""
+        server = self._listen() if self.socket_path else None
+        self._running = True
+        try:
+            self.rebuild(force=True)
+            while self._running:
+                if server:
+                    readable, _, _ = select.select([server], [], [], self.interval)
+                    if readable:
+                        self._handle_connection(server)
+                else:
+                    time.sleep(self.interval)
+                if self._running:
+                    self.rebuild()
+        finally:
+            if server:
+                server.close()
+                os.remove(self.socket_path)
+
+    def _listen(self):
+        # type: () -> socket.socket
+        if not hasattr(socket, 'AF_UNIX'):
+            raise RuntimeError('UNIX sockets are not supported on this platform.')
+        # Remove a socket file left behind by a previous run.
+        try:
+            os.remove(self.socket_path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(5)
+        self._logger.info('Listening on %s', self.socket_path)
+        return server
+
+    def _handle_connection(self, server):
+        # type: (socket.socket) -> None
+        conn, _ = server.accept()
+        try:
+            conn.settimeout(5)
+            data = b''
+            while not data.endswith(b'\n'):
+                chunk = conn.recv(1024)
+                if not chunk:
+                    break
+                data += chunk
+            command = data.decode('utf-8').strip()
+            self._logger.info('Received command: %s', command)
+            conn.sendall(self.handle_command(command).encode('utf-8'))
+        except (socket.error, UnicodeDecodeError) as e:
+            self._logger.warning('Failed to handle command: %s', e)
+        finally:
+            conn.close()
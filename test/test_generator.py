@@ -2,6 +2,11 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import os
+import shutil
+import tempfile
+import textwrap
+import types
 import unittest
 
 # Hack to get around some of Python 2's standard library modules that
@@ -24,7 +29,11 @@ from stone.data_type import (
     Struct,
     StructField,
 )
+from stone.build_manifest import IncrementalBuild
+from stone.compiler import BuildTarget, Compiler, GeneratorException
+from stone.fingerprint import fingerprint_namespaces
 from stone.generator import CodeGenerator
+from stone.lang.tower import TowerOfStone
 
 class _Tester(CodeGenerator):
     """A no-op generator used to test helper methods."""
@@ -37,6 +46,91 @@ class _TesterCmdline(CodeGenerator):
     def generate(self, api):
         pass
 
+class _TesterIncremental(CodeGenerator):
+    """Writes one file per namespace and remembers which it generated."""
+    supports_incremental_build = True
+    generated = []  # type: typing.List[typing.Text]
+    def generate(self, api):
+        for namespace in api.namespaces.values():
+            if self.is_namespace_output_current(namespace):
+                continue
+            self.generated.append(namespace.name)
+            with self.output_for_namespace(namespace), \
+                    self.output_to_relative_path(namespace.name + '.txt'):
+                self.emit(namespace.name)
+
+class _TesterMutating(CodeGenerator):
+    """Removes every namespace from the API it's given."""
+    def generate(self, api):
+        api.namespaces.clear()
+
+class _TesterAliases(CodeGenerator):
+    """Writes the names of the namespaces and aliases it sees."""
+    preserve_aliases = True
+    def generate(self, api):
+        with self.output_to_relative_path('names.txt'):
+            for namespace in api.namespaces.values():
+                self.emit(namespace.name)
+                for alias in namespace.aliases:
+                    self.emit(alias.name)
+
+class _TesterFirst(CodeGenerator):
+    """Writes the names of the namespaces."""
+    def generate(self, api):
+        with self.output_to_relative_path('first.txt'):
+            for namespace in api.namespaces.values():
+                self.emit(namespace.name)
+
+class _TesterSecond(CodeGenerator):
+    """Copies the output of _TesterFirst, which must run before it."""
+    run_after = ('_TesterFirst',)
+    def generate(self, api):
+        with open(os.path.join(self.target_folder_path, 'first.txt')) as f:
+            names = f.read()
+        with self.output_to_relative_path('second.txt'):
+            self.emit_raw(names)
+
+class _TesterFailing(CodeGenerator):
+    """Raises an exception."""
+    def generate(self, api):
+        raise ValueError('generator failed')
+
+class _TesterExiting(CodeGenerator):
+    """Exits the process it runs in."""
+    def generate(self, api):
+        os._exit(3)  # pylint: disable=protected-access
+
+class _TesterParallel(CodeGenerator):
+    """Renders a file per namespace with render_in_parallel()."""
+    supports_incremental_build = True
+    def generate(self, api):
+        def render(namespace):
+            with self.output_for_namespace(namespace), \
+                    self.output_to_relative_path(namespace.name + '.txt'):
+                with self.indent():
+                    self.emit(namespace.name)
+            return os.getpid()
+        self.emit('unaffected')
+        self.pids = self.render_in_parallel(render, list(api.namespaces.values()))
+        assert self.output == ['unaffected\n'], self.output
+
+class _TesterNested(CodeGenerator):
+    """Writes a file per namespace in a folder of its own."""
+    def generate(self, api):
+        for namespace in api.namespaces.values():
+            with self.output_to_relative_path(
+                    os.path.join(namespace.name, 'types.txt')):
+                self.emit(namespace.name)
+
+class _TesterStreaming(CodeGenerator):
+    """Streams a large file with non-ASCII text."""
+    stream_output = True
+    def generate(self, api):
+        with self.output_to_relative_path('large.txt'):
+            for i in range(10000):
+                with self.indent():
+                    self.emit('line %d \u00e9\u4e2d' % i)
+
 class TestGenerator(unittest.TestCase):
     """
     Tests the interface exposed to Generators.
@@ -224,6 +318,192 @@ int sq(int x) <
         t = _TesterCmdline(None, ['-v'])
         self.assertTrue(t.args.verbose)
 
+    def test_incremental_build(self):
+        ns1 = textwrap.dedent("""\
+            namespace ns1
+            struct S1
+                f1 String
+            """)
+        ns2 = textwrap.dedent("""\
+            namespace ns2
+            import ns1
+            struct S2
+                f2 ns1.S1
+            """)
+        ns3 = textwrap.dedent("""\
+            namespace ns3
+            struct S3
+                f3 String
+            """)
+        generator_module = types.ModuleType(str('incremental'))
+        generator_module._TesterIncremental = _TesterIncremental  # type: ignore
+        build_path = tempfile.mkdtemp()
+
+        def build(*specs):
+            del _TesterIncremental.generated[:]
+            api = TowerOfStone(list(specs)).parse()
+            Compiler(api, generator_module, [], build_path).build()
+            return sorted(_TesterIncremental.generated)
+
+        try:
+            specs = [('ns1.stone', ns1), ('ns2.stone', ns2), ('ns3.stone', ns3)]
+            self.assertEqual(build(*specs), ['ns1', 'ns2', 'ns3'])
+            self.assertEqual(build(*specs), [])
+
+            # A change to a namespace also regenerates namespaces importing it.
+            ns1_changed = ns1 + '    f2 Int64\n'
+            self.assertEqual(
+                build(('ns1.stone', ns1_changed), specs[1], specs[2]),
+                ['ns1', 'ns2'])
+
+            # Missing outputs are regenerated.
+            os.remove(os.path.join(build_path, 'ns3.txt'))
+            self.assertEqual(
+                build(('ns1.stone', ns1_changed), specs[1], specs[2]), ['ns3'])
+        finally:
+            shutil.rmtree(build_path)
+
+    def test_build_targets(self):
+        spec = textwrap.dedent("""\
+            namespace ns
+            alias A = String
+            struct S
+                f A
+            """)
+        mutating_module = types.ModuleType(str('mutating'))
+        mutating_module._TesterMutating = _TesterMutating  # type: ignore
+        aliases_module = types.ModuleType(str('aliases'))
+        aliases_module._TesterAliases = _TesterAliases  # type: ignore
+        build_path = tempfile.mkdtemp()
+        try:
+            api = TowerOfStone([('ns.stone', spec)]).parse()
+            Compiler(api, targets=[
+                BuildTarget(mutating_module, [], os.path.join(build_path, 'a')),
+                BuildTarget(aliases_module, [], os.path.join(build_path, 'b')),
+            ]).build()
+            # Neither the API passed in nor the second generator's copy
+            # reflects the mutation of the first generator.
+            self.assertEqual(list(api.namespaces), ['ns'])
+            with open(os.path.join(build_path, 'b', 'names.txt')) as f:
+                self.assertEqual(f.read(), 'ns\nA\n')
+        finally:
+            shutil.rmtree(build_path)
+
+    def test_parallel_generators(self):
+        api = TowerOfStone([('ns.stone', 'namespace ns\n')]).parse()
+        generator_module = types.ModuleType(str('parallel'))
+        # Listed in reverse so that only run_after makes _TesterFirst run first.
+        generator_module.B = _TesterFirst  # type: ignore
+        generator_module.A = _TesterSecond  # type: ignore
+        build_path = tempfile.mkdtemp()
+        try:
+            Compiler(api, generator_module, [], build_path, jobs=2).build()
+            with open(os.path.join(build_path, 'second.txt')) as f:
+                self.assertEqual(f.read(), 'ns\n')
+
+            # The traceback of a generator running in a worker is reported.
+            generator_module.C = _TesterFailing  # type: ignore
+            with self.assertRaises(GeneratorException) as cm:
+                Compiler(api, generator_module, [], build_path, jobs=2).build()
+            self.assertEqual(cm.exception.generator_name, '_TesterFailing')
+            self.assertIn('ValueError: generator failed', cm.exception.traceback)
+
+            # A worker that dies fails the build rather than leaving it waiting.
+            del generator_module.C
+            generator_module.D = _TesterExiting  # type: ignore
+            with self.assertRaises(GeneratorException) as cm:
+                Compiler(api, generator_module, [], build_path, jobs=2).build()
+            self.assertIn('_TesterExiting', cm.exception.generator_name)
+            self.assertIn('exited with code 3', cm.exception.traceback)
+        finally:
+            shutil.rmtree(build_path)
+
+    def test_generator_order(self):
+        self.assertEqual(
+            Compiler._order_jobs(
+                [(None, _TesterSecond), (None, _TesterFirst)],
+                [{1}, set()]),
+            [1, 0])
+        with self.assertRaises(GeneratorException):
+            Compiler._order_jobs(
+                [(None, _TesterSecond), (None, _TesterFirst)],
+                [{1}, {0}])
+
+    def test_render_in_parallel(self):
+        specs = [('ns%d.stone' % i, 'namespace ns%d\n' % i) for i in range(3)]
+        api = TowerOfStone(specs).parse()
+        build_path = tempfile.mkdtemp()
+        try:
+            for jobs in (1, 2):
+                generator = _TesterParallel(build_path, [])
+                generator.jobs = jobs
+                generator.incremental_build = IncrementalBuild(
+                    build_path, fingerprint_namespaces(api), {})
+                generator.generate(api)
+                self.assertEqual(os.getpid() in generator.pids, jobs == 1)
+                for i in range(3):
+                    with open(os.path.join(build_path, 'ns%d.txt' % i)) as f:
+                        self.assertEqual(f.read(), '    ns%d\n' % i)
+                # Files written in workers are recorded for incremental builds.
+                self.assertEqual(
+                    sorted(generator.incremental_build.namespace_outputs),
+                    ['ns0', 'ns1', 'ns2'])
+                self.assertEqual(
+                    generator.incremental_build.namespace_outputs['ns2']['files'],
+                    ['ns2.txt'])
+        finally:
+            shutil.rmtree(build_path)
+
+    def test_output_files(self):
+        generator_module = types.ModuleType(str('nested'))
+        generator_module._TesterNested = _TesterNested  # type: ignore
+        build_path = tempfile.mkdtemp()
+        ns1_path = os.path.join(build_path, 'ns1', 'types.txt')
+        ns2_path = os.path.join(build_path, 'ns2', 'types.txt')
+
+        def build(*namespaces):
+            api = TowerOfStone([('%s.stone' % name, 'namespace %s\n' % name)
+                                for name in namespaces]).parse()
+            Compiler(api, generator_module, [], build_path).build()
+
+        try:
+            build('ns1', 'ns2')
+            # Files whose contents are unchanged aren't written again.
+            os.utime(ns1_path, (0, 0))
+            build('ns1', 'ns2')
+            self.assertEqual(os.path.getmtime(ns1_path), 0)
+
+            # Files that are no longer generated are removed, along with
+            # folders left empty. Other files are left alone.
+            other_path = os.path.join(build_path, 'other.txt')
+            with open(other_path, 'w') as f:
+                f.write('other')
+            build('ns1')
+            self.assertTrue(os.path.exists(ns1_path))
+            self.assertFalse(os.path.exists(os.path.dirname(ns2_path)))
+            self.assertTrue(os.path.exists(other_path))
+        finally:
+            shutil.rmtree(build_path)
+
+    def test_streaming_output(self):
+        build_path = tempfile.mkdtemp()
+        path = os.path.join(build_path, 'large.txt')
+        expected = ''.join('    line %d \u00e9\u4e2d\n' % i for i in range(10000))
+        try:
+            generator = _TesterStreaming(build_path, [])
+            generator.generate(None)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read().decode('utf-8'), expected)
+            self.assertEqual(generator.output, [])
+
+            # An unchanged file isn't replaced, and no temporary file remains.
+            os.utime(path, (0, 0))
+            _TesterStreaming(build_path, []).generate(None)
+            self.assertEqual(os.path.getmtime(path), 0)
+            self.assertEqual(os.listdir(build_path), ['large.txt'])
+        finally:
+            shutil.rmtree(build_path)
+
 
 if __name__ == '__main__':
     unittest.main()
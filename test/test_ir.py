@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+import shutil
+import tempfile
+import textwrap
+import unittest
+
+from stone.compiler import Compiler
+from stone.fingerprint import fingerprint_data_type, fingerprint_namespaces
+from stone.ir import InvalidIR, read_ir, write_ir
+from stone.lang.tower import TowerOfStone
+from stone.target import python_types
+
+
+class TestIR(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _parse(self):
+        text1 = textwrap.dedent("""\
+            namespace ns1
+                "Doc for ns1."
+            alias Name = String(min_length=1, pattern="[a-z]+")
+            struct S1
+                "A struct."
+                f1 Name
+                f2 List(Int64, min_items=1)?
+                f3 Boolean = false
+                example default
+                    f1 = "abc"
+                    f2 = [1, 2]
+                    f3 = true
+            union U1
+                a
+                b S1
+            """)
+        text2 = textwrap.dedent("""\
+            namespace ns2
+            import ns1
+            struct S2 extends ns1.S1
+                g ns1.U1 = a
+            route r(S2, ns1.U1, Void) deprecated
+                "A route."
+            """)
+        return TowerOfStone([('ns1.stone', text1), ('ns2.stone', text2)]).parse()
+
+    def _generate(self, api, output):
+        Compiler(api, python_types, [], output).build()
+        contents = {}
+        for name in sorted(os.listdir(output)):
+            with open(os.path.join(output, name), 'rb') as f:
+                contents[name] = f.read()
+        return contents
+
+    def test_round_trip(self):
+        api = self._parse()
+        ir_path = os.path.join(self.tmp_dir, 'api.stoneir')
+        write_ir(api, ir_path)
+        loaded = read_ir(ir_path)
+
+        self.assertEqual(list(loaded.namespaces), ['ns1', 'ns2'])
+        self.assertEqual(fingerprint_namespaces(loaded), fingerprint_namespaces(api))
+        self.assertEqual(fingerprint_data_type(loaded.route_schema),
+                         fingerprint_data_type(api.route_schema))
+        s2 = loaded.namespaces['ns2'].data_type_by_name['S2']
+        self.assertIs(s2.parent_type, loaded.namespaces['ns1'].data_type_by_name['S1'])
+        self.assertEqual(s2.parent_type.get_examples()['default'].value,
+                         {'f1': 'abc', 'f2': [1, 2], 'f3': True})
+
+        self.assertEqual(
+            self._generate(loaded, os.path.join(self.tmp_dir, 'from_ir')),
+            self._generate(self._parse(), os.path.join(self.tmp_dir, 'from_spec')))
+
+    def test_invalid(self):
+        path = os.path.join(self.tmp_dir, 'bad.stoneir')
+        with open(path, 'wb') as f:
+            f.write(b'namespace test\n')
+        with self.assertRaises(InvalidIR):
+            read_ir(path)
+
+        write_ir(self._parse(), path)
+        with open(path, 'rb') as f:
+            magic = f.readline()
+            f.readline()
+            payload = f.read()
+        with open(path, 'wb') as f:
+            f.write(magic + b'{"format": 0}\n' + payload)
+        with self.assertRaises(InvalidIR) as cm:
+            read_ir(path)
+        self.assertIn('regenerate it', cm.exception.msg)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import json
+import os
+import shutil
+import tempfile
+import types
+import unittest
+
+from stone.compiler import Compiler
+from stone.generator import CodeGenerator
+from stone.lang.tower import TowerOfStone
+from stone.profiling import Profiler
+
+
+class _TesterProfiled(CodeGenerator):
+    """Writes a file per namespace."""
+    def generate(self, api):
+        for namespace in api.namespaces.values():
+            with self.output_to_relative_path(namespace.name + '.txt'):
+                self.emit(namespace.name)
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_build(self):
+        specs = [('ns%d.stone' % i, 'namespace ns%d\n' % i) for i in range(2)]
+        generator_module = types.ModuleType(str('profiled'))
+        generator_module._TesterProfiled = _TesterProfiled  # type: ignore
+        cprofile_dir = os.path.join(self.tmp_dir, 'cprofile')
+        build_path = os.path.join(self.tmp_dir, 'build')
+
+        for jobs in (1, 2):
+            profiler = Profiler(cprofile_dir)
+            api = TowerOfStone(specs, jobs=jobs, profiler=profiler).parse()
+            Compiler(api, generator_module, [], build_path, jobs=jobs,
+                     profiler=profiler).build()
+
+            names = [(r['category'], r['name']) for r in profiler.records]
+            self.assertIn(('spec', 'ns0.stone'), names)
+            self.assertIn(('spec', 'ns1.stone'), names)
+            self.assertIn(('phase', '_populate_examples'), names)
+            self.assertIn(('phase', '_validate_doc_refs'), names)
+            self.assertIn(('generator', '_TesterProfiled'), names)
+            self.assertIn(('output_file', 'ns1.txt'), names)
+            for record in profiler.records:
+                self.assertGreaterEqual(record['wall_time'], 0)
+                self.assertGreaterEqual(record['cpu_time'], 0)
+            self.assertEqual(os.listdir(cprofile_dir),
+                             ['generator-_TesterProfiled.prof'])
+
+        report_path = os.path.join(self.tmp_dir, 'report.json')
+        profiler.write(report_path)
+        with open(report_path) as f:
+            report = json.load(f)
+        self.assertEqual(report['records'], profiler.records)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,11 +9,13 @@ import shutil
 import six
 import subprocess
 import sys
+import typing  # noqa: F401 # pylint: disable=unused-import
 import unittest
 
 import stone.target.python_rsrc.stone_validators as bv
 
 from stone.target.python_rsrc.stone_serializers import (
+    StoneToPythonPrimitiveSerializer,
     json_encode,
     json_decode,
     _strftime as stone_strftime,
@@ -346,6 +348,27 @@ class TestDropInModules(unittest.TestCase):
                 self.assertEqual(prefix, str(e)[:len(prefix)])
                 raise
 
+    def test_json_encoder_list_error_messages(self):
+        # pylint: disable=attribute-defined-outside-init
+        class S(object):
+            _all_field_names_ = {'f'}
+            _all_fields_ = [('f', bv.List(bv.UInt64(max_value=10)))]
+
+        s = S()
+        s.f = [11]
+        s._f_present = True
+        list_validator = bv.List(bv.Struct(S))
+
+        # Test that an invalid item is reported before an error encoding an
+        # earlier one, as the list is validated before it's encoded
+        for alias_validators in (None, {bv.String(): lambda _: None}):
+            with self.assertRaises(bv.ValidationError) as cm:
+                json_encode(list_validator, [s], alias_validators=alias_validators)
+            self.assertEqual(str(cm.exception), 'f: 11 is not within range [0, 10]')
+            with self.assertRaises(bv.ValidationError) as cm:
+                json_encode(list_validator, [s, 'a'], alias_validators=alias_validators)
+            self.assertEqual(str(cm.exception), 'expected type S, got string')
+
     def test_json_decoder(self):
         self.assertEqual(json_decode(bv.String(), json.dumps('abc')), 'abc')
         self.assertRaises(bv.ValidationError,
@@ -373,6 +396,8 @@ class TestDropInModules(unittest.TestCase):
                          b)
         self.assertRaises(bv.ValidationError,
                           lambda: json_decode(bv.Bytes(), json.dumps(1)))
+        self.assertRaises(bv.ValidationError,
+                          lambda: json_decode(bv.Bytes(), json.dumps('A')))
         self.assertEqual(json_decode(bv.Nullable(bv.String()), json.dumps(None)), None)
         self.assertEqual(json_decode(bv.Nullable(bv.String()), json.dumps('abc')), 'abc')
 
@@ -515,6 +540,70 @@ class TestDropInModules(unittest.TestCase):
         self.assertEqual(type(u._value), S)
         self.assertEqual(u._value.f, 'hello')
 
+    def test_plans(self):
+        class Node(object):
+            _all_field_names_ = {'name', 'children'}
+            _has_required_fields = True
+            _name_present = False
+            _children_present = False
+            children = None
+
+            def __init__(self, name=None, children=None):
+                if name is not None:
+                    self.name = name
+                self.children = children
+
+            def __setattr__(self, name, value):
+                object.__setattr__(self, name, value)
+                if name in self._all_field_names_:
+                    object.__setattr__(self, '_%s_present' % name, value is not None)
+
+        node_validator = bv.Struct(Node)
+        Node._all_fields_ = [
+            ('name', bv.String()),
+            ('children', bv.Nullable(bv.List(node_validator))),
+        ]
+
+        tree = Node('a', [Node('b'), Node('c', [Node('d')])])
+        unplanned = json.dumps(StoneToPythonPrimitiveSerializer().encode(node_validator, tree))
+        self.assertEqual(json_encode(node_validator, tree), unplanned)
+        # The plans compiled for a validator are reused by later calls.
+        self.assertIn('_plans', node_validator.__dict__)
+        plans = dict(node_validator.__dict__['_plans'])
+        self.assertEqual(json_encode(node_validator, tree), unplanned)
+        self.assertEqual(node_validator.__dict__['_plans'], plans)
+
+        # Plans report the same errors as the other paths.
+        bad = Node('a', [Node('b', [object()])])
+        with self.assertRaises(bv.ValidationError) as planned_error:
+            json_encode(node_validator, bad)
+        with self.assertRaises(bv.ValidationError) as unplanned_error:
+            StoneToPythonPrimitiveSerializer().encode(node_validator, bad)
+        self.assertEqual(str(planned_error.exception), str(unplanned_error.exception))
+
+        # Alias validators are not compiled into plans.
+        alias_validators = {bv.String(): lambda _: None}
+        decoded = json_decode(node_validator, unplanned)
+        self.assertEqual(json_encode(node_validator, decoded), unplanned)
+        self.assertEqual(
+            json_encode(node_validator,
+                        json_decode(node_validator, unplanned,
+                                    alias_validators=alias_validators)),
+            unplanned)
+        for invalid in ({'name': 'a', 'children': [{}]},
+                        {'name': 'a', 'children': {}},
+                        {'name': 'a', 'children': [{'name': 'b', 'x': 1}]}):
+            with self.assertRaises(bv.ValidationError) as planned_error:
+                json_decode(node_validator, json.dumps(invalid))
+            with self.assertRaises(bv.ValidationError) as unplanned_error:
+                json_decode(node_validator, json.dumps(invalid),
+                            alias_validators=alias_validators)
+            self.assertEqual(str(planned_error.exception), str(unplanned_error.exception))
+        with self.assertRaises(bv.ValidationError) as planned_error:
+            json_decode(node_validator, json.dumps({'name': 'a', 'children': [{}]}))
+        self.assertEqual(str(planned_error.exception),
+                         "children: missing required field 'name'")
+
     def test_json_decoder_error_messages(self):
         class S3(object):
             _all_field_names_ = {'j'}
@@ -700,6 +789,9 @@ alias AliasedBaseU = BaseU
 
 class TestGeneratedPython(unittest.TestCase):
 
+    # Arguments passed to the python_types generator.
+    generator_args = []  # type: typing.List[typing.Text]
+
     def setUp(self):
 
         # Sanity check: stone must be importable for the compiler to work
@@ -712,7 +804,8 @@ class TestGeneratedPython(unittest.TestCase):
              'stone.cli',
              'python_types',
              'output',
-             '-'],
+             '-',
+             '--'] + self.generator_args,
             stdin=subprocess.PIPE,
             stderr=subprocess.PIPE)
         _, stderr = p.communicate(
@@ -1144,6 +1237,64 @@ class TestGeneratedPython(unittest.TestCase):
             self.compat_obj_encode(self.sv.Union(self.ns.V), v_t9),
             {'.tag': 't9', 't9': ['a', 'b']})
 
+    def test_json_encode_to_stream(self):
+        ns = self.ns
+        values = [
+            (ns.A_validator, ns.A(a='a\u2650"', b=1)),
+            (ns.C_validator, ns.C(a='a', b=True, c=b'\x00', d=1)),
+            (ns.D_validator, ns.D(a='a', c='c', d=[1, None])),
+            (ns.E_validator, ns.E()),
+            (ns.S2_validator, ns.S2(f1=ns.OptionalS())),
+            (ns.Resource_validator, ns.File(name='f', size=1)),
+            (ns.Resource_validator, ns.Folder(name='f')),
+            (ns.UOpen_validator, ns.UOpen.other),
+            (ns.U2_validator, ns.U2.b(ns.OptionalS(f2=4))),
+            (self.sv.List(ns.Resource_validator), [ns.File(name='f', size=1)] * 3),
+            (self.sv.List(self.sv.List(self.sv.String())), [['a', 'b'], [], ['c']]),
+            (self.sv.Nullable(self.sv.List(ns.A_validator)), None),
+        ]
+        values.extend((ns.V_validator, v) for v in [
+            ns.V.t0, ns.V.t1('a'), ns.V.t2(None), ns.V.t3(ns.S(f='f')),
+            ns.V.t4(ns.S(f='f')), ns.V.t5(ns.U.t1('a')), ns.V.t6(None),
+            ns.V.t7(ns.File(name='f', size=1)), ns.V.t9(['a']),
+            ns.V.t10([ns.U.t0, ns.U.t1('a')]),
+        ])
+        for validator, value in values:
+            for old_style in (False, True):
+                fp = six.StringIO()
+                self.ss.json_encode_to_stream(validator, value, fp, old_style=old_style)
+                self.assertEqual(fp.getvalue(),
+                                 self.encode(validator, value, old_style=old_style))
+            self.assertEqual(''.join(self.ss.iter_json_encode(validator, value)),
+                             self.encode(validator, value))
+        # Values that can hold lists are encoded in several chunks, the others
+        # are encoded whole, or by batches in lists.
+        self.assertEqual(
+            list(self.ss.iter_json_encode(self.sv.List(ns.A_validator), [ns.A(a='a', b=1)] * 2)),
+            ['[', '{"a": "a", "b": 1}, {"a": "a", "b": 1}', ']'])
+        self.assertEqual(
+            list(self.ss.iter_json_encode(ns.V_validator, ns.V.t9(['a']))),
+            ['{".tag": "t9", "t9": ', '[', '"a"', ']', '}'])
+
+        # Errors are the same, but are raised as the value is iterated.
+        invalid_values = [
+            (ns.A_validator, ns.A(a='a')),
+            (ns.D_validator, ns.D(a='a', d=[1])),
+            (ns.V_validator, ns.V.t3(ns.S())),
+            (ns.V_validator, ns.V.t9(['a'])),
+            (self.sv.List(ns.V_validator), [ns.V.t9(['a']), ns.V.t0, 'a']),
+        ]
+        invalid_values[1][1].d.append('a')
+        invalid_values[3][1]._value.append(1)
+        for validator, value in invalid_values:
+            with self.assertRaises(self.sv.ValidationError) as cm:
+                self.encode(validator, value)
+            chunks = self.ss.iter_json_encode(validator, value)
+            with self.assertRaises(self.sv.ValidationError) as stream_cm:
+                for _ in chunks:
+                    pass
+            self.assertEqual(str(stream_cm.exception), str(cm.exception))
+
     def test_list_coding(self):
         # Test decoding list of composites
         v = self.decode(
@@ -1263,6 +1414,11 @@ class TestGeneratedPython(unittest.TestCase):
     def tearDown(self):
         # Clear output of stone tool after all tests.
         shutil.rmtree('output')
+        # Forget the generated modules, which other fixtures generate
+        # differently.
+        sys.path.remove('output')
+        for name in ('ns', 'ns2'):
+            sys.modules.pop(name, None)
 
     def test_msgpack(self):
         # Do a limited amount of testing just to make sure that unicode
@@ -1347,6 +1503,182 @@ class TestGeneratedPython(unittest.TestCase):
 # http://code.activestate.com/recipes/306860-proleptic-gregorian-dates-and-strftime-before-1900/
 # Make sure that the day names are in order from 0001/01/01 until
 # 2000/08/01
+class TestGeneratedPythonSpecialized(TestGeneratedPython):
+    """
+    Runs the tests of the generated Python against the output with specialized
+    encoders and decoders.
+    """
+
+    generator_args = ['--specialized-encoders', '--specialized-decoders']
+
+    def test_specialized_encoders(self):
+        generic_serializer = self.ss.StoneToPythonPrimitiveSerializer()
+        ns = self.ns
+
+        values = [
+            (ns.A_validator, ns.A(a='a', b=1)),
+            (ns.C_validator, ns.C(a='a', b=True, c=b'\x00', d=1)),
+            (ns.D_validator, ns.D(a='a', c='c', d=[1, None])),
+            (ns.D_validator, ns.D(a='a', b=3, d=[])),
+            (ns.E_validator, ns.E()),
+            (ns.E_validator, ns.E(a='b', b=1, c=-1)),
+            (ns.ContainsAlias_validator, ns.ContainsAlias(s='abc')),
+            (ns.ImportTestS_validator, ns.ImportTestS(a='a', z=1)),
+            (ns.S2_validator, ns.S2(f1=ns.OptionalS())),
+            (ns.S3_validator, ns.S3()),
+            (ns.S3_validator, ns.S3(u=self.ns2.BaseU.x('x'))),
+            (ns.Resource_validator, ns.File(name='f', size=1)),
+            (ns.Resource_validator, ns.Folder(name='f')),
+            (ns.U_validator, ns.U.t0),
+            (ns.UOpen_validator, ns.U.t1('a')),
+            (ns.UOpen_validator, ns.UOpen.t3),
+            (ns.UOpen_validator, ns.UOpen.other),
+            (ns.ImportTestU_validator, ns.ImportTestU.a(1)),
+            (ns.U2_validator, ns.U2.b(ns.OptionalS(f2=4))),
+        ]
+        values.extend((ns.V_validator, v) for v in [
+            ns.V.t0, ns.V.t1('a'), ns.V.t2(None), ns.V.t2('a'),
+            ns.V.t3(ns.S(f='f')), ns.V.t4(None), ns.V.t4(ns.S(f='f')),
+            ns.V.t5(ns.U.t1('a')), ns.V.t6(None), ns.V.t6(ns.U.t2),
+            ns.V.t7(ns.File(name='f', size=1)), ns.V.t8(None),
+            ns.V.t9(['a']), ns.V.t10([ns.U.t0, ns.U.t1('a')]),
+        ])
+        for validator, value in values:
+            self.assertIn('_encode_json_compat', validator.definition.__dict__)
+            # The repr also compares the types of dicts and the order of keys.
+            self.assertEqual(repr(self.compat_obj_encode(validator, value)),
+                             repr(generic_serializer.encode(validator, value)))
+            self.assertEqual(self.encode(validator, value),
+                             json.dumps(generic_serializer.encode(validator, value)))
+            self.assertEqual(
+                repr(self.compat_obj_encode(validator, value, old_style=True)),
+                repr(self.ss.StoneToPythonPrimitiveSerializer(old_style=True).encode(
+                    validator, value)))
+
+        # Errors are the same too.
+        invalid_values = [
+            (ns.A_validator, ns.A(a='a')),
+            (ns.D_validator, ns.D(a='a', d=[1])),
+            (ns.V_validator, ns.V.t3(ns.S())),
+            (ns.V_validator, ns.V.t9(['a'])),
+            (ns.V_validator, ns.V('t0')),
+        ]
+        invalid_values[1][1].d.append('a')
+        invalid_values[3][1]._value.append(1)
+        invalid_values[4][1]._tag = None
+        for validator, value in invalid_values:
+            with self.assertRaises(self.sv.ValidationError) as cm:
+                generic_serializer.encode(validator, value)
+            with self.assertRaises(self.sv.ValidationError) as specialized_cm:
+                self.compat_obj_encode(validator, value)
+            self.assertEqual(str(specialized_cm.exception), str(cm.exception))
+
+    def test_specialized_decoders(self):
+        ns = self.ns
+        # Alias validators keep the generic decoder from using the specialized
+        # ones; this one never matches.
+        generic_alias_validators = {self.sv.String(): lambda _: None}
+
+        def generic_decode(validator, obj, **kwargs):
+            return self.compat_obj_decode(
+                validator, obj, alias_validators=generic_alias_validators, **kwargs)
+
+        objs = [
+            (ns.A_validator, {'a': 'a', 'b': 1}),
+            (ns.C_validator, {'a': 'a', 'b': True, 'c': 'AA==', 'd': 1}),
+            (ns.D_validator, {'a': 'a', 'c': 'c', 'd': [1, None]}),
+            (ns.D_validator, {'a': 'a', 'b': 3, 'c': None, 'd': []}),
+            (ns.E_validator, {}),
+            (ns.E_validator, None),
+            (ns.E_validator, {'a': 'b', 'b': 1, 'c': -1}),
+            (ns.ContainsAlias_validator, {'s': 'abc'}),
+            (ns.ImportTestS_validator, {'a': 'a', 'z': 1}),
+            (ns.S2_validator, {}),
+            (ns.S2_validator, {'f1': {'f2': 4}}),
+            (ns.S3_validator, {}),
+            (ns.S3_validator, {'u': {'.tag': 'x', 'x': 'x'}}),
+            (ns.Resource_validator, {'.tag': 'file', 'name': 'f', 'size': 1}),
+            (ns.Resource_validator, {'.tag': 'folder', 'name': 'f'}),
+            (ns.U_validator, {'.tag': 't0'}),
+            (ns.U_validator, 't2'),
+            (ns.UOpen_validator, {'.tag': 't1', 't1': 'a'}),
+            (ns.UOpen_validator, {'.tag': 't3', 't3': None}),
+            (ns.ImportTestU_validator, {'.tag': 'a', 'a': 1}),
+            (ns.U2_validator, {'.tag': 'b', 'f2': 4}),
+        ]
+        objs.extend((ns.V_validator, obj) for obj in [
+            {'.tag': 't0'},
+            {'.tag': 't1', 't1': 'a'},
+            {'.tag': 't2'},
+            {'.tag': 't2', 't2': None},
+            {'.tag': 't3', 'f': 'f'},
+            {'.tag': 't4'},
+            {'.tag': 't4', 'f': 'f'},
+            {'.tag': 't5', 't5': {'.tag': 't1', 't1': 'a'}},
+            {'.tag': 't6', 't6': 't2'},
+            {'.tag': 't7', 't7': {'.tag': 'file', 'name': 'f', 'size': 1}},
+            {'.tag': 't8'},
+            {'.tag': 't9', 't9': ['a']},
+            {'.tag': 't10', 't10': ['t0', {'.tag': 't1', 't1': 'a'}]},
+        ])
+        for validator, obj in objs:
+            self.assertIn('_decode_json_compat', validator.definition.__dict__)
+            value = self.compat_obj_decode(validator, obj)
+            generic_value = generic_decode(validator, obj)
+            self.assertEqual(type(value), type(generic_value))
+            self.assertEqual(repr(value), repr(generic_value))
+            self.assertEqual(self.compat_obj_encode(validator, value),
+                             self.compat_obj_encode(validator, generic_value))
+
+        old_style_objs = [
+            (ns.V_validator, 't0'),
+            (ns.V_validator, {'t5': {'t1': 'a'}}),
+            (ns.S3_validator, {'u': {'x': 'x'}}),
+        ]
+        for validator, obj in old_style_objs:
+            self.assertEqual(
+                repr(self.compat_obj_decode(validator, obj, old_style=True)),
+                repr(generic_decode(validator, obj, old_style=True)))
+
+        lax_objs = [
+            (ns.A_validator, {'a': 'a', 'b': 1, 'z': 1}),
+            (ns.UOpen_validator, {'.tag': 'unknown'}),
+        ]
+        for validator, obj in lax_objs:
+            self.assertEqual(repr(self.compat_obj_decode(validator, obj, strict=False)),
+                             repr(generic_decode(validator, obj, strict=False)))
+
+        # Errors are the same too.
+        invalid_objs = [
+            (ns.A_validator, None),
+            (ns.A_validator, {'a': 'a'}),
+            (ns.A_validator, {'a': 'a', 'b': 1, 'z': 1}),
+            (ns.A_validator, {'b': 'b'}),
+            (ns.C_validator, {'a': 'a', 'b': 1, 'c': 'A', 'd': 1}),
+            (ns.D_validator, {'a': 'a', 'd': [1, 'a']}),
+            (ns.ContainsAlias_validator, {'s': 'a' * 11}),
+            (ns.S2_validator, {'f1': {'f2': -1}}),
+            (ns.S3_validator, {'u': {'.tag': 'y'}}),
+            (ns.U_validator, {'t0': None}),
+            (ns.U_validator, {'.tag': 1}),
+            (ns.UOpen_validator, {'.tag': 'other'}),
+            (ns.V_validator, {'.tag': 't0', 't0': 1}),
+            (ns.V_validator, {'.tag': 't0', 't1': None}),
+            (ns.V_validator, {'.tag': 't1'}),
+            (ns.V_validator, {'.tag': 't1', 't1': 1}),
+            (ns.V_validator, {'.tag': 't3'}),
+            (ns.V_validator, {'.tag': 't5', 't5': 'unknown'}),
+            (ns.V_validator, {'.tag': 't7', 't7': {'.tag': 'file', 'name': 'f'}}),
+            (ns.V_validator, {'.tag': 't9', 't9': [1]}),
+        ]
+        for validator, obj in invalid_objs:
+            with self.assertRaises(self.sv.ValidationError) as cm:
+                generic_decode(validator, obj)
+            with self.assertRaises(self.sv.ValidationError) as specialized_cm:
+                self.compat_obj_decode(validator, obj)
+            self.assertEqual(str(specialized_cm.exception), str(cm.exception))
+
+
 class TestCustomStrftime(unittest.TestCase):
     def test_strftime(self):
         s = stone_strftime(datetime.date(1800, 9, 23), '%Y has the same days as 1980 and 2008')
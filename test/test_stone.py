@@ -5,16 +5,25 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 # pylint: disable=deprecated-method,useless-suppression
 
 import datetime
+import shutil
+import tempfile
 import textwrap
 import unittest
 
+import ply.yacc as yacc
+
+from stone.fingerprint import fingerprint_namespaces
+from stone.generator import remove_aliases_from_api
+from stone.lang import parsetab
 from stone.lang.parser import (
+    _Element,
     StoneNamespace,
     StoneAlias,
     StoneParser,
     StoneVoidField,
     StoneTagRef,
 )
+from stone.lang.exception import InvalidSpecs
 from stone.lang.tower import (
     InvalidSpec,
     TowerOfStone,
@@ -24,6 +33,9 @@ from stone.data_type import (
     Alias,
     Nullable,
     String,
+    StructField,
+    UnionField,
+    Void,
 )
 
 
@@ -891,6 +903,79 @@ class TestStone(unittest.TestCase):
             t.parse()
         self.assertIn('struct can only extend another struct', cm.exception.msg)
 
+    def test_field_layouts(self):
+        text = textwrap.dedent("""\
+            namespace test
+
+            struct A
+                a String
+                b UInt64 = 1
+
+            struct B extends A
+                c String?
+                d String
+
+            union U
+                x
+
+            union V extends U
+                y String
+            """)
+        api = TowerOfStone([('test.stone', text)]).parse()
+        ns = api.namespaces['test']
+        a_dt = ns.data_type_by_name['A']
+        b_dt = ns.data_type_by_name['B']
+        u_dt = ns.data_type_by_name['U']
+        v_dt = ns.data_type_by_name['V']
+
+        def names(fields):
+            return [f.name for f in fields]
+
+        self.assertEqual(names(b_dt.all_required_fields), ['a', 'd'])
+        self.assertEqual(names(b_dt.all_optional_fields), ['b', 'c'])
+        self.assertEqual(names(b_dt.all_fields), ['a', 'd', 'b', 'c'])
+        self.assertIs(b_dt.all_fields, b_dt.all_fields)
+        self.assertEqual(names(v_dt.all_fields), ['x', 'other', 'y'])
+        self.assertIs(v_dt._get_field('x'), u_dt.fields[0])
+
+        # Changing the fields of a parent type is seen by its subtypes.
+        a_dt.prepend_field(StructField('z', String(), None, None))
+        self.assertEqual(names(b_dt.all_fields), ['z', 'a', 'd', 'b', 'c'])
+        self.assertIsNotNone(b_dt._get_field('z'))
+        u_dt.prepend_field(UnionField('w', Void(), None, None))
+        self.assertEqual(names(v_dt.all_fields), ['w', 'x', 'other', 'y'])
+        self.assertIsNotNone(v_dt._get_field('w'))
+
+    def test_field_layouts_without_aliases(self):
+        text = textwrap.dedent("""\
+            namespace test
+
+            alias NA = String?
+
+            struct S
+                f NA
+                g String
+
+            struct T extends S
+                h NA
+            """)
+        api = TowerOfStone([('test.stone', text)]).parse()
+        s_dt = api.namespaces['test'].data_type_by_name['S']
+        t_dt = api.namespaces['test'].data_type_by_name['T']
+
+        def names(fields):
+            return [f.name for f in fields]
+
+        # Compute the layouts before the aliases are removed.
+        self.assertEqual(names(t_dt.all_fields), ['f', 'g', 'h'])
+        remove_aliases_from_api(api)
+        # The fields of a nullable alias are optional once it's removed.
+        self.assertEqual(names(s_dt.all_required_fields), ['g'])
+        self.assertEqual(names(s_dt.all_optional_fields), ['f'])
+        self.assertEqual(names(t_dt.all_required_fields), ['g'])
+        self.assertEqual(names(t_dt.all_optional_fields), ['f', 'h'])
+        self.assertEqual(names(t_dt.all_fields), ['g', 'f', 'h'])
+
     def test_union_semantics(self):
         # Test duplicate fields
         text = textwrap.dedent("""\
@@ -1242,6 +1327,207 @@ class TestStone(unittest.TestCase):
             'Reference cannot be nullable.',
             cm.exception.msg)
 
+    def test_shared_data_types(self):
+        text = textwrap.dedent("""\
+            namespace test
+
+            struct S
+                a String(min_length=1)
+                b String(min_length=1)
+                c String(min_length=2)
+                d List(String(min_length=1))?
+                e List(String(min_length=1))?
+                f Float64(min_value=1)
+                g Float64(min_value=1.0)
+            """)
+        t = TowerOfStone([('test.stone', text)])
+        t.parse()
+        s_dt = t.api.namespaces['test'].data_type_by_name['S']
+        types = {f.name: f.data_type for f in s_dt.fields}
+        self.assertIs(types['a'], types['b'])
+        self.assertIsNot(types['a'], types['c'])
+        self.assertIs(types['d'], types['e'])
+        self.assertIs(types['d'].data_type.data_type, types['a'])
+        self.assertIsNot(types['f'], types['g'])
+        self.assertIsInstance(types['g'].min_value, float)
+
+    def test_api_graph(self):
+        ns1_text = textwrap.dedent("""\
+            namespace ns1
+
+            alias Id = String
+
+            struct Entry
+                union
+                    file File
+                    folder Folder
+                id Id
+
+            struct File extends Entry
+                size UInt64
+
+            struct Folder extends Entry
+                entries List(Entry)?
+
+            struct Unused
+                f String
+            """)
+        ns2_text = textwrap.dedent("""\
+            namespace ns2
+
+            import ns1
+
+            union Error
+                bad ns1.Id
+
+            route get(ns1.Folder, Void, Error)
+            route list(Void, List(ns1.File), Void)
+            """)
+        t = TowerOfStone([('ns1.stone', ns1_text), ('ns2.stone', ns2_text)])
+        api = t.parse()
+        graph = api.graph
+        ns1 = api.namespaces['ns1']
+        ns2 = api.namespaces['ns2']
+        id_alias = ns1.alias_by_name['Id']
+        entry = ns1.data_type_by_name['Entry']
+        file_dt = ns1.data_type_by_name['File']
+        folder = ns1.data_type_by_name['Folder']
+        error = ns2.data_type_by_name['Error']
+        get_route = ns2.route_by_name['get']
+
+        self.assertEqual(graph.get_references(entry), (id_alias, file_dt, folder))
+        self.assertEqual(graph.get_references(folder), (entry,))
+        self.assertEqual(graph.get_references(id_alias), ())
+        self.assertEqual(set(graph.get_referencing_data_types(entry)),
+                         {file_dt, folder})
+        self.assertEqual(set(graph.get_referencing_data_types(id_alias)),
+                         {entry, error})
+        self.assertEqual(graph.get_route_references(get_route), (folder, error))
+        self.assertEqual(graph.get_referencing_routes(folder), (get_route,))
+        self.assertEqual(graph.get_route_closure(get_route),
+                         {entry, file_dt, folder, id_alias, error})
+        self.assertEqual(graph.get_route_closure(ns2.route_by_name['list']),
+                         {entry, file_dt, folder, id_alias})
+        # Closures are computed on first use, and reused.
+        self.assertIs(graph.get_route_closure(get_route), graph.get_route_closure(get_route))
+        self.assertEqual(graph.get_importing_namespaces(ns1), [ns2])
+        self.assertEqual(graph.get_importing_namespaces(ns2), [])
+
+        # The namespace queries are answered by the graph, with the same
+        # results as without it.
+        self.assertIs(ns1._graph, graph)
+        graph_results = (ns1.linearize_data_types(), ns2.get_route_io_data_types(),
+                         ns2.get_imported_namespaces())
+        self.assertEqual(graph_results[0][0], entry)
+        ns1._graph = ns2._graph = None
+        self.assertEqual((ns1.linearize_data_types(), ns2.get_route_io_data_types(),
+                          ns2.get_imported_namespaces()), graph_results)
+
+        # Modifying a namespace detaches it from the graph until the API is
+        # normalized again.
+        api.normalize()
+        graph = api.graph
+        ns1.add_alias(Alias('Other', ns1, None))
+        self.assertIsNone(ns1._graph)
+        self.assertIs(ns2._graph, graph)
+        api.normalize()
+        self.assertIsNot(api.graph, graph)
+        self.assertIs(ns1._graph, api.graph)
+
+    def test_prune_unreachable(self):
+        ns1_text = textwrap.dedent("""\
+            namespace ns1
+
+            alias Id = String
+            alias Name = String
+
+            struct Base
+                id Id
+
+            struct Sub extends Base
+                name Name
+
+            struct Other
+                f String
+            """)
+        ns2_text = textwrap.dedent("""\
+            namespace ns2
+
+            import ns1
+
+            union Error
+                bad ns1.Id
+
+            route get(ns1.Base, Void, Error)
+            """)
+        ns3_text = textwrap.dedent("""\
+            namespace ns3
+
+            import ns1
+
+            struct Kept
+                sub ns1.Sub
+            """)
+        specs = [('ns1.stone', ns1_text), ('ns2.stone', ns2_text),
+                 ('ns3.stone', ns3_text)]
+
+        api = TowerOfStone(specs).parse()
+        api.prune_unreachable()
+        self.assertEqual(list(api.namespaces), ['ns1', 'ns2'])
+        ns1 = api.namespaces['ns1']
+        self.assertEqual([dt.name for dt in ns1.data_types], ['Base'])
+        self.assertEqual(list(ns1.data_type_by_name), ['Base'])
+        self.assertEqual([alias.name for alias in ns1.aliases], ['Id'])
+        self.assertEqual(ns1.data_type_by_name['Base'].subtypes, [])
+        self.assertEqual(api.namespaces['ns2'].get_imported_namespaces(), [ns1])
+        self.assertIs(ns1._graph, api.graph)
+
+        api = TowerOfStone(specs).parse()
+        api.prune_unreachable([api.namespaces['ns3'].data_type_by_name['Kept']])
+        self.assertEqual(list(api.namespaces), ['ns1', 'ns2', 'ns3'])
+        ns1 = api.namespaces['ns1']
+        self.assertEqual([dt.name for dt in ns1.data_types], ['Base', 'Sub'])
+        self.assertEqual([alias.name for alias in ns1.aliases], ['Id', 'Name'])
+        self.assertEqual(ns1.data_type_by_name['Base'].subtypes,
+                         [ns1.data_type_by_name['Sub']])
+
+    def test_prune_unreachable_doc_refs(self):
+        ns1_text = textwrap.dedent("""\
+            namespace ns1
+
+            struct Documented
+                f String
+
+            struct Unused
+                f String
+            """)
+        ns2_text = textwrap.dedent("""\
+            namespace ns2
+
+            import ns1
+
+            struct S
+                x String
+                    "Like :field:`T.y`"
+
+            struct T
+                y Inner
+
+            struct Inner
+                f String
+
+            route r(S, Void, Void)
+                "Uses :type:`ns1.Documented`."
+            """)
+        api = TowerOfStone([('ns1.stone', ns1_text), ('ns2.stone', ns2_text)]).parse()
+        api.prune_unreachable()
+        # Data types that documentation refers to are kept, along with what
+        # they reference.
+        self.assertEqual([dt.name for dt in api.namespaces['ns1'].data_types],
+                         ['Documented'])
+        self.assertEqual(sorted(dt.name for dt in api.namespaces['ns2'].data_types),
+                         ['Inner', 'S', 'T'])
+
     def test_forward_reference(self):
         # Test route def before struct def
         text = textwrap.dedent("""\
@@ -1464,6 +1750,56 @@ class TestStone(unittest.TestCase):
         t = TowerOfStone([('test.stone', text)])
         t.parse()
 
+        # Test references to fields of other types
+        text = textwrap.dedent("""\
+            namespace test
+
+            struct S
+                "See :field:`T.b` and :field:`U.y`."
+                a String
+
+            struct T extends S
+                b String
+
+            union U
+                x
+                y String
+
+            alias A = String
+            """)
+        t = TowerOfStone([('test.stone', text)])
+        t.parse()
+
+        # Test that every bad reference is reported
+        text = textwrap.dedent("""\
+            namespace test
+
+            struct S
+                "See :field:`c` and :type:`V`."
+                a String
+                    "See :field:`T.a` and :field:`A.a`."
+
+            struct T
+                b String
+
+            alias A = String
+
+            route r(S, T, Void)
+                "See :route:`q`."
+            """)
+        t = TowerOfStone([('test.stone', text)])
+        with self.assertRaises(InvalidSpecs) as cm:
+            t.parse()
+        self.assertEqual(
+            [(e.msg, e.lineno) for e in cm.exception.errors],
+            [("Bad doc reference to unknown field 'c'.", 4),
+             ("Unknown doc reference to type 'V'.", 4),
+             ("Bad doc reference to unknown field 'T.a'.", 6),
+             ("Bad doc reference to field 'a' of 'A', which is not a struct "
+              "or union.", 6),
+             ("Unknown doc reference to route 'q'.", 14)])
+        self.assertEqual(cm.exception.msg, cm.exception.errors[0].msg)
+
     def test_namespace(self):
         # Test that namespace docstrings are combined
         ns1_text = textwrap.dedent("""\
@@ -1858,7 +2194,6 @@ class TestStone(unittest.TestCase):
         self.assertEqual(cm.exception.lineno, 7)
 
         # Test solution for recursive struct
-        # TODO: Omitting `s=null` will result in infinite recursion.
         text = textwrap.dedent("""\
             namespace test
 
@@ -1875,6 +2210,52 @@ class TestStone(unittest.TestCase):
         s_dt = t.api.namespaces['test'].data_type_by_name['S']
         self.assertEqual(s_dt.get_examples()['default'].value, {'f': 'A'})
 
+        # Test a recursive struct whose example refers to itself
+        text = textwrap.dedent("""\
+            namespace test
+
+            struct S
+                s S?
+                f String
+
+                example default
+                    f = "A"
+                    s = default
+            """)
+        t = TowerOfStone([('test.stone', text)])
+        with self.assertRaises(InvalidSpec) as cm:
+            t.parse()
+        self.assertEqual(
+            "Example 'default' of 'S' refers to itself through a cycle of "
+            "references.",
+            cm.exception.msg)
+        self.assertEqual(cm.exception.lineno, 7)
+
+        # Test a cycle of references through a union
+        text = textwrap.dedent("""\
+            namespace test
+
+            struct S
+                u U
+                f String
+
+                example default
+                    f = "A"
+                    u = other
+
+            union U
+                a S
+                b String
+
+                example other
+                    a = default
+            """)
+        t = TowerOfStone([('test.stone', text)])
+        with self.assertRaises(InvalidSpec) as cm:
+            t.parse()
+        self.assertIn('refers to itself through a cycle of references.',
+                      cm.exception.msg)
+
         # Test examples with inheritance trees
         text = textwrap.dedent("""\
             namespace test
@@ -2789,6 +3170,37 @@ class TestStone(unittest.TestCase):
             u_dt.get_examples()['default'].value,
             {'.tag': 'a', 'a': [[{'.tag': 'x'}, {'.tag': 'y', 'y': 100}, {'.tag': 'x'}]]})
 
+    def test_examples_shared(self):
+        # Every struct refers twice to the example of the previous one, which
+        # would take exponential time if examples weren't computed once.
+        depth = 40
+        lines = ['namespace test', '', 'struct S0', '    a UInt64',
+                 '    example default', '        a = 1']
+        for i in range(1, depth):
+            lines.extend([
+                'struct S%d' % i,
+                '    x S%d' % (i - 1),
+                '    y S%d' % (i - 1),
+                '    example default',
+                '        x = default',
+                '        y = default',
+            ])
+        t = TowerOfStone([('test.stone', '\n'.join(lines) + '\n')])
+        t.parse()
+        s_dt = t.api.namespaces['test'].data_type_by_name['S%d' % (depth - 1)]
+        value = s_dt.get_examples()['default'].value
+        for _ in range(depth - 1):
+            self.assertEqual(value['x'], value['y'])
+            value = value['x']
+        self.assertEqual(value, {'a': 1})
+
+        # The compact form is computed once, and callers get their own copy.
+        s_dt = t.api.namespaces['test'].data_type_by_name['S1']
+        examples = s_dt.get_examples(compact=True)
+        examples['default'].value['x'] = None
+        self.assertEqual(s_dt.get_examples(compact=True)['default'].value,
+                         {'x': {'a': 1}, 'y': {'a': 1}})
+
     def test_name_conflicts(self):
         # Test name conflict in same file
         text = textwrap.dedent("""\
@@ -2921,6 +3333,24 @@ class TestStone(unittest.TestCase):
         self.assertEqual(s3_dt.fields[2].data_type.data_type.namespace, ns1)
         self.assertEqual(xs[2].name, 'S3')
 
+    def test_fingerprint_import_cycle(self):
+        specs = [
+            ('na.stone', 'namespace na\nimport nb\nstruct A\n    b nb.B?\n'),
+            ('nb.stone', 'namespace nb\nimport nc\nstruct B\n    c nc.C?\n'),
+            ('nc.stone', 'namespace nc\nimport na\nstruct C\n    a na.A?\n'),
+            ('nd.stone', 'namespace nd\nimport na\nstruct D\n    a na.A\n'),
+        ]
+        fingerprints = fingerprint_namespaces(TowerOfStone(specs).parse())
+        self.assertEqual(sorted(fingerprints), ['na', 'nb', 'nc', 'nd'])
+        self.assertEqual(len(set(fingerprints.values())), 4)
+
+        # A change to a namespace of the cycle changes the fingerprints of all
+        # of them and of the namespaces importing them.
+        specs[2] = ('nc.stone', specs[2][1] + '    x String\n')
+        changed = fingerprint_namespaces(TowerOfStone(specs).parse())
+        for name in fingerprints:
+            self.assertNotEqual(changed[name], fingerprints[name])
+
     def test_namespace_obj(self):
         text = textwrap.dedent("""\
             namespace ns1
@@ -3394,6 +3824,160 @@ class TestStone(unittest.TestCase):
         self.assertEqual(cm.exception.lineno, 9)
         self.assertEqual(cm.exception.path, 'ns1.stone')
 
+    def test_parse_cache(self):
+        text = textwrap.dedent("""\
+            namespace test
+
+            struct S
+                "Doc"
+                a String?
+                b Int64 = 2
+
+            union U
+                a
+                b S
+
+            route r(S, U, Void)
+            """)
+        cache_dir = tempfile.mkdtemp()
+        try:
+            t = TowerOfStone([('test.stone', text)], cache_dir=cache_dir)
+            api = t.parse()
+            self.assertIn('S', api.namespaces['test'].data_type_by_name)
+
+            # A warm run must not touch the parser.
+            t = TowerOfStone([('test.stone', text)], cache_dir=cache_dir)
+            t.parser.parse = None
+            api = t.parse()
+            ns = api.namespaces['test']
+            s = ns.data_type_by_name['S']
+            self.assertIsInstance(s.all_fields[0].data_type, Nullable)
+            self.assertEqual(s.all_fields[1].default, 2)
+            self.assertEqual(s.doc, 'Doc')
+            self.assertEqual(ns.route_by_name['r'].arg_data_type, s)
+
+            # Changed contents are a cache miss.
+            t = TowerOfStone([('test.stone', text + 'alias A = String\n')],
+                             cache_dir=cache_dir)
+            api = t.parse()
+            self.assertIn('A', api.namespaces['test'].alias_by_name)
+
+            # Specs with errors are never cached.
+            bad_text = 'namespace test\nstruct S\n    a Strin g\n'
+            for _ in range(2):
+                t = TowerOfStone([('bad.stone', bad_text)],
+                                 cache_dir=cache_dir)
+                with self.assertRaises(InvalidSpec):
+                    t.parse()
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_parse_tables_up_to_date(self):
+        # If this fails, regenerate stone/lang/parsetab.py by constructing a
+        # StoneParser with debug=True.
+        pinfo = yacc.ParserReflect(
+            {k: getattr(self.parser, k) for k in dir(self.parser)})
+        pinfo.get_all()
+        self.assertEqual(pinfo.signature(), parsetab._lr_signature)
+
+    def test_lexer_reuse(self):
+        # The lexer is reused across files, so line numbers must restart.
+        text = 'namespace test\n\nstruct S\n    a $\n'
+        for _ in range(2):
+            parser = StoneParser(debug=False)
+            parser.parse(text, 'test.stone')
+            parser.parse(text, 'test.stone')
+            self.assertEqual(
+                [lineno for _, lineno, _ in parser.get_errors()][:2], [4, 4])
+
+    def test_parallel_parse(self):
+        text1 = textwrap.dedent("""\
+            namespace ns1
+            struct S1
+                f1 String
+            alias Iso8601 = Timestamp("%Y-%m-%dT%H:%M:%SZ")
+            """)
+        text2 = textwrap.dedent("""\
+            namespace ns2
+            import ns1
+            struct S2
+                f2 ns1.Iso8601?
+                f3 ns1.S1?
+            route r1(ns1.S1, S2, Void)
+            """)
+        text3 = textwrap.dedent("""\
+            namespace ns3
+            import ns2
+            union U1
+                a
+                b ns2.S2
+            """)
+        specs = [('ns1.stone', text1), ('ns2.stone', text2),
+                 ('ns3.stone', text3)]
+
+        def summarize(api):
+            return [(ns.name,
+                     [dt.name for dt in ns.linearize_data_types()],
+                     [r.name for r in ns.routes],
+                     [imported.name for imported in ns.get_imported_namespaces()])
+                    for ns in api.namespaces.values()]
+
+        serial = summarize(TowerOfStone(specs).parse())
+        parallel = summarize(TowerOfStone(specs, jobs=2).parse())
+        self.assertEqual(serial, parallel)
+
+        # The first spec (in the given order) with an error is reported.
+        bad_specs = [('ns1.stone', text1),
+                     ('bad1.stone', 'namespace ns5\nstruct S\n    a Strin g\n'),
+                     ('bad2.stone', 'namespace ns6\nstruct $\n')]
+        with self.assertRaises(InvalidSpec) as cm:
+            TowerOfStone(bad_specs, jobs=3).parse()
+        self.assertEqual(cm.exception.path, 'bad1.stone')
+        self.assertEqual(cm.exception.lineno, 3)
+
+    def test_release_tokens(self):
+        text = textwrap.dedent("""\
+            namespace test
+
+            alias A = String
+
+            struct S
+                "Doc"
+                a A
+                b UInt64 = 1
+
+                example default
+                    a = "x"
+
+            union U
+                x S
+
+                example default
+                    x = default
+
+            route r(S, U, Void)
+            """)
+        api = TowerOfStone([('test.stone', text)]).parse()
+        released_api = TowerOfStone([('test.stone', text)],
+                                    release_tokens=True).parse()
+        self.assertEqual(fingerprint_namespaces(api),
+                         fingerprint_namespaces(released_api))
+
+        ns = released_api.namespaces['test']
+        s_dt = ns.data_type_by_name['S']
+        u_dt = ns.data_type_by_name['U']
+        tokens = [s_dt._token, s_dt.fields[1]._token, u_dt._token,
+                  ns.alias_by_name['A']._token, ns.route_by_name['r']._token,
+                  u_dt.get_examples()['default']._token]
+        self.assertEqual([(t.path, t.lineno) for t in tokens],
+                         [('test.stone', 5), ('test.stone', 8),
+                          ('test.stone', 13), ('test.stone', 3),
+                          ('test.stone', 19), ('test.stone', 16)])
+        for token in tokens:
+            self.assertIs(type(token), _Element)
+        self.assertEqual(u_dt.get_examples()['default'].value,
+                         {'.tag': 'x', 'a': 'x', 'b': 1})
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from stone.watch import SpecWatcher
+
+
+class TestSpecWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.spec_path = os.path.join(self.tmp_dir, 'test.stone')
+        self._write_spec('namespace test\n')
+        self.builds = []
+        self.build_ok = True
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _write_spec(self, text):
+        with open(self.spec_path, 'w') as f:
+            f.write(text)
+
+    def _build(self):
+        self.builds.append(time.time())
+        if not self.build_ok:
+            print('test.stone:1: error: oops', file=sys.stderr)
+        return self.build_ok
+
+    def test_rebuild_on_change(self):
+        watcher = SpecWatcher([self.spec_path], self._build)
+        self.assertEqual(watcher.handle_command('status'),
+                         'error\nNo build has run yet.\n')
+        self.assertTrue(watcher.rebuild())
+        self.assertEqual(len(self.builds), 1)
+
+        # Nothing changed.
+        self.assertEqual(watcher.handle_command('build'), 'ok\n')
+        self.assertEqual(len(self.builds), 1)
+        self.assertEqual(watcher.handle_command('rebuild'), 'ok\n')
+        self.assertEqual(len(self.builds), 2)
+
+        self.build_ok = False
+        self._write_spec('namespace test\nstruct S\n')
+        self.assertEqual(watcher.handle_command('build'),
+                         'error\ntest.stone:1: error: oops\n')
+        self.assertEqual(len(self.builds), 3)
+        self.assertEqual(watcher.handle_command('status'),
+                         'error\ntest.stone:1: error: oops\n')
+        self.assertTrue(
+            watcher.handle_command('bogus').startswith('error\nUnknown command'))
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'requires UNIX sockets')
+    def test_socket(self):
+        socket_path = os.path.join(self.tmp_dir, 'stone.sock')
+        watcher = SpecWatcher([self.spec_path], self._build, interval=0.05,
+                              socket_path=socket_path)
+        thread = threading.Thread(target=watcher.serve_forever)
+        thread.start()
+
+        def send(command):
+            for _ in range(100):
+                if os.path.exists(socket_path):
+                    break
+                time.sleep(0.05)
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                client.connect(socket_path)
+                client.sendall(command.encode('utf-8') + b'\n')
+                response = b''
+                while True:
+                    chunk = client.recv(1024)
+                    if not chunk:
+                        break
+                    response += chunk
+            finally:
+                client.close()
+            return response.decode('utf-8')
+
+        try:
+            self.assertEqual(send('status'), 'ok\n')
+            self.assertEqual(send('rebuild'), 'ok\n')
+            self.assertEqual(send('stop'), 'ok\n')
+        finally:
+            watcher.stop()
+            thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(os.path.exists(socket_path))
+        self.assertEqual(len(self.builds), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()